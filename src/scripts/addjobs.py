@@ -1,17 +1,28 @@
-import pandas as pd
+import os
+import sys
+import argparse
+from common import DATA_DIR
+from jobs_join import join_jobs, load_jobs, print_report
+from storage import read_dataset, write_dataset
 
-df = pd.read_csv("top100.csv")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add job categories from jobs.txt to the ballot CSV")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100_scraped.csv'),
+                        help="ballot CSV with a person column (scrape_top100.py output)")
+    parser.add_argument("--jobs", default=os.path.join(DATA_DIR, 'jobs.txt'), help="category<TAB>comma-separated names per line")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'top100.csv'), help="where to write the result")
+    parser.add_argument("--in-place", action="store_true", help="allow --output to be the --csv file itself")
+    parser.add_argument("--strict", action="store_true", help="exit with an error if any name is unmatched or ambiguous")
+    args = parser.parse_args()
+    if os.path.abspath(args.output) == os.path.abspath(args.csv) and not args.in_place:
+        sys.exit(f"--output is the input file {args.csv}; pass --in-place to overwrite it")
 
-job_map = {}
-with open("jobs.txt", "r", encoding="utf-8") as f:
-    for line in f:
-        line = line.strip()
-        if not line or "\t" not in line:
-            continue
-        category, names = line.split("\t", 1)
-        for name in names.split(","):
-            job_map[name.strip()] = category
+    df = read_dataset(args.csv)
+    df, report = join_jobs(df.drop(columns=['job'], errors='ignore'), load_jobs(args.jobs))
+    print_report(report)
 
-df["job"] = df["person"].map(job_map).fillna("Unknown")
+    if args.strict and (report['unmatched'] or report['ambiguous']):
+        sys.exit("Not writing output: fix the names above in the jobs file")
 
-df.to_csv("test.csv", index=False)
+    write_dataset(df, args.output)
+    print(f"Wrote {len(df)} rows to {args.output}")
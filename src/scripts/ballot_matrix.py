@@ -0,0 +1,179 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from build_overlap_index import build_overlap_index
+from common import DATA_DIR
+from storage import read_dataset
+
+METRICS = ['jaccard', 'cosine']
+WEIGHTINGS = ['binary', 'idf']
+# Cells in one dense similarity block (float32), which sets how many rows go into each sparse product
+BLOCK_CELLS = 4 * 1024 * 1024
+
+class BallotMatrix:
+    """Person x title incidence matrix (CSR) built once from a ballot CSV
+
+    Row and column ids match the overlap index the page loads: people in order
+    of first appearance, titles sorted. Similarities are computed for blocks of
+    rows at once with sparse matrix products.
+    """
+
+    def __init__(self, people: List[str], titles: List[str], matrix: sparse.csr_matrix,
+                 jobs: Optional[List[str]] = None):
+        self.people = people
+        self.titles = titles
+        self.jobs = jobs or []
+        self.binary = matrix
+        self.person_ids = {name: i for i, name in enumerate(people)}
+        self.title_ids = {title: i for i, title in enumerate(titles)}
+        self.sizes = np.asarray(matrix.sum(axis=1)).ravel()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "BallotMatrix":
+        index = build_overlap_index(df)
+        # The postings are the title-major (CSC) layout of the same matrix
+        lengths = [len(voters) for voters in index['postings']]
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+        indices = np.fromiter((v for voters in index['postings'] for v in voters), dtype=np.int32, count=indptr[-1])
+        data = np.ones(len(indices), dtype=np.float32)
+        shape = (len(index['people']), len(index['titles']))
+        matrix = sparse.csc_matrix((data, indices, indptr), shape=shape).tocsr()
+        jobs = [index['jobs'][j] for j in index['person_jobs']] if index['jobs'] else None
+        return cls(index['people'], index['titles'], matrix, jobs)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "BallotMatrix":
+        return cls.from_frame(read_dataset(path, columns=['person', 'title', 'job']))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.binary.shape
+
+    def weighted(self, weighting: str = 'binary') -> sparse.csr_matrix:
+        """The matrix with each pick weighted: 1, or the title's inverse document frequency
+
+        NYT ballots are unranked (the `rank` column is the title's place on
+        the overall list), so 'idf' is the weighted variant: picks few other
+        voters made count for more than consensus ones.
+        """
+        if weighting == 'binary':
+            return self.binary
+        if weighting == 'idf':
+            votes = np.asarray(self.binary.sum(axis=0)).ravel()
+            idf = np.log(self.shape[0] / np.maximum(votes, 1)).astype(np.float32) + 1
+            return (self.binary @ sparse.diags(idf)).tocsr()
+        raise ValueError(f"Unknown weighting '{weighting}', expected one of {WEIGHTINGS}")
+
+    def _normalized(self, weighting: str) -> sparse.csr_matrix:
+        matrix = self.weighted(weighting)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return (sparse.diags(1 / np.maximum(norms, 1e-12)) @ matrix).tocsr()
+
+    def similarity_blocks(self, metric: str = 'jaccard', weighting: str = 'binary',
+                          rows: Optional[Sequence[int]] = None,
+                          batch_size: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (row ids, dense similarity block of those rows against every person)"""
+        rows = np.arange(self.shape[0]) if rows is None else np.asarray(rows)
+        batch_size = batch_size or max(1, BLOCK_CELLS // max(self.shape[0], 1))
+        if metric == 'jaccard':
+            # Jaccard is defined on sets, so it always uses the binary matrix
+            right = self.binary.T.tocsc()
+        elif metric == 'cosine':
+            normalized = self._normalized(weighting)
+            right = normalized.T.tocsc()
+        else:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+
+        for start in range(0, len(rows), batch_size):
+            block_rows = rows[start:start + batch_size]
+            if metric == 'jaccard':
+                intersection = (self.binary[block_rows] @ right).toarray()
+                union = self.sizes[block_rows, None] + self.sizes[None, :] - intersection
+                block = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+            else:
+                block = (normalized[block_rows] @ right).toarray()
+            yield block_rows, block
+
+    def similarity(self, metric: str = 'jaccard', weighting: str = 'binary',
+                   rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Dense rows x people similarity matrix (all pairs when rows is None)"""
+        return np.vstack([block for _, block in self.similarity_blocks(metric, weighting, rows)])
+
+    def top_k(self, k: int = 5, metric: str = 'jaccard', weighting: str = 'binary',
+              rows: Optional[Sequence[int]] = None,
+              batch_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Each row's k most similar other people: (neighbor ids, scores), best first
+
+        Only k candidates per row are selected with argpartition and then
+        sorted, so the cost is linear in the number of people.
+        """
+        k = min(k, self.shape[0] - 1)
+        all_ids, all_scores = [], []
+        for block_rows, block in self.similarity_blocks(metric, weighting, rows, batch_size):
+            block[np.arange(len(block_rows)), block_rows] = -np.inf
+            candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(block, candidates, axis=1)
+            order = np.argsort(-scores, axis=1, kind='stable')
+            all_ids.append(np.take_along_axis(candidates, order, axis=1))
+            all_scores.append(np.take_along_axis(scores, order, axis=1))
+        return np.vstack(all_ids), np.vstack(all_scores)
+
+    def neighbors(self, person: str, k: int = 5, metric: str = 'jaccard',
+                  weighting: str = 'binary') -> List[Tuple[str, float]]:
+        """A voter's k most similar voters by name"""
+        ids, scores = self.top_k(k, metric, weighting, rows=[self.person_ids[person]])
+        return [(self.people[i], float(s)) for i, s in zip(ids[0], scores[0])]
+
+    def query(self, titles: Sequence[str], k: int = 5, metric: str = 'jaccard') -> List[Tuple[str, float]]:
+        """Voters most similar to an arbitrary selection of titles, e.g. a visitor's picks on the page"""
+        picks = sorted({self.title_ids[t] for t in titles if t in self.title_ids})
+        vector = sparse.csr_matrix((np.ones(len(picks), dtype=np.float32), picks, [0, len(picks)]),
+                                   shape=(1, self.shape[1]))
+        intersection = (self.binary @ vector.T).toarray().ravel()
+        if metric == 'jaccard':
+            union = self.sizes + len(picks) - intersection
+            scores = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        else:
+            scores = intersection / np.maximum(np.sqrt(self.sizes * len(picks)), 1e-12)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.people[i], float(scores[i])) for i in best]
+
+def job_agreement(matrix: BallotMatrix, ids: np.ndarray) -> Dict[str, float]:
+    """Share of each job's voters whose nearest neighbor has the same job"""
+    if not matrix.jobs:
+        return {}
+    jobs = np.asarray(matrix.jobs)
+    same = jobs[ids[:, 0]] == jobs
+    return {job: float(same[jobs == job].mean()) for job in sorted(set(matrix.jobs))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Voter similarity over the person x title ballot matrix")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="ballot CSV with person/title/job")
+    parser.add_argument("--metric", choices=METRICS, default='jaccard', help="similarity measure")
+    parser.add_argument("--weighting", choices=WEIGHTINGS, default='binary', help="pick weights for cosine")
+    parser.add_argument("-k", type=int, default=5, help="neighbors per voter")
+    parser.add_argument("--person", help="only show this voter's neighbors")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matrix = BallotMatrix.from_csv(args.csv)
+    print(f"{matrix.shape[0]} voters x {matrix.shape[1]} titles, {matrix.binary.nnz} picks "
+          f"(built in {(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    if args.person:
+        for name, score in matrix.neighbors(args.person, args.k, args.metric, args.weighting):
+            print(f"  {score:.3f}  {name}")
+    else:
+        start = time.perf_counter()
+        ids, scores = matrix.top_k(args.k, args.metric, args.weighting)
+        print(f"All-pairs {args.metric} top-{args.k} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for i in np.argsort(-scores[:, 0], kind='stable')[:10]:
+            print(f"  {scores[i, 0]:.3f}  {matrix.people[i]} ~ {matrix.people[ids[i, 0]]}")
+        for job, share in job_agreement(matrix, ids).items():
+            print(f"  nearest neighbor shares job: {job:15s} {share:.0%}")
@@ -0,0 +1,76 @@
+import json
+import random
+import sqlite3
+import timeit
+import argparse
+from typing import Dict, List
+from http_cache import DEFAULT_CACHE_PATH
+from enrich_movies import CREW_ROLES, ROLE_LIMITS, classify_crew
+
+# Jobs a large production credits besides the ones we keep
+FILLER_JOBS = ['Gaffer', 'Key Grip', 'Boom Operator', 'Visual Effects Supervisor', 'Stunt Coordinator',
+               'Costume Designer', 'Makeup Artist', 'Set Decorator', 'Sound Mixer', 'Animator']
+
+def load_cached_payloads(cache_path: str) -> List[Dict]:
+    """Return every TMDB movie details response with credits stored in the HTTP cache"""
+    payloads = []
+    try:
+        conn = sqlite3.connect(cache_path)
+        rows = conn.execute("SELECT body FROM responses WHERE url LIKE '%themoviedb.org/3/movie/%'").fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return payloads
+    for (body,) in rows:
+        data = json.loads(body)
+        if data.get('credits', {}).get('crew'):
+            payloads.append(data)
+    return payloads
+
+def synthetic_payload(crew_size: int, seed: int = 0) -> Dict:
+    """A details payload shaped like a big production: mostly filler jobs, key roles scattered through"""
+    rng = random.Random(seed)
+    jobs = list(CREW_ROLES) + FILLER_JOBS * 20
+    crew = [{'name': f"Person {i}", 'job': rng.choice(jobs)} for i in range(crew_size)]
+    cast = [{'name': f"Actor {i}"} for i in range(crew_size // 4)]
+    return {'id': seed, 'credits': {'cast': cast, 'crew': crew}}
+
+def crew_multi_pass(crew: List[Dict]) -> Dict[str, List[str]]:
+    """The previous extraction: one full scan of the crew per role, sliced afterwards"""
+    jobs_by_role = {}
+    for job, role in CREW_ROLES.items():
+        jobs_by_role.setdefault(role, []).append(job)
+    names = {}
+    for role, limit in ROLE_LIMITS.items():
+        if role == 'actor':
+            continue
+        names[role] = [person['name'] for person in crew if person['job'] in jobs_by_role[role]][:limit]
+    return names
+
+def crew_single_pass(crew: List[Dict]) -> Dict[str, List[str]]:
+    names = classify_crew(crew)
+    names.pop('actor', None)
+    return names
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark crew classification on large TMDB payloads")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="HTTP cache to read TMDB payloads from")
+    parser.add_argument("--crew-size", type=int, default=3000, help="crew entries per synthetic payload")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    payloads = load_cached_payloads(args.cache)
+    source = f"{len(payloads)} cached payloads"
+    if not payloads:
+        payloads = [synthetic_payload(args.crew_size, seed) for seed in range(20)]
+        source = f"{len(payloads)} synthetic payloads with {args.crew_size} crew"
+    crews = [p['credits']['crew'] for p in payloads]
+    mismatches = sum(crew_multi_pass(crew) != crew_single_pass(crew) for crew in crews)
+    number = max(1, 200 // len(crews))
+
+    print(f"Classifying {source}, {number} iterations per repeat ({mismatches} mismatches)")
+    results = {}
+    for name, func in [("multi pass", crew_multi_pass), ("single pass", crew_single_pass)]:
+        best = min(timeit.repeat(lambda: [func(crew) for crew in crews], number=number, repeat=args.repeat))
+        results[name] = best / (number * len(crews))
+        print(f"  {name:12s} {results[name] * 1e6:9.1f} us/payload")
+    print(f"Speedup: {results['multi pass'] / results['single pass']:.1f}x")
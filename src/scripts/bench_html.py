@@ -0,0 +1,89 @@
+import os
+import time
+import argparse
+import tracemalloc
+from html import escape
+from typing import Callable, List, Tuple
+from common import DATA_DIR
+from html_parsing import available_parsers
+from scrape_top100 import parse_ballots
+from popular_top500 import parse_top500
+from storage import read_dataset
+
+# Page chrome repeated around the data so synthetic pages weigh what the real ones do
+FILLER = ('<div class="g-nav"><ul>' + '<li><a href="#">Section</a></li>' * 20 + '</ul></div>'
+          '<svg viewBox="0 0 100 100">' + '<path d="M0 0L100 100Z" fill="#333"></path>' * 40 + '</svg>'
+          '<script>window.__data = ' + '{"k": [1, 2, 3, "svelte"]}, ' * 60 + '{};</script>')
+
+def synthetic_votes_page(filler: int = 200) -> str:
+    """A votes page with the real ballots in the NYT person-box markup, padded with page chrome"""
+    df = read_dataset(os.path.join(DATA_DIR, 'top100.csv'))
+    parts = ['<html><head><title>Votes</title></head><body>', FILLER * filler]
+    for person, group in df.groupby('person', sort=False, observed=True):
+        parts.append(f'<div class="person-box svelte-abc"><h2>{escape(person)}</h2><div class="movies-wrapper">')
+        for rank, title, img_url in zip(group['rank'], group['title'], group['img_url']):
+            rank_html = f'<div class="top-position"><span>{rank}</span></div>' if rank != 999 else ''
+            parts.append(f'<div class="grid-item">{rank_html}'
+                         f'<img alt="movie cover for {escape(title)} by Someone" src="{img_url}"></div>')
+        parts.append('</div></div>' + FILLER)
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+def synthetic_readers_page(filler: int = 200) -> str:
+    """A readers' poll page: 100 illustrated rows and 400 more ranks in p.rest, padded with page chrome"""
+    parts = ['<html><head><title>Readers</title></head><body>', FILLER * filler]
+    for rank in range(1, 101):
+        parts.append(f'<div class="row-outer svelte-1l6f6x5"><span class="rank svelte-1l6f6x5">{rank}.</span>'
+                     f'<h3 class="svelte-1l6f6x5">{rank}. Movie {rank}</h3>'
+                     f'<img src="https://example.org/img/u{rank}.jpg"></div>' + FILLER)
+    parts.append('<p class="rest svelte-nxbyro">')
+    for rank in range(101, 501):
+        parts.append(f'<span><span class="num">{rank}.</span> <a href="#">Movie {rank}</a></span> ')
+    parts.append('</p></body></html>')
+    return ''.join(parts)
+
+def measure(func: Callable[[], List], repeat: int) -> Tuple[float, int, List]:
+    """Best wall time over `repeat` runs and the tracemalloc peak of one run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak, result
+
+def run(name: str, html: str, parse, repeat: int):
+    print(f"{name}: {len(html) / 1e6:.1f} MB of HTML")
+    print(f"  {'backend':24s}{'time':>10s}{'peak mem':>12s}{'rows':>7s}")
+    reference = None
+    for parser in available_parsers():
+        modes = [False] if parser == 'selectolax' else [False, True]
+        for restrict in modes:
+            label = parser + (' (strained)' if restrict else '')
+            seconds, peak, rows = measure(lambda: parse(html, parser, restrict=restrict), repeat)
+            reference = rows if reference is None else reference
+            flag = '' if rows == reference else '  MISMATCH'
+            print(f"  {label:24s}{seconds * 1000:8.1f}ms{peak / 1e6:10.1f}MB{len(rows):7d}{flag}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on saved NYT pages")
+    parser.add_argument("--votes-html", help="saved votes page (scrape_top100.py --save-html); synthetic if omitted")
+    parser.add_argument("--readers-html", help="saved readers page (popular_top500.py --save-html); synthetic if omitted")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    pages = []
+    for path, build, label, parse in [(args.votes_html, synthetic_votes_page, 'votes', parse_ballots),
+                                      (args.readers_html, synthetic_readers_page, 'readers', parse_top500)]:
+        if path:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((f"{label} ({path})", f.read(), parse))
+        else:
+            pages.append((f"{label} (synthetic)", build(), parse))
+
+    for name, html, parse in pages:
+        run(name, html, parse, args.repeat)
+    print("Peak memory is what tracemalloc sees: Python objects, not the C parsers' own buffers")
@@ -0,0 +1,141 @@
+import os
+import re
+import ast
+import json
+import sqlite3
+import timeit
+import argparse
+import subprocess
+from typing import Callable, List
+from http_cache import DEFAULT_CACHE_PATH
+from enrich_movies_wikipedia import INFOBOX_FIELDS
+from infobox_parser import parse_infobox
+
+# Commit whose enrich_movies_wikipedia.py still has the per-field regex extractor
+BASELINE_COMMIT = "2c3cdab"
+BASELINE_PATH = "src/scripts/enrich_movies_wikipedia.py"
+
+# Used when the HTTP cache holds no Wikipedia revisions yet
+SAMPLE_WIKITEXT = """{{Short description|2012 film by Michael Haneke}}
+{{Infobox film
+| name           = Amour
+| image          = Amour (2012 film).jpg
+| alt            =
+| caption        = Theatrical release poster
+| director       = [[Michael Haneke]]
+| writer         = Michael Haneke
+| producer       = {{Plainlist|
+* [[Margaret Ménégoz]]
+* [[Stefan Arndt]]
+* Veit Heiduschka
+* Michael Katz
+}}
+| starring       = {{Plainlist|
+* [[Jean-Louis Trintignant]]
+* [[Emmanuelle Riva]]
+* [[Isabelle Huppert]]
+}}
+| cinematography = [[Darius Khondji]]
+| editing        = {{ubl|Monika Willi|Nadine Muse}}
+| production_companies = {{Plainlist|
+* Les Films du Losange
+* X-Filme Creative Pool
+* Wega Film
+}}
+| distributor    = Les Films du Losange<ref name="BFI">{{cite web|url=https://example.org|title=Amour|publisher=BFI}}</ref>
+| released       = {{Film date|2012|5|20|[[2012 Cannes Film Festival|Cannes]]|2012|9|20|Germany|2012|10|24|France}}
+| runtime        = 127 minutes<!-- Theatrical runtime -->
+| country        = {{Plainlist|
+* France
+* Austria
+* Germany
+}}
+| language       = French
+| budget         = €7.29 million<ref>{{cite web|title=Amour|work=JP's Box-Office}}</ref>
+| gross          = $29.4 million<ref>{{cite web|url=https://www.boxofficemojo.com|title=Amour}}</ref>
+}}
+'''Amour''' ({{IPA|fr|amuʁ|lang}}; {{lit.|Love}}) is a 2012 [[romance film|romantic]] [[drama film]] written and
+directed by [[Michael Haneke]], starring [[Jean-Louis Trintignant]], [[Emmanuelle Riva]] and [[Isabelle Huppert]].
+The narrative focuses on an elderly couple, Anne and Georges, who are retired music teachers with a daughter who
+lives abroad. Anne suffers a stroke, and the couple's bond of love is severely tested.<ref name="guardian">{{cite
+news|last=Bradshaw|first=Peter|title=Amour – review|url=https://www.theguardian.com|work=The Guardian|date=15
+November 2012}}</ref> The film is a co-production among French, German and Austrian companies.
+
+The film premiered at the [[2012 Cannes Film Festival]], where it won the [[Palme d'Or]].<ref>{{cite
+web|url=https://www.festival-cannes.com|title=Awards 2012|publisher=Cannes}}</ref> It won the [[Academy Award for
+Best Foreign Language Film]] at the [[85th Academy Awards]] and was nominated in four other categories: [[Academy
+Award for Best Picture|Best Picture]], [[Academy Award for Best Actress|Best Actress]] (Riva), [[Academy Award for
+Best Director|Best Director]] and [[Academy Award for Best Original Screenplay|Best Original Screenplay]] (Haneke).
+At 85, Riva became the oldest nominee for Best Actress.<ref name="oldest">{{cite news|title=Oscars 2013|work=BBC
+News|date=10 January 2013}}</ref>
+
+''Amour'' won the [[European Film Award for Best Film]], the [[César Award for Best Film]], the [[BAFTA Award for
+Best Film Not in the English Language]] and the [[Golden Globe Award for Best Foreign Language Film]].<ref>{{cite
+web|title=Amour awards|url=https://example.org/awards}}</ref> It was also named the best film of 2012 by a number
+of critics and publications, and it has since been ranked among the greatest films of the 21st century.{{sfn|Smith|2016|p=12}}
+"""
+
+def load_cached_wikitext(cache_path: str) -> List[str]:
+    """Return section 0 wikitext for every Wikipedia revisions response in the HTTP cache"""
+    texts = []
+    try:
+        conn = sqlite3.connect(cache_path)
+        rows = conn.execute("SELECT body FROM responses WHERE key LIKE '%rvprop=content%'").fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return texts
+    for (body,) in rows:
+        pages = json.loads(body).get('query', {}).get('pages', {})
+        for page in (pages.values() if isinstance(pages, dict) else pages):
+            for revision in page.get('revisions', []):
+                text = revision.get('*') or revision.get('slots', {}).get('main', {}).get('content')
+                if text:
+                    texts.append(text)
+    return texts
+
+def load_baseline_extractor(commit: str = BASELINE_COMMIT) -> Callable[[str, str], str]:
+    """Compile extract_infobox_field from enrich_movies_wikipedia.py as of `commit`
+
+    Only that function is taken from `git show`, so the rest of the old
+    module (and its imports) never runs.
+    """
+    source = subprocess.run(['git', 'show', f"{commit}:{BASELINE_PATH}"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    tree = ast.parse(source)
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == 'extract_infobox_field']
+    if not functions:
+        raise SystemExit(f"No extract_infobox_field in {BASELINE_PATH} at {commit}")
+    namespace = {'re': re}
+    exec(compile(ast.Module(body=functions, type_ignores=[]), f"{commit}:{BASELINE_PATH}", 'exec'), namespace)
+    return namespace['extract_infobox_field']
+
+def per_field_parser(extract_infobox_field: Callable[[str, str], str]):
+    def parse_per_field(content: str):
+        return {field: extract_infobox_field(content, field) for field in INFOBOX_FIELDS}
+    return parse_per_field
+
+def parse_single_pass(content: str):
+    return parse_infobox(content, INFOBOX_FIELDS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark infobox parsing on stored wikitext")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="HTTP cache to read wikitext from")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats (best is reported)")
+    parser.add_argument("--baseline", default=BASELINE_COMMIT, help="commit to take the per-field extractor from")
+    args = parser.parse_args()
+    parse_per_field = per_field_parser(load_baseline_extractor(args.baseline))
+
+    texts = load_cached_wikitext(args.cache)
+    source = f"{len(texts)} cached pages"
+    if not texts:
+        texts = [SAMPLE_WIKITEXT]
+        source = "built-in sample page"
+    number = max(1, 200 // len(texts))
+
+    print(f"Parsing {source}, {number} iterations per repeat")
+    results = {}
+    for name, func in [("per-field regex", parse_per_field), ("single pass", parse_single_pass)]:
+        best = min(timeit.repeat(lambda: [func(t) for t in texts], number=number, repeat=args.repeat))
+        results[name] = best / (number * len(texts))
+        print(f"  {name:16s} {results[name] * 1e6:9.1f} us/page")
+    print(f"Speedup: {results['per-field regex'] / results['single pass']:.1f}x")
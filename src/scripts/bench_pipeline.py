@@ -0,0 +1,117 @@
+"""Record the pipeline's HTTP traffic once, then replay it offline and time each networked stage
+
+This is a small runner rather than a pytest-benchmark or asv suite on
+purpose. Each stage is a script run end to end in its own process against
+the stand-in server. What is measured is that process: wall time, requests
+served and peak RSS (os.wait4). pytest-benchmark and asv time a Python
+callable repeatedly inside one process. They would report neither the
+child's RSS nor the request counts, and neither is a dependency here.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+from replay import DEFAULT_FIXTURES_DIR, FixtureStore, StandInServer
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def pipeline_stages(work_dir: str, max_movies: int) -> List[Dict]:
+    """The networked stages in dependency order, writing everything under work_dir"""
+    ballots = os.path.join(work_dir, 'top100.csv')
+    return [
+        {'name': 'scrape_top100', 'script': 'scrape_top100.py', 'args': ['--output', ballots]},
+        {'name': 'popular_top500', 'script': 'popular_top500.py',
+         'args': ['--output', os.path.join(work_dir, 'top500.csv')]},
+        {'name': 'scrape_jpgs', 'script': 'scrape_jpgs.py',
+         'args': ['--csv', ballots, '--out-dir', os.path.join(work_dir, 'images')]},
+        {'name': 'enrich_movies', 'script': 'enrich_movies.py',
+         'args': ['--csv', ballots, '--output', os.path.join(work_dir, 'top100_enriched.csv'),
+                  '--max-movies', str(max_movies)]},
+        {'name': 'enrich_movies_wikipedia', 'script': 'enrich_movies_wikipedia.py',
+         'args': ['--csv', ballots, '--output', os.path.join(work_dir, 'top100_wikipedia_enriched.csv'),
+                  '--max-movies', str(max_movies), '--batch']},
+    ]
+
+def run_stage(stage: Dict, env: Dict[str, str], work_dir: str, log) -> Dict:
+    """Run one stage in its own process; returns exit status, wall time and the child's peak RSS"""
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, 'replay.py'), 'run',
+               os.path.join(SCRIPTS_DIR, stage['script'])] + stage['args']
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, cwd=work_dir, stdout=log, stderr=subprocess.STDOUT)
+    # wait4 gives this child's own rusage, so peak RSS is per stage
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'stage': stage['name'],
+        'exit_code': proc.returncode,
+        'wall_seconds': round(time.perf_counter() - start, 3),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KB on Linux
+    }
+
+def run_pipeline(mode: str, fixtures_dir: str, work_dir: str, max_movies: int,
+                 only: Optional[List[str]] = None) -> List[Dict]:
+    """Run the stages live while recording fixtures, or against the stand-in server"""
+    env = dict(os.environ)
+    # A fresh HTTP cache so every stage really talks to the network or the stand-in
+    env['TOP100_HTTP_CACHE'] = os.path.join(work_dir, 'http_cache.sqlite')
+    env.pop('TOP100_OFFLINE', None)
+    server = None
+    store = FixtureStore(fixtures_dir)
+    if mode == 'replay':
+        server = StandInServer(fixtures_dir).start()
+        env['TOP100_REPLAY'] = server.url
+        env.setdefault('TMDB_API_KEY', 'replay')
+        env['NO_PROXY'] = env['no_proxy'] = '127.0.0.1,localhost'
+        print(f"Replaying {len(server.fixtures)} fixtures from {server.url}")
+    else:
+        env['TOP100_RECORD'] = fixtures_dir
+        print(f"Recording into {fixtures_dir}")
+
+    results = []
+    log_path = os.path.join(work_dir, 'pipeline.log')
+    with open(log_path, 'w') as log:
+        for stage in pipeline_stages(work_dir, max_movies):
+            if only and stage['name'] not in only:
+                continue
+            recorded_before = store.count()
+            result = run_stage(stage, env, work_dir, log)
+            if server is not None:
+                result.update(server.reset_stats())
+            else:
+                result.update({'requests': store.count() - recorded_before, 'missing': 0})
+            results.append(result)
+            print(f"  {result['stage']:26s} exit {result['exit_code']:<3d}{result['wall_seconds']:9.2f}s"
+                  f"{result['requests']:8d} req{result['missing']:6d} missing{result['peak_rss_mb']:9.1f} MB")
+    if server is not None:
+        server.shutdown()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the pipeline's HTTP traffic, or replay it offline and "
+                                                 "report wall time, requests and peak RSS per stage")
+    parser.add_argument("mode", choices=["record", "replay"], help="record needs network access; replay does not")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="fixtures directory")
+    parser.add_argument("--work-dir", help="where stages write their output and pipeline.log "
+                                           "(default: a temp dir, removed unless a stage fails)")
+    parser.add_argument("--max-movies", type=int, default=100, help="rows the enrichers process")
+    parser.add_argument("--stages", nargs="*", help="only run these stages")
+    parser.add_argument("--json", help="also write the results here, for comparing runs")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="top100-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    results = run_pipeline(args.mode, os.path.abspath(args.fixtures), os.path.abspath(work_dir),
+                           args.max_movies, args.stages)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if any(r['exit_code'] != 0 for r in results):
+        # Keep the work dir so the log can be read
+        sys.exit(f"A stage failed, see {os.path.join(work_dir, 'pipeline.log')}")
+    if not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,33 @@
+"""Ballot -> overlap index used by export_bundle.py (bundle.json) and ballot_matrix.py
+
+A library module, not a build step: the page reads the index from bundle.json.
+"""
+import pandas as pd
+from typing import Dict
+
+def build_overlap_index(df: pd.DataFrame) -> Dict:
+    """Build an inverted index from ballots: title id -> sorted voter ids
+
+    People keep their order of first appearance in the ballot CSV, titles are
+    sorted alphabetically (the order the page lists them in) and jobs are
+    interned so each person carries a small integer.
+    """
+    people = list(dict.fromkeys(df['person']))
+    person_ids = {name: i for i, name in enumerate(people)}
+    first_job = df.drop_duplicates('person').set_index('person')['job'] if 'job' in df else None
+    jobs = sorted(first_job.unique()) if first_job is not None else []
+    job_ids = {job: i for i, job in enumerate(jobs)}
+
+    titles = sorted(df['title'].unique())
+    title_ids = {title: i for i, title in enumerate(titles)}
+    postings = [set() for _ in titles]
+    for person, title in zip(df['person'], df['title']):
+        postings[title_ids[title]].add(person_ids[person])
+
+    return {
+        'people': people,
+        'jobs': jobs,
+        'person_jobs': [job_ids[first_job[name]] for name in people] if jobs else [],
+        'titles': titles,
+        'postings': [sorted(voters) for voters in postings],
+    }
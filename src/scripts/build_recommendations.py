@@ -0,0 +1,110 @@
+import os
+import json
+import argparse
+import numpy as np
+from scipy import sparse
+from typing import Dict, List, Optional, Sequence, Tuple
+from ballot_matrix import BallotMatrix
+from common import DATA_DIR, atomic_write
+from enrichment_index import normalize_title
+from storage import read_dataset
+
+TOP_K = 10
+# Pseudo-votes added to each title's count in the lift denominator, so a pair
+# of single-vote titles picked by the same voter doesn't outrank real patterns
+PRIOR_VOTES = 3
+
+def cooccurrence(matrix: BallotMatrix) -> sparse.csr_matrix:
+    """Title x title count of voters who picked both (diagonal removed)"""
+    counts = (matrix.binary.T @ matrix.binary).tocsr()
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+    return counts
+
+def smoothed_lift(counts: sparse.csr_matrix, votes: np.ndarray, voters: int,
+                  prior: float = PRIOR_VOTES) -> sparse.csr_matrix:
+    """count * voters / ((votes_i + prior) * (votes_j + prior)) for every co-occurring pair"""
+    coo = counts.tocoo()
+    lift = coo.data * voters / ((votes[coo.row] + prior) * (votes[coo.col] + prior))
+    return sparse.csr_matrix((lift.astype(np.float32), (coo.row, coo.col)), shape=counts.shape)
+
+def top_k_rows(scores: sparse.csr_matrix, k: int = TOP_K) -> Tuple[List[List[int]], List[List[float]]]:
+    """Keep each row's k highest-scoring columns, best first"""
+    neighbors, kept = [], []
+    for i in range(scores.shape[0]):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        columns, values = scores.indices[start:end], scores.data[start:end]
+        if len(values) > k:
+            best = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[best], values[best]
+        order = np.lexsort((columns, -values))
+        neighbors.append(columns[order].tolist())
+        kept.append([round(float(v), 3) for v in values[order]])
+    return neighbors, kept
+
+def popularity_order(matrix: BallotMatrix, popularity_csv: Optional[str] = None) -> List[int]:
+    """Title ids by readers' top 500 rank when known, then by ballot count"""
+    votes = np.asarray(matrix.binary.sum(axis=0)).ravel()
+    ranks = {}
+    if popularity_csv and os.path.exists(popularity_csv):
+        for title, rank in read_dataset(popularity_csv, columns=['title', 'rank']).itertuples(index=False):
+            ranks.setdefault(normalize_title(title), int(rank))
+    missing = len(matrix.titles) + 1000
+    return sorted(range(len(matrix.titles)),
+                  key=lambda i: (ranks.get(normalize_title(matrix.titles[i]), missing), -votes[i], i))
+
+def build_recommendations(matrix: BallotMatrix, k: int = TOP_K,
+                          popularity_csv: Optional[str] = None) -> Dict:
+    """Precompute each title's k best "also picked" titles by smoothed lift
+
+    The table is what the page loads: titles in overlap-index order, per title
+    the neighbor ids and scores, and a popularity order used to fill in when a
+    selection has too few neighbors.
+    """
+    votes = np.asarray(matrix.binary.sum(axis=0)).ravel()
+    scores = smoothed_lift(cooccurrence(matrix), votes, matrix.shape[0])
+    neighbors, kept = top_k_rows(scores, k)
+    return {
+        'titles': matrix.titles,
+        'neighbors': neighbors,
+        'scores': kept,
+        'popular': popularity_order(matrix, popularity_csv),
+    }
+
+def recommend(table: Dict, selection: Sequence[str], count: int = 5) -> List[Tuple[str, float]]:
+    """Sum the neighbor rows of the selected titles and return the best unselected titles"""
+    title_ids = {title: i for i, title in enumerate(table['titles'])}
+    chosen = {title_ids[t] for t in selection if t in title_ids}
+    totals: Dict[int, float] = {}
+    for i in chosen:
+        for j, score in zip(table['neighbors'][i], table['scores'][i]):
+            if j not in chosen:
+                totals[j] = totals.get(j, 0.0) + score
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:count]
+    for j in table['popular']:
+        if len(ranked) >= count:
+            break
+        if j not in chosen and j not in totals:
+            ranked.append((j, 0.0))
+    return [(table['titles'][j], score) for j, score in ranked]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute \"you might also pick\" suggestions from ballot co-occurrence")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="ballot CSV with person/title")
+    parser.add_argument("--popularity", default=os.path.join(DATA_DIR, 'top500.csv'),
+                        help="readers' top 500, used to order fallback suggestions (optional)")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'recommendations.json'), help="table to write")
+    parser.add_argument("-k", type=int, default=TOP_K, help="neighbors kept per title")
+    parser.add_argument("--try", dest="selection", nargs="*", help="print suggestions for these titles")
+    args = parser.parse_args()
+
+    matrix = BallotMatrix.from_csv(args.csv)
+    table = build_recommendations(matrix, args.k, args.popularity)
+    atomic_write(args.output, json.dumps(table, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    covered = sum(1 for row in table['neighbors'] if row)
+    print(f"Kept up to {args.k} neighbors for {covered}/{len(table['titles'])} titles "
+          f"({os.path.getsize(args.output) / 1024:.1f} KB) -> {args.output}")
+
+    if args.selection:
+        for title, score in recommend(table, args.selection):
+            print(f"  {score:6.2f}  {title}")
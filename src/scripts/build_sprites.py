@@ -0,0 +1,87 @@
+import io
+import os
+import json
+import argparse
+from PIL import Image, ImageOps
+from typing import Dict, List, Optional
+from common import DATA_DIR, atomic_write
+from storage import read_dataset
+from transcode_posters import OUTPUT_DIR, load_manifest, variant_path
+
+SPRITES_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets', 'sprites')
+INDEX_NAME = "atlas.json"
+
+# Tiles at the height the selection cards show posters (300px), cropped to
+# the NYT posters' aspect ratio so the page never upscales them
+TILE_WIDTH = 220
+TILE_HEIGHT = 300
+# Most-voted posters first, so a selection of popular films is covered by one
+# or two sheets
+COLUMNS = 8
+TILES_PER_SHEET = 32
+# Transcoded variant the tiles are cut from (see transcode_posters.py)
+SOURCE_VARIANT = 'full'
+SOURCE_FORMAT = 'webp'
+QUALITY = 75
+
+def poster_order(uniqids: List[str], csv_path: Optional[str]) -> List[str]:
+    """Most-voted posters first"""
+    if not csv_path or not os.path.exists(csv_path):
+        return sorted(uniqids)
+    votes = read_dataset(csv_path, columns=['uniqid'])['uniqid'].value_counts()
+    return sorted(uniqids, key=lambda u: (-int(votes.get(u, 0)), u))
+
+def variant_sources(posters_dir: str) -> Dict[str, str]:
+    """Map uniqid -> transcoded poster the tiles are cut from"""
+    posters = load_manifest(posters_dir).get('posters', {})
+    sources = {uniqid: variant_path(posters_dir, SOURCE_VARIANT, uniqid, SOURCE_FORMAT) for uniqid in posters}
+    sources = {uniqid: path for uniqid, path in sources.items() if os.path.exists(path)}
+    if not sources:
+        raise SystemExit(f"No {SOURCE_VARIANT} {SOURCE_FORMAT} posters in {posters_dir}; run transcode_posters.py first")
+    return sources
+
+def build_sprites(posters_dir: str = OUTPUT_DIR, out_dir: str = SPRITES_DIR,
+                  csv_path: Optional[str] = os.path.join(DATA_DIR, 'top100.csv')) -> Dict:
+    """Pack the transcoded posters into WebP sprite sheets and write a coordinate index keyed by uniqid
+
+    The index lists each sheet with its pixel size and maps uniqid to
+    [sheet, x, y]; every tile is tile_width x tile_height.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sources = variant_sources(posters_dir)
+    order = poster_order(list(sources), csv_path)
+
+    index = {'tile_width': TILE_WIDTH, 'tile_height': TILE_HEIGHT, 'sheets': [], 'posters': {}}
+    for sheet_number, first in enumerate(range(0, len(order), TILES_PER_SHEET)):
+        batch = order[first:first + TILES_PER_SHEET]
+        rows = -(-len(batch) // COLUMNS)
+        columns = min(COLUMNS, len(batch))
+        sheet = Image.new('RGB', (columns * TILE_WIDTH, rows * TILE_HEIGHT))
+        for position, uniqid in enumerate(batch):
+            x = (position % COLUMNS) * TILE_WIDTH
+            y = (position // COLUMNS) * TILE_HEIGHT
+            with Image.open(sources[uniqid]) as poster:
+                tile = ImageOps.fit(poster.convert('RGB'), (TILE_WIDTH, TILE_HEIGHT), Image.LANCZOS)
+            sheet.paste(tile, (x, y))
+            index['posters'][uniqid] = [sheet_number, x, y]
+
+        name = f"posters-{sheet_number}.webp"
+        buffer = io.BytesIO()
+        sheet.save(buffer, 'WEBP', quality=QUALITY)
+        atomic_write(os.path.join(out_dir, name), buffer.getvalue())
+        index['sheets'].append({'file': name, 'width': sheet.width, 'height': sheet.height})
+        print(f"  {name}: {len(batch)} posters, {buffer.tell() / 1024:.0f} KB")
+
+    atomic_write(os.path.join(out_dir, INDEX_NAME),
+                 json.dumps(index, separators=(',', ':')).encode('utf-8'))
+    return index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack transcoded posters into sprite sheets for index.html")
+    parser.add_argument("--src", default=OUTPUT_DIR, help="transcode_posters.py output (variants + manifest.json)")
+    parser.add_argument("--out", default=SPRITES_DIR, help="directory for the sheets and atlas.json")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="ballots, used to put popular posters first")
+    args = parser.parse_args()
+
+    index = build_sprites(args.src, args.out, args.csv)
+    print(f"Packed {len(index['posters'])} posters into {len(index['sheets'])} sheets -> {args.out}")
@@ -0,0 +1,122 @@
+import os
+import csv
+import json
+import math
+import tempfile
+from typing import Dict, Iterable, Iterator, List
+
+CHECKPOINT_SUFFIX = ".partial.jsonl"
+DEFAULT_FSYNC_EVERY = 25
+
+def checkpoint_path_for(output_path: str) -> str:
+    """Return the checkpoint file used while building output_path"""
+    return output_path + CHECKPOINT_SUFFIX
+
+class CheckpointWriter:
+    """Append-only JSONL writer that fsyncs every `fsync_every` rows"""
+
+    def __init__(self, path: str, append: bool = False, fsync_every: int = DEFAULT_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._unsynced = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, row: Dict):
+        self._file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        # Hand every row to the OS so a crash of this process loses nothing;
+        # fsync in batches to survive power loss without paying for it per row
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_checkpoint(path: str) -> Iterator[Dict]:
+    """Yield rows from a checkpoint, ignoring a torn final line"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line can be partially written
+                return
+
+def resume_position(path: str, rows: List[Dict]) -> int:
+    """Return how many input rows a checkpoint already covers, or 0 if it doesn't match the input
+
+    Rows are checkpointed in input order, so a valid checkpoint holds a prefix
+    of the input; the last checkpointed title is checked against the input.
+    """
+    count = 0
+    last = None
+    for last in read_checkpoint(path):
+        count += 1
+    if count == 0:
+        return 0
+    if count > len(rows) or last.get("title") != rows[count - 1]["title"]:
+        print(f"Checkpoint {path} does not match the input, starting over")
+        return 0
+    # Drop a torn final line so appends start on a clean line
+    _truncate_after(path, count)
+    return count
+
+def _truncate_after(path: str, count: int):
+    with open(path, "rb+") as f:
+        for _ in range(count):
+            f.readline()
+        f.truncate()
+
+def _csv_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return value
+
+def merge_checkpoint(checkpoint_path: str, output_path: str, exclude: Iterable[str] = ()) -> int:
+    """Stream a checkpoint into a CSV without loading it into memory. Returns the row count
+
+    The first pass collects the union of columns in first-seen order, the second
+    writes rows to a temp file that is renamed over output_path. Keys in
+    `exclude` are left out of the CSV.
+    """
+    exclude = set(exclude)
+    columns = {}
+    for row in read_checkpoint(checkpoint_path):
+        for key in row:
+            if key not in exclude:
+                columns.setdefault(key, None)
+
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".tmp-", suffix=".csv")
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(columns))
+            writer.writeheader()
+            for row in read_checkpoint(checkpoint_path):
+                writer.writerow({key: _csv_value(value) for key, value in row.items() if key not in exclude})
+                count += 1
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
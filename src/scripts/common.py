@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# Committed data files (ballots, jobs, bundle.json, ...)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets', 'data')
+
+def atomic_write(path: str, data: bytes):
+    """Write bytes to a temp file in the same directory and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,129 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.stats import rankdata, spearmanr
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from ballot_matrix import BallotMatrix
+from common import DATA_DIR
+from storage import read_dataset
+
+METHODS = ['count', 'points']
+CUTOFF = 100
+DEFAULT_RESAMPLES = 2000
+# Resamples per worker task; each is one (resamples x voters) @ (voters x titles) product
+CHUNK_SIZE = 250
+
+def ballot_weights(df: pd.DataFrame, matrix: BallotMatrix, method: str) -> sparse.csr_matrix:
+    """Voter x title points each pick earns under `method`
+
+    count: one point per pick. points: each voter shares one point between
+    their picks, so short ballots weigh as much as full ones. There is no
+    positional rule such as Borda: NYT ballots aren't ranked (the `rank`
+    column is the title's place on the published list, and picks are stored
+    alphabetically), so pick order carries no preference.
+    """
+    picks = df.drop_duplicates(['person', 'title'])
+    rows = picks['person'].map(matrix.person_ids).to_numpy()
+    columns = picks['title'].map(matrix.title_ids).to_numpy()
+    sizes = picks.groupby('person', sort=False)['title'].transform('size').to_numpy()
+    if method == 'count':
+        values = np.ones(len(picks))
+    elif method == 'points':
+        values = 1 / sizes
+    else:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+    return sparse.csr_matrix((values.astype(np.float64), (rows, columns)), shape=matrix.shape)
+
+def rank_scores(scores: np.ndarray) -> np.ndarray:
+    """Competition ranks along the last axis (1 = most points; ties share the better rank)"""
+    return rankdata(-scores, method='min', axis=-1).astype(np.int32)
+
+def aggregate(weights: sparse.csr_matrix) -> np.ndarray:
+    """Total points per title"""
+    return np.asarray(weights.sum(axis=0)).ravel()
+
+def _bootstrap_chunk(job) -> np.ndarray:
+    """Ranks for `resamples` voter resamples. Runs in a worker process"""
+    weights, resamples, seed = job
+    rng = np.random.default_rng(seed)
+    voters = weights.shape[0]
+    # How often each voter is drawn in each resample: one multinomial row per resample
+    draws = rng.multinomial(voters, np.full(voters, 1 / voters), size=resamples).astype(np.float64)
+    return rank_scores(np.asarray((weights.T @ draws.T).T))
+
+def bootstrap_ranks(weights: sparse.csr_matrix, resamples: int = DEFAULT_RESAMPLES,
+                    workers: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """Ranks of every title under `resamples` resamples of the voters, (resamples x titles)
+
+    Resamples are split into chunks with independent seeds and spread over a
+    pool of `workers` processes; the result is the same for a given seed
+    whatever the number of workers.
+    """
+    sizes = [min(CHUNK_SIZE, resamples - start) for start in range(0, resamples, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(weights, size, child) for size, child in zip(sizes, seeds)]
+    if workers == 1:
+        return np.vstack([_bootstrap_chunk(job) for job in jobs])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.vstack(list(executor.map(_bootstrap_chunk, jobs)))
+
+def consensus_rankings(df: pd.DataFrame, methods: List[str] = METHODS, resamples: int = DEFAULT_RESAMPLES,
+                       workers: Optional[int] = None, level: float = 0.9, cutoff: int = CUTOFF,
+                       seed: int = 0) -> pd.DataFrame:
+    """One row per title: points, rank and bootstrap rank interval for each method
+
+    `<method>_low`/`<method>_high` bound the central `level` share of the
+    bootstrap ranks and `<method>_p_top` is the share of resamples that put
+    the title inside the top `cutoff`.
+    """
+    matrix = BallotMatrix.from_frame(df)
+    published = df.drop_duplicates('title').set_index('title')['rank'] if 'rank' in df else None
+    table = pd.DataFrame({'title': matrix.titles})
+    if published is not None:
+        table['published_rank'] = [int(published[title]) for title in matrix.titles]
+
+    tail = (1 - level) / 2
+    for method in methods:
+        weights = ballot_weights(df, matrix, method)
+        scores = aggregate(weights)
+        table[f'{method}_score'] = np.round(scores, 4)
+        table[f'{method}_rank'] = rank_scores(scores)
+        if resamples:
+            ranks = bootstrap_ranks(weights, resamples, workers, seed)
+            low, high = np.quantile(ranks, [tail, 1 - tail], axis=0, method='lower')
+            table[f'{method}_low'] = low
+            table[f'{method}_high'] = high
+            table[f'{method}_p_top'] = np.round((ranks <= cutoff).mean(axis=0), 4)
+    return table.sort_values([f'{methods[0]}_rank', 'title']).reset_index(drop=True)
+
+def agreement(table: pd.DataFrame, methods: List[str], cutoff: int = CUTOFF) -> Dict[str, float]:
+    """Spearman correlation between each method's ranks and the published ranks of the top `cutoff`"""
+    if 'published_rank' not in table:
+        return {}
+    listed = table[table['published_rank'] <= cutoff]
+    return {method: float(spearmanr(listed['published_rank'], listed[f'{method}_rank'])[0]) for method in methods}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-derive the list from the ballots and bootstrap rank confidence intervals")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="ballot CSV with person/title/rank")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'consensus_rankings.csv'), help="table to write")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS, help="aggregation rules")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES, help="bootstrap resamples (0 to skip)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--level", type=float, default=0.9, help="confidence level of the rank intervals")
+    parser.add_argument("--seed", type=int, default=0, help="bootstrap seed")
+    args = parser.parse_args()
+
+    df = read_dataset(args.csv, columns=['person', 'title', 'rank'])
+    start = time.time()
+    table = consensus_rankings(df, args.methods, args.resamples, args.workers, args.level, seed=args.seed)
+    print(f"Ranked {len(table)} titles by {', '.join(args.methods)} with {args.resamples} resamples "
+          f"in {time.time() - start:.1f}s")
+    for method, rho in agreement(table, args.methods).items():
+        print(f"  {method:8s} Spearman vs published top {CUTOFF}: {rho:.3f}")
+    table.to_csv(args.output, index=False, encoding='utf-8')
+    print(f"Wrote {args.output}")
@@ -0,0 +1,82 @@
+import os
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+from enrichment_index import is_missing
+from storage import NUMBERED_LIST_COLUMNS, write_dataset
+
+# Key under which enrichers attach full credits to checkpointed rows
+CREDITS_KEY = 'credits'
+
+def credits_paths_for(output_path: str) -> Tuple[str, str]:
+    """Return the (credits, people) table paths that go with an enriched CSV"""
+    base = os.path.splitext(output_path)[0]
+    return f"{base}_credits.csv", f"{base}_people.csv"
+
+def movie_id_for(row: Dict) -> str:
+    """Identify a movie by its NYT uniqid, falling back to its title"""
+    uniqid = row.get('uniqid')
+    return str(uniqid) if not is_missing(uniqid) else str(row.get('title', ''))
+
+def credits_from_wide(row: Dict) -> List[Dict]:
+    """Recover credits from the fixed actor_N/director_N slots of an enriched row"""
+    credits = []
+    for prefix in NUMBERED_LIST_COLUMNS.values():
+        role = prefix.rstrip('_')
+        order = 0
+        n = 1
+        while f"{prefix}{n}" in row:
+            name = row[f"{prefix}{n}"]
+            if not is_missing(name):
+                credits.append({'person': str(name), 'role': role, 'order': order})
+                order += 1
+            n += 1
+    return credits
+
+def load_credits(output_path: str) -> Dict[str, List[Dict]]:
+    """Load the credits written by a previous run, keyed by movie_id"""
+    credits_path, people_path = credits_paths_for(output_path)
+    if not (os.path.exists(credits_path) and os.path.exists(people_path)):
+        return {}
+    people = pd.read_csv(people_path).set_index('person_id')['name']
+    credits = pd.read_csv(credits_path, dtype={'movie_id': str})
+    previous: Dict[str, List[Dict]] = {}
+    for movie_id, person_id, role, order in zip(credits['movie_id'], credits['person_id'],
+                                                credits['role'], credits['order']):
+        previous.setdefault(movie_id, []).append({'person': people[person_id], 'role': role, 'order': int(order)})
+    return previous
+
+def build_credits_tables(rows: Iterable[Dict],
+                         previous: Optional[Dict[str, List[Dict]]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Build the long-format credits table and the deduplicated people table
+
+    Rows carry their full credits under CREDITS_KEY. Rows reused from an
+    earlier run don't, so their credits come from the previous tables or,
+    failing that, from the wide columns. Each movie is listed once.
+    """
+    previous = previous or {}
+    person_ids: Dict[str, int] = {}
+    records = []
+    seen = set()
+    for row in rows:
+        movie_id = movie_id_for(row)
+        if movie_id in seen:
+            continue
+        seen.add(movie_id)
+        credits = row.get(CREDITS_KEY)
+        if credits is None:
+            credits = previous.get(movie_id) or credits_from_wide(row)
+        for credit in credits:
+            person_id = person_ids.setdefault(credit['person'], len(person_ids))
+            records.append((movie_id, person_id, credit['role'], credit['order']))
+
+    credits_df = pd.DataFrame(records, columns=['movie_id', 'person_id', 'role', 'order'])
+    people_df = pd.DataFrame({'person_id': list(person_ids.values()), 'name': list(person_ids.keys())})
+    return credits_df, people_df
+
+def write_credits_tables(rows: Iterable[Dict], output_path: str) -> Tuple[int, int]:
+    """Write <output>_credits.csv and <output>_people.csv (plus Parquet copies). Returns their row counts"""
+    credits_df, people_df = build_credits_tables(rows, load_credits(output_path))
+    credits_path, people_path = credits_paths_for(output_path)
+    write_dataset(credits_df, credits_path)
+    write_dataset(people_df, people_path)
+    return len(credits_df), len(people_df)
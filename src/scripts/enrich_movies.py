@@ -1,15 +1,113 @@
-import pandas as pd
-import requests
-import time
 import json
+import hashlib
 import os
-from typing import Dict, Optional, List
+import sys
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, List, Tuple
+from http_cache import cached_get
+from common import DATA_DIR
+from rate_limit import TokenBucket
+from enrichment_index import EnrichmentIndex, forced_matcher, row_year
+from storage import convert_csv, read_records
+from checkpoint import CheckpointWriter, checkpoint_path_for, merge_checkpoint, read_checkpoint, resume_position
+from credits import CREDITS_KEY, write_credits_tables
+import instrument
+from title_resolver import MIN_SCORE, TitleResolver, best_candidate, resolutions_path, year_in
 
 # TMDB API configuration
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
+# TMDB allows roughly 40 requests per second; stay comfortably below that
+DEFAULT_RATE = 20.0
+DEFAULT_BURST = 10
+DEFAULT_WORKERS = 8
+
+# Search result fields kept in the title resolutions file
+SEARCH_FIELDS = ('id', 'title', 'original_title', 'release_date')
+
+# TMDB crew jobs that map onto the roles used by the wide columns; any other
+# job is kept in the credits table under its own (lowercased) name
+CREW_ROLES = {
+    'Director': 'director',
+    'Director of Photography': 'cinematographer',
+    'Producer': 'producer',
+    'Screenplay': 'writer',
+    'Writer': 'writer',
+    'Story': 'writer',
+    'Original Music Composer': 'composer',
+    'Editor': 'editor',
+}
+
+# Sub-resources /movie/{id} can return in the same request via append_to_response
+APPENDABLE = ('credits', 'keywords', 'release_dates', 'external_ids', 'images', 'videos')
+
+# Top-level payload fields each output column reads
+COLUMN_FIELDS = {
+    'tmdb_id': ['id'],
+    'original_title': ['original_title'],
+    'original_language': ['original_language'],
+    'release_date': ['release_date'],
+    'runtime': ['runtime'],
+    'budget': ['budget'],
+    'revenue': ['revenue'],
+    'vote_average': ['vote_average'],
+    'vote_count': ['vote_count'],
+    'popularity': ['popularity'],
+    'overview': ['overview'],
+    'tagline': ['tagline'],
+    'status': ['status'],
+    'adult': ['adult'],
+    'video': ['video'],
+    'backdrop_path': ['backdrop_path'],
+    'poster_path': ['poster_path'],
+    'imdb_id': ['imdb_id'],
+    'homepage': ['homepage'],
+    'wikidata_id': ['external_ids'],
+    'genres': ['genres'],
+    'production_companies': ['production_companies'],
+    'production_countries': ['production_countries'],
+    'spoken_languages': ['spoken_languages'],
+    'keywords': ['keywords'],
+    'us_certification': ['release_dates'],
+    'total_cast_count': ['credits'],
+    'total_crew_count': ['credits'],
+}
+# Columns that each cost an extra sub-resource, off unless asked for
+EXTRA_COLUMNS = ['wikidata_id', 'us_certification']
+# Identifies an enriched row; reruns skip movies whose output row has it
+KEY_COLUMN = 'tmdb_id'
+DEFAULT_COLUMNS = [column for column in COLUMN_FIELDS if column not in EXTRA_COLUMNS]
+
+# Fields kept inside nested payload values: a list of keys for objects (or
+# lists of objects), a dict for deeper nesting. Anything unnamed is dropped.
+NESTED_FIELDS = {
+    'credits': {'cast': ['name'], 'crew': ['name', 'job']},
+    'keywords': {'keywords': ['name']},
+    'release_dates': {'results': ['iso_3166_1', 'release_dates']},
+    'external_ids': ['wikidata_id'],
+    'genres': ['name'],
+    'production_companies': ['name'],
+    'production_countries': ['name'],
+    'spoken_languages': ['name'],
+}
+
+# Names kept per role in the wide director_N/actor_N/... columns, in column order
+ROLE_LIMITS = {
+    'director': 3,
+    'actor': 5,
+    'cinematographer': 2,
+    'producer': 3,
+    'writer': 3,
+    'composer': 2,
+    'editor': 2,
+}
+
 def load_api_key() -> str:
-    """Load TMDB API key from secrets.txt file"""
+    """Load TMDB API key from the TMDB_API_KEY environment variable or secrets.txt file"""
+    if os.environ.get('TMDB_API_KEY'):
+        return os.environ['TMDB_API_KEY']
     try:
         # Get the path to secrets.txt (two levels up from scripts directory)
         secrets_path = os.path.join(os.path.dirname(__file__), '..', '..', 'secrets.txt')
@@ -28,8 +126,13 @@ def load_api_key() -> str:
     except Exception as e:
         raise Exception(f"Error reading API key from secrets.txt: {e}")
 
-def search_movie(title: str, year: Optional[int] = None, api_key: str = None) -> Optional[Dict]:
-    """Search for a movie on TMDB and return the first result"""
+def tmdb_candidate(result: Dict) -> Tuple[List[str], Optional[int]]:
+    """Titles and release year of a TMDB search result, for scoring"""
+    return [result.get('title'), result.get('original_title')], year_in(result.get('release_date'))
+
+def search_candidates(title: str, year: Optional[int] = None, api_key: str = None,
+                      limiter: Optional[TokenBucket] = None) -> List[Dict]:
+    """Search for a movie on TMDB and return the first page of results"""
     if api_key is None:
         api_key = load_api_key()
         
@@ -46,91 +149,150 @@ def search_movie(title: str, year: Optional[int] = None, api_key: str = None) ->
         params['year'] = year
     
     try:
-        response = requests.get(search_url, params=params)
+        response = cached_get(search_url, params=params, limiter=limiter)
         response.raise_for_status()
         data = response.json()
         
-        if data['results']:
-            return data['results'][0]  # Return first result
-        return None
+        return [{field: result.get(field) for field in SEARCH_FIELDS} for result in data['results']]
     except Exception as e:
         print(f"Error searching for '{title}': {e}")
-        return None
+        return []
+
+def search_movie(title: str, year: Optional[int] = None, api_key: str = None,
+                 limiter: Optional[TokenBucket] = None,
+                 resolver: Optional[TitleResolver] = None) -> Optional[Dict]:
+    """Find a movie on TMDB: its recorded match, else the best-scoring search result"""
+    def search(query: str, query_year: Optional[int]) -> List[Dict]:
+        return search_candidates(query, query_year, api_key, limiter)
+
+    if resolver is not None:
+        return resolver.resolve(title, year, search)
+    best, score = best_candidate(title, year, search(title, year), tmdb_candidate)
+    return best if score >= MIN_SCORE else None
+
+def project(value: Any, spec) -> Any:
+    """Keep only the fields `spec` names (see NESTED_FIELDS); None keeps the value whole"""
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, spec) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if isinstance(spec, list):
+        return {key: value[key] for key in spec if key in value}
+    return {key: project(value[key], sub) for key, sub in spec.items() if key in value}
+
+class FetchPlan:
+    """What to request from /movie/{id} for a set of output columns, and which payload fields to keep
+
+    Every sub-resource the columns read is appended to the one details
+    request. Credits are always fetched, since the credits tables and the
+    role columns come from them, and KEY_COLUMN is always written, since
+    reruns find the movies already enriched by it.
+    """
 
-def get_movie_details(movie_id: int, api_key: str = None) -> Optional[Dict]:
-    """Get detailed movie information including credits"""
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = list(columns or DEFAULT_COLUMNS)
+        if KEY_COLUMN not in self.columns:
+            self.columns.insert(0, KEY_COLUMN)
+        unknown = [column for column in self.columns if column not in COLUMN_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown TMDB columns {unknown}, expected some of {list(COLUMN_FIELDS)}")
+        fields = {'credits'}
+        for column in self.columns:
+            fields.update(COLUMN_FIELDS[column])
+        self.append = [resource for resource in APPENDABLE if resource in fields]
+        self.spec = {field: NESTED_FIELDS.get(field) for field in sorted(fields)}
+        self.signature = hashlib.sha256(json.dumps(self.spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def params(self) -> Dict[str, str]:
+        return {'append_to_response': ','.join(self.append)} if self.append else {}
+
+    def project_body(self, body: bytes) -> bytes:
+        """Drop every payload field the columns don't read, before the response is cached"""
+        return json.dumps(project(json.loads(body), self.spec), separators=(',', ':')).encode('utf-8')
+
+def get_movie_details(movie_id: int, api_key: str = None, limiter: Optional[TokenBucket] = None,
+                      plan: Optional[FetchPlan] = None) -> Optional[Dict]:
+    """Get the movie details and every sub-resource `plan` needs in one request"""
     if api_key is None:
         api_key = load_api_key()
+    if plan is None:
+        plan = FetchPlan()
         
-    # Get movie details
     details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-    credits_url = f"{TMDB_BASE_URL}/movie/{movie_id}/credits"
-    
     params = {
         'api_key': api_key,
         'language': 'en-US',
-        'append_to_response': 'credits'
+        **plan.params()
     }
     
     try:
-        response = requests.get(details_url, params=params)
+        response = cached_get(details_url, params=params, limiter=limiter,
+                              project=plan.project_body, variant=plan.signature)
         response.raise_for_status()
         return response.json()
     except Exception as e:
         print(f"Error getting details for movie ID {movie_id}: {e}")
         return None
 
-def extract_movie_info(movie_data: Dict) -> Dict:
-    """Extract relevant information from movie data"""
+def classify_crew(crew: List[Dict], role_limits: Dict[str, int] = None) -> Dict[str, List[str]]:
+    """Bucket crew names by role in a single pass, keeping billing order
+
+    Only roles in `role_limits` are collected, each up to its limit. Jobs
+    outside CREW_ROLES are matched by their lowercased name (e.g. 'casting').
+    """
+    if role_limits is None:
+        role_limits = ROLE_LIMITS
+    buckets: Dict[str, List[str]] = {role: [] for role in role_limits}
+    # Roles that still have room; the scan stops once every bucket is full
+    open_roles = {role for role, limit in role_limits.items() if limit > 0 and role != 'actor'}
+    other_jobs = bool(open_roles - set(CREW_ROLES.values()))
+    for person in crew:
+        if not open_roles:
+            break
+        job = person.get('job')
+        role = CREW_ROLES.get(job)
+        if role is None and other_jobs and job:
+            role = job.lower()
+        if role not in open_roles:
+            continue
+        bucket = buckets[role]
+        bucket.append(person['name'])
+        if len(bucket) >= role_limits[role]:
+            open_roles.discard(role)
+    return buckets
+
+def us_certification(movie_data: Dict) -> str:
+    """The first non-empty US certification in the release_dates sub-resource"""
+    for country in movie_data.get('release_dates', {}).get('results', []):
+        if country.get('iso_3166_1') != 'US':
+            continue
+        for release in country.get('release_dates', []):
+            if release.get('certification'):
+                return release['certification']
+    return ''
+
+def extract_movie_info(movie_data: Dict, role_limits: Dict[str, int] = None,
+                       columns: Optional[List[str]] = None) -> Dict:
+    """Extract relevant information from movie data
+
+    `role_limits` picks which credit roles get wide columns and how many names
+    each keeps (defaults to ROLE_LIMITS); `columns` picks the other columns
+    (defaults to DEFAULT_COLUMNS).
+    """
     if not movie_data:
         return {}
+    if role_limits is None:
+        role_limits = ROLE_LIMITS
+    if columns is None:
+        columns = DEFAULT_COLUMNS
     
-    # Get directors (by billing order)
-    directors = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] == 'Director':
-                directors.append(person['name'])
-    
-    # Get top actors (first 5, by billing order)
-    actors = []
-    if 'credits' in movie_data and 'cast' in movie_data['credits']:
-        actors = [person['name'] for person in movie_data['credits']['cast'][:5]]
-    
-    # Get cinematographers (by billing order)
-    cinematographers = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] == 'Director of Photography':
-                cinematographers.append(person['name'])
-    
-    # Get producers (by billing order)
-    producers = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] == 'Producer':
-                producers.append(person['name'])
+    crew_names = classify_crew(movie_data.get('credits', {}).get('crew', []), role_limits)
     
-    # Get writers (by billing order)
-    writers = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] in ['Screenplay', 'Writer', 'Story']:
-                writers.append(person['name'])
-    
-    # Get composers
-    composers = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] == 'Original Music Composer':
-                composers.append(person['name'])
-    
-    # Get editors
-    editors = []
-    if 'credits' in movie_data and 'crew' in movie_data['credits']:
-        for person in movie_data['credits']['crew']:
-            if person['job'] == 'Editor':
-                editors.append(person['name'])
+    # Top actors by billing order
+    if 'actor' in role_limits:
+        crew_names['actor'] = [person['name'] for person in movie_data.get('credits', {}).get('cast', [])[:role_limits['actor']]]
     
     # Get production companies
     production_companies = []
@@ -152,7 +314,7 @@ def extract_movie_info(movie_data: Dict) -> Dict:
     if 'keywords' in movie_data and 'keywords' in movie_data['keywords']:
         keywords = [keyword['name'] for keyword in movie_data['keywords']['keywords']]
     
-    return {
+    info = {
         'tmdb_id': movie_data.get('id'),
         'original_title': movie_data.get('original_title'),
         'original_language': movie_data.get('original_language'),
@@ -172,89 +334,167 @@ def extract_movie_info(movie_data: Dict) -> Dict:
         'poster_path': movie_data.get('poster_path'),
         'imdb_id': movie_data.get('imdb_id'),
         'homepage': movie_data.get('homepage'),
-        'director_1': directors[0] if len(directors) > 0 else '',
-        'director_2': directors[1] if len(directors) > 1 else '',
-        'director_3': directors[2] if len(directors) > 2 else '',
-        'actor_1': actors[0] if len(actors) > 0 else '',
-        'actor_2': actors[1] if len(actors) > 1 else '',
-        'actor_3': actors[2] if len(actors) > 2 else '',
-        'actor_4': actors[3] if len(actors) > 3 else '',
-        'actor_5': actors[4] if len(actors) > 4 else '',
-        'cinematographer_1': cinematographers[0] if len(cinematographers) > 0 else '',
-        'cinematographer_2': cinematographers[1] if len(cinematographers) > 1 else '',
-        'producer_1': producers[0] if len(producers) > 0 else '',
-        'producer_2': producers[1] if len(producers) > 1 else '',
-        'producer_3': producers[2] if len(producers) > 2 else '',
-        'writer_1': writers[0] if len(writers) > 0 else '',
-        'writer_2': writers[1] if len(writers) > 1 else '',
-        'writer_3': writers[2] if len(writers) > 2 else '',
-        'composer_1': composers[0] if len(composers) > 0 else '',
-        'composer_2': composers[1] if len(composers) > 1 else '',
-        'editor_1': editors[0] if len(editors) > 0 else '',
-        'editor_2': editors[1] if len(editors) > 1 else '',
+        'wikidata_id': movie_data.get('external_ids', {}).get('wikidata_id') or '',
+    }
+    # One fixed column per kept slot (director_1..director_3, ...), blank when unfilled
+    for role, limit in role_limits.items():
+        names = crew_names.get(role, [])
+        for n in range(limit):
+            info[f"{role}_{n + 1}"] = names[n] if n < len(names) else ''
+    info.update({
         'genres': ', '.join([genre['name'] for genre in movie_data.get('genres', [])]),
         'production_companies': ', '.join(production_companies),
         'production_countries': ', '.join(production_countries),
         'spoken_languages': ', '.join(spoken_languages),
         'keywords': ', '.join(keywords[:10]) if keywords else '',  # Limit to first 10 keywords
+        'us_certification': us_certification(movie_data),
         'total_cast_count': len(movie_data.get('credits', {}).get('cast', [])),
         'total_crew_count': len(movie_data.get('credits', {}).get('crew', []))
+    })
+    wanted = set(columns)
+    return {key: value for key, value in info.items() if key in wanted or key not in COLUMN_FIELDS}
+
+def extract_movie_credits(movie_data: Dict) -> List[Dict]:
+    """List every cast and crew credit as {'person', 'role', 'order'}, order counted per role"""
+    if not movie_data:
+        return []
+    credits = []
+    counts: Dict[str, int] = {}
+    seen = set()
+    cast = movie_data.get('credits', {}).get('cast', [])
+    crew = movie_data.get('credits', {}).get('crew', [])
+    people = [(person['name'], 'actor') for person in cast]
+    people += [(person['name'], CREW_ROLES.get(person.get('job'), str(person.get('job', '')).lower())) for person in crew]
+    for name, role in people:
+        # The same person can be credited twice for one role (e.g. Screenplay and Story)
+        if (name, role) in seen:
+            continue
+        seen.add((name, role))
+        credits.append({'person': name, 'role': role, 'order': counts.get(role, 0)})
+        counts[role] = counts.get(role, 0) + 1
+    return credits
+
+def enrich_row(row: Dict, api_key: str, limiter: Optional[TokenBucket] = None,
+               role_limits: Dict[str, int] = None,
+               resolver: Optional[TitleResolver] = None, plan: Optional[FetchPlan] = None) -> Optional[Dict]:
+    """Look up one input row on TMDB. Returns the enriched row, or None if there was no match"""
+    if plan is None:
+        plan = FetchPlan()
+    with instrument.span('tmdb_search'):
+        movie_search = search_movie(row['title'], row_year(row), api_key=api_key, limiter=limiter, resolver=resolver)
+    if not movie_search:
+        return None
+    
+    # Get detailed information
+    with instrument.span('tmdb_details'):
+        movie_details = get_movie_details(movie_search['id'], api_key=api_key, limiter=limiter, plan=plan)
+    with instrument.span('extract'):
+        movie_info = extract_movie_info(movie_details, role_limits, plan.columns)
+    
+    # Combine original data with enriched data
+    return {
+        'rank': row['rank'],
+        'title': row['title'],
+        'img_url': row['img_url'],
+        'uniqid': row['uniqid'],
+        **movie_info,
+        CREDITS_KEY: extract_movie_credits(movie_details)
     }
 
-def enrich_movies_data(csv_path: str, output_path: str, max_movies: int = None):
-    """Enrich movie data with TMDB information"""
+def enrich_rows_ordered(rows: List[Dict], api_key: str, limiter: TokenBucket,
+                        workers: int = DEFAULT_WORKERS,
+                        role_limits: Dict[str, int] = None,
+                        resolver: Optional[TitleResolver] = None,
+                        plan: Optional[FetchPlan] = None) -> Iterator[Optional[Dict]]:
+    """Enrich rows on a thread pool and yield results in input order as they become ready"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = deque()
+        for row in rows:
+            pending.append(executor.submit(enrich_row, row, api_key, limiter, role_limits, resolver, plan))
+            # Keep a bounded window in flight so results stream out in order
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def enrich_movies_data(csv_path: str, output_path: str, max_movies: int = None, reuse_existing: bool = True,
+                       workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                       resume: bool = False, force: Optional[List[str]] = None,
+                       role_limits: Dict[str, int] = None, resolutions: Optional[str] = None,
+                       columns: Optional[List[str]] = None):
+    """Enrich movie data with TMDB information
+
+    Requests are spread over `workers` threads and throttled by a token bucket
+    allowing `rate` requests per second with bursts of up to `burst`. Rows are
+    checkpointed as they finish; resume=True continues from the checkpoint of
+    an interrupted run. Titles or uniqids listed in `force` are looked up again
+    even if the existing output already has them. `role_limits` sets which
+    credit roles get wide columns and how many names each keeps. Titles are
+    matched through the TitleResolver file at `resolutions` (shared with
+    other lists), so only titles it doesn't know are searched for. `columns`
+    picks the TMDB columns; everything they need comes from one request per
+    movie (see FetchPlan).
+    """
     # Load API key once
     api_key = load_api_key()
+    limiter = TokenBucket(rate, burst)
+    resolver = TitleResolver(resolutions or resolutions_path('tmdb'), tmdb_candidate)
+    plan = FetchPlan(columns)
+    print(f"Fetching details with append_to_response={','.join(plan.append)}")
     
     # Load existing data
-    df = pd.read_csv(csv_path)
+    rows = read_records(csv_path)
     
     if max_movies:
-        df = df.head(max_movies)
+        rows = rows[:max_movies]
     
     # Check if enriched file already exists
-    existing_enriched = None
-    if os.path.exists(output_path):
+    existing_index = None
+    if reuse_existing and os.path.exists(output_path):
         try:
-            existing_enriched = pd.read_csv(output_path)
-            print(f"Found existing enriched data with {len(existing_enriched)} movies")
+            existing_index = EnrichmentIndex.load(output_path, KEY_COLUMN)
+            print(f"Found existing enriched data with {len(existing_index)} movies")
         except Exception as e:
             print(f"Could not read existing enriched file: {e}")
+    is_forced = forced_matcher(force)
     
-    enriched_data = []
     processed_count = 0
     skipped_count = 0
     
-    for index, row in df.iterrows():
-        print(f"Processing {index + 1}/{len(df)}: {row['title']}")
-        
-        # Check if this movie is already enriched
-        if existing_enriched is not None:
-            existing_row = existing_enriched[existing_enriched['title'] == row['title']]
-            if not existing_row.empty and pd.notna(existing_row.iloc[0].get('tmdb_id')):
-                print(f"  Skipping {row['title']} - already enriched")
-                enriched_data.append(existing_row.iloc[0].to_dict())
-                skipped_count += 1
-                continue
+    # Split rows into already-enriched ones and ones that need lookups
+    # Pick up where an interrupted run left off
+    checkpoint_path = checkpoint_path_for(output_path)
+    start = resume_position(checkpoint_path, rows) if resume else 0
+    if start:
+        print(f"Resuming after {start} checkpointed movies")
+    
+    reused = {}
+    for index, row in enumerate(rows[start:], start):
+        if existing_index is not None and not is_forced(row):
+            existing_row = existing_index.lookup(row)
+            if existing_row is not None:
+                reused[index] = existing_row
+    
+    to_fetch = [row for index, row in enumerate(rows[start:], start) if index not in reused]
+    results = enrich_rows_ordered(to_fetch, api_key, limiter, workers, role_limits, resolver, plan)
+    
+    writer = CheckpointWriter(checkpoint_path, append=start > 0)
+    for index, row in enumerate(rows[start:], start):
+        print(f"Processing {index + 1}/{len(rows)}: {row['title']}")
         
-        # Search for movie
-        movie_search = search_movie(row['title'], api_key=api_key)
+        if index in reused:
+            print(f"  Skipping {row['title']} - already enriched")
+            writer.write(reused[index])
+            skipped_count += 1
+            instrument.count('rows_total', outcome='reused')
+            continue
         
-        if movie_search:
-            # Get detailed information
-            movie_details = get_movie_details(movie_search['id'], api_key=api_key)
-            movie_info = extract_movie_info(movie_details)
-            
-            # Combine original data with enriched data
-            enriched_row = {
-                'rank': row['rank'],
-                'title': row['title'],
-                'img_url': row['img_url'],
-                'uniqid': row['uniqid'],
-                **movie_info
-            }
+        enriched_row = next(results)
+        if enriched_row is not None:
             processed_count += 1
+            instrument.count('rows_total', outcome='enriched')
         else:
+            instrument.count('rows_total', outcome='unmatched')
             # Keep original data if no match found
             enriched_row = {
                 'rank': row['rank'],
@@ -264,28 +504,55 @@ def enrich_movies_data(csv_path: str, output_path: str, max_movies: int = None):
             }
             print(f"  No TMDB match found for {row['title']}")
         
-        enriched_data.append(enriched_row)
-        
-        # Rate limiting - be nice to the API
-        time.sleep(0.25)  # 4 requests per second
+        writer.write(enriched_row)
+    
+    writer.close()
+    resolver.save()
     
-    # Create new DataFrame and save
-    enriched_df = pd.DataFrame(enriched_data)
-    enriched_df.to_csv(output_path, index=False, encoding='utf-8')
+    # Full credits go to the long-format tables, the wide CSV keeps its fixed columns
+    with instrument.span('write_credits'):
+        credit_count, people_count = write_credits_tables(read_checkpoint(checkpoint_path), output_path)
+    
+    # Stream the checkpoint into the final CSV
+    with instrument.span('write_output'):
+        merge_checkpoint(checkpoint_path, output_path, exclude=[CREDITS_KEY])
+        os.remove(checkpoint_path)
+        convert_csv(output_path)
     print(f"Enriched data saved to {output_path}")
+    print(f"Wrote {credit_count} credits for {people_count} people")
+    print(resolver.summary())
     print(f"Summary: {processed_count} new movies processed, {skipped_count} movies skipped (already enriched)")
 
 if __name__ == "__main__":
-    try:
-        # Test API key loading
-        api_key = load_api_key()
-        print(f"API key loaded successfully (length: {len(api_key)})")
+    parser = argparse.ArgumentParser(description="Enrich the movie list with TMDB details")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="input CSV with title/rank/img_url/uniqid")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'top100_enriched.csv'), help="enriched CSV to write")
+    parser.add_argument("--max-movies", type=int, default=100, help="only enrich the first N rows")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent lookups")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--force", nargs="*", help="titles or uniqids to look up again")
+    parser.add_argument("--columns", nargs="+", choices=list(COLUMN_FIELDS), default=DEFAULT_COLUMNS,
+                        help=f"TMDB columns to write (extras: {', '.join(EXTRA_COLUMNS)})")
+    parser.add_argument("--resolutions", default=resolutions_path('tmdb'), help="confirmed title -> TMDB id mappings")
+    args = parser.parse_args()
+
+    with instrument.run('enrich_movies'):
+        try:
+            # Test API key loading
+            api_key = load_api_key()
+            print(f"API key loaded successfully (length: {len(api_key)})")
         
-        enrich_movies_data(
-            csv_path="src/assets/data/top100.csv",
-            output_path="src/assets/data/top100_enriched.csv",
-            max_movies=100  # Process all 100 movies
-        )
-    except Exception as e:
-        print(f"Error: {e}")
-        print("Please ensure secrets.txt contains: TMDB_API_KEY=your_actual_api_key") 
\ No newline at end of file
+            enrich_movies_data(
+                csv_path=args.csv,
+                output_path=args.output,
+                max_movies=args.max_movies,
+                workers=args.workers,
+                resume=args.resume,
+                force=args.force,
+                resolutions=args.resolutions,
+                columns=args.columns
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+            print("Please ensure secrets.txt contains: TMDB_API_KEY=your_actual_api_key")
+            sys.exit(1)
@@ -1,18 +1,55 @@
-import pandas as pd
-import requests
-import time
-import json
 import os
+import sys
 import re
-from typing import Dict, Optional, List
+import argparse
+from typing import Dict, Optional, List, Tuple
+from http_cache import cached_get
+from common import DATA_DIR
+from rate_limit import TokenBucket
+from enrichment_index import EnrichmentIndex, forced_matcher, row_year
+from storage import convert_csv, read_records
+from checkpoint import CheckpointWriter, checkpoint_path_for, merge_checkpoint, read_checkpoint, resume_position
+from credits import CREDITS_KEY, write_credits_tables
+from title_resolver import MIN_SCORE, TitleResolver, best_candidate, resolutions_path, split_qualifier, year_in
+import infobox_parser
+import instrument
 from urllib.parse import quote
 
 # Wikipedia API configuration
 WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
-WIKIPEDIA_SEARCH_URL = "https://en.wikipedia.org/w/api.php"
 
-def search_movie_wikipedia(title: str, year: Optional[int] = None) -> Optional[Dict]:
-    """Search for a movie on Wikipedia and return the first result"""
+# MediaWiki accepts up to 50 titles per query
+BATCH_SIZE = 50
+BATCH_RATE = 2.0  # requests per second in batch mode
+SINGLE_RATE = 3.0  # requests per second one movie at a time: about one movie (three requests) per second
+
+INFOBOX_FIELDS = [
+    'director', 'producer', 'writer', 'screenplay', 'story', 'starring', 'music',
+    'cinematography', 'editing', 'production_company', 'distributor', 'release_date',
+    'running_time', 'country', 'language', 'budget', 'box_office', 'genre', 'rating'
+]
+
+# Infobox fields listing people, and the credit role each one maps to
+INFOBOX_ROLES = [
+    ('starring', 'actor'),
+    ('director', 'director'),
+    ('writer', 'writer'),
+    ('screenplay', 'writer'),
+    ('story', 'writer'),
+    ('producer', 'producer'),
+    ('cinematography', 'cinematographer'),
+    ('music', 'composer'),
+    ('editing', 'editor'),
+]
+
+def wikipedia_candidate(hit: Dict) -> Tuple[List[str], Optional[int]]:
+    """Page title and year of a Wikipedia search hit, for scoring"""
+    _, qualifier = split_qualifier(hit['title'])
+    return [hit['title']], year_in(qualifier) or year_in(hit.get('snippet'))
+
+def search_candidates(title: str, year: Optional[int] = None,
+                      limiter: Optional[TokenBucket] = None) -> List[Dict]:
+    """Search Wikipedia for a movie and return the hits ({'title', 'snippet'}) that could be film articles"""
     search_params = {
         'action': 'query',
         'format': 'json',
@@ -26,55 +63,264 @@ def search_movie_wikipedia(title: str, year: Optional[int] = None) -> Optional[D
         search_params['srsearch'] += f" {year}"
     
     try:
-        response = requests.get(WIKIPEDIA_SEARCH_URL, params=search_params)
+        response = cached_get(WIKIPEDIA_API_URL, params=search_params, limiter=limiter)
         response.raise_for_status()
         data = response.json()
         
-        if data['query']['search']:
-            # Get the first result
-            first_result = data['query']['search'][0]
-            
-            # Get detailed page info
-            page_title = first_result['title']
-            page_url = f"https://en.wikipedia.org/wiki/{quote(page_title)}"
-            
-            # Get page content using MediaWiki API
-            content_params = {
-                'action': 'query',
-                'format': 'json',
-                'prop': 'extracts|pageimages',
-                'titles': page_title,
-                'exintro': True,
-                'explaintext': True,
-                'piprop': 'original'
-            }
-            
-            content_response = requests.get(WIKIPEDIA_API_URL, params=content_params)
-            content_response.raise_for_status()
-            content_data = content_response.json()
-            
-            # Extract content from the response
-            pages = content_data['query']['pages']
-            page_id = list(pages.keys())[0]
-            page_info = pages[page_id]
-            
-            # Get infobox data
-            infobox_data = get_infobox_data(page_title)
-            
-            return {
-                'title': page_title,
-                'url': page_url,
-                'extract': first_result.get('snippet', ''),
-                'content': page_info.get('extract', ''),
-                'image_url': page_info.get('original', {}).get('source', ''),
-                'infobox': infobox_data
-            }
+        hits = []
+        for hit in data['query']['search']:
+            # "Amour (novel)" can't be the film; unqualified pages and "(2012 film)" can
+            qualifier = split_qualifier(hit['title'])[1]
+            if not qualifier or 'film' in qualifier.lower():
+                hits.append({'title': hit['title'], 'snippet': hit.get('snippet', '')})
+        return hits
+    except Exception as e:
+        print(f"Error searching for '{title}': {e}")
+        return []
+
+def resolve_wikipedia_title(title: str, year: Optional[int] = None, limiter: Optional[TokenBucket] = None,
+                            resolver: Optional[TitleResolver] = None) -> Optional[Dict]:
+    """Find a movie's Wikipedia page: its recorded match, else the best-scoring search hit"""
+    def search(query: str, query_year: Optional[int]) -> List[Dict]:
+        return search_candidates(query, query_year, limiter)
+
+    if resolver is not None:
+        return resolver.resolve(title, year, search)
+    best, score = best_candidate(title, year, search(title, year), wikipedia_candidate)
+    return best if score >= MIN_SCORE else None
+
+def search_movie_wikipedia(title: str, year: Optional[int] = None, resolver: Optional[TitleResolver] = None,
+                           limiter: Optional[TokenBucket] = None) -> Optional[Dict]:
+    """Search for a movie on Wikipedia and return its page details"""
+    first_result = resolve_wikipedia_title(title, year, limiter, resolver)
+    if not first_result:
         return None
+    
+    try:
+        # Get detailed page info
+        page_title = first_result['title']
+        page_url = f"https://en.wikipedia.org/wiki/{quote(page_title)}"
+        
+        # Get page content using MediaWiki API
+        content_params = {
+            'action': 'query',
+            'format': 'json',
+            'prop': 'extracts|pageimages',
+            'titles': page_title,
+            'exintro': True,
+            'explaintext': True,
+            'piprop': 'original'
+        }
+        
+        content_response = cached_get(WIKIPEDIA_API_URL, params=content_params, limiter=limiter)
+        content_response.raise_for_status()
+        content_data = content_response.json()
+        
+        # Extract content from the response
+        pages = content_data['query']['pages']
+        page_id = list(pages.keys())[0]
+        page_info = pages[page_id]
+        
+        # Get infobox data
+        infobox_data = get_infobox_data(page_title, limiter)
+        
+        return {
+            'title': page_title,
+            'url': page_url,
+            'extract': first_result.get('snippet', ''),
+            'content': page_info.get('extract', ''),
+            'image_url': page_info.get('original', {}).get('source', ''),
+            'infobox': infobox_data
+        }
     except Exception as e:
         print(f"Error searching for '{title}': {e}")
         return None
 
-def get_infobox_data(page_title: str) -> Dict:
+def follow_aliases(aliases: Dict[str, str], title: str) -> str:
+    """Follow a query's normalization then redirect mappings (at most two hops)"""
+    final = aliases.get(title, title)
+    return aliases.get(final, final)
+
+def query_pages(params: Dict, limiter: Optional[TokenBucket] = None) -> Tuple[List[Dict], Dict[str, str]]:
+    """Run a formatversion=2 titles query, following continuation
+
+    Returns the page objects of every response and the normalized/redirect
+    title mappings.
+    """
+    pages = []
+    aliases = {}
+    continuation = {}
+    while True:
+        response = cached_get(WIKIPEDIA_API_URL, params={**params, **continuation}, limiter=limiter)
+        response.raise_for_status()
+        data = response.json()
+        query = data.get('query', {})
+        
+        for mapping in query.get('normalized', []) + query.get('redirects', []):
+            aliases[mapping['from']] = mapping['to']
+        pages.extend(query.get('pages', []))
+        
+        if 'continue' not in data:
+            break
+        continuation = data['continue']
+    return pages, aliases
+
+def page_names(title: str, year: Optional[int] = None) -> List[str]:
+    """Page names a film is likely to be listed under, most specific first"""
+    names = [f"{title} ({year} film)"] if year else []
+    return names + [f"{title} (film)", title]
+
+def lookup_titles_batch(titles: List[str], years: List[Optional[int]],
+                        limiter: Optional[TokenBucket] = None) -> Dict[int, Dict]:
+    """Resolve titles by page name instead of searching, BATCH_SIZE names per query
+
+    Each title is tried as "Title (year film)", "Title (film)" and "Title",
+    following redirects. The first existing page that isn't a disambiguation
+    page, describes a film (unqualified names only) and scores MIN_SCORE
+    against the title wins. Returns {index: {'title', 'snippet'}} for the
+    titles found; the rest still need a search.
+    """
+    candidates = [page_names(title, year) for title, year in zip(titles, years)]
+    names = list(dict.fromkeys(name for names in candidates for name in names))
+    params = {
+        'action': 'query',
+        'format': 'json',
+        'formatversion': 2,
+        'prop': 'description|pageprops',
+        'ppprop': 'disambiguation',
+        'redirects': 1,
+    }
+    
+    pages = {}
+    aliases = {}
+    for start in range(0, len(names), BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        try:
+            found, batch_aliases = query_pages({**params, 'titles': '|'.join(batch)}, limiter)
+        except Exception as e:
+            print(f"Error looking up Wikipedia pages {start + 1}-{start + len(batch)}: {e}")
+            continue
+        aliases.update(batch_aliases)
+        for page in found:
+            if not page.get('missing') and 'disambiguation' not in page.get('pageprops', {}):
+                pages[page['title']] = page
+    
+    results = {}
+    for index, (title, year) in enumerate(zip(titles, years)):
+        for name in candidates[index]:
+            page = pages.get(follow_aliases(aliases, name))
+            if page is None:
+                continue
+            description = page.get('description', '')
+            if name == title and 'film' not in description.lower():
+                continue
+            hit = {'title': page['title'], 'snippet': description}
+            if best_candidate(title, year, [hit], wikipedia_candidate)[1] >= MIN_SCORE:
+                results[index] = hit
+                break
+    return results
+
+def fetch_pages_batch(page_titles: List[str], limiter: Optional[TokenBucket] = None) -> Dict[str, Dict]:
+    """Fetch intro extract, lead image and section 0 wikitext for up to BATCH_SIZE pages in one query
+
+    Follows API continuation (extracts are capped at 20 per response) and maps
+    each requested title through normalization/redirects. Returns
+    {requested title: {'content', 'image_url', 'wikitext'}}.
+    """
+    params = {
+        'action': 'query',
+        'format': 'json',
+        'formatversion': 2,
+        'prop': 'extracts|pageimages|revisions',
+        'titles': '|'.join(page_titles),
+        'redirects': 1,
+        'exintro': True,
+        'explaintext': True,
+        'exlimit': 'max',
+        'piprop': 'original',
+        'pilimit': 'max',
+        'rvprop': 'content',
+        'rvslots': 'main',
+        'rvsection': 0
+    }
+    
+    pages = {}
+    found, aliases = query_pages(params, limiter)
+    # Continued responses repeat pages with the properties the earlier ones lacked
+    for page in found:
+        merged = pages.setdefault(page['title'], {'content': '', 'image_url': '', 'wikitext': ''})
+        if page.get('extract'):
+            merged['content'] = page['extract']
+        if page.get('original'):
+            merged['image_url'] = page['original'].get('source', '')
+        if page.get('revisions'):
+            merged['wikitext'] = page['revisions'][0]['slots']['main'].get('content', '')
+    
+    results = {}
+    for title in page_titles:
+        final = follow_aliases(aliases, title)
+        if final in pages:
+            results[title] = pages[final]
+    return results
+
+def search_movies_wikipedia_batch(titles: List[str], limiter: Optional[TokenBucket] = None,
+                                  years: Optional[List[Optional[int]]] = None,
+                                  resolver: Optional[TitleResolver] = None) -> List[Optional[Dict]]:
+    """Batched equivalent of search_movie_wikipedia for a list of movie titles
+
+    Titles the resolver doesn't know are first looked up by page name,
+    BATCH_SIZE names per request (see lookup_titles_batch); only the misses
+    are searched for, one search each. Page content and infoboxes are then
+    fetched BATCH_SIZE pages per request.
+    """
+    years = years or [None] * len(titles)
+    unknown = [index for index, (title, year) in enumerate(zip(titles, years))
+               if resolver is None or resolver.lookup(title, year) is None]
+    with instrument.span('wikipedia_titles'):
+        by_name = lookup_titles_batch([titles[i] for i in unknown], [years[i] for i in unknown], limiter)
+    named = {unknown[i]: hit for i, hit in by_name.items()}
+    if unknown:
+        print(f"Found {len(named)}/{len(unknown)} pages by title, searching for the rest")
+    
+    resolved = []
+    with instrument.span('wikipedia_search'):
+        for index, (title, year) in enumerate(zip(titles, years)):
+            hit = named.get(index)
+            if hit is None:
+                hit = resolve_wikipedia_title(title, year, limiter, resolver)
+            elif resolver is not None:
+                resolver.record(title, year, hit, best_candidate(title, year, [hit], wikipedia_candidate)[1])
+            resolved.append(hit)
+    page_titles = list(dict.fromkeys(hit['title'] for hit in resolved if hit))
+    
+    pages = {}
+    for start in range(0, len(page_titles), BATCH_SIZE):
+        batch = page_titles[start:start + BATCH_SIZE]
+        try:
+            with instrument.span('wikipedia_pages'):
+                pages.update(fetch_pages_batch(batch, limiter=limiter))
+        except Exception as e:
+            print(f"Error fetching Wikipedia pages {start + 1}-{start + len(batch)}: {e}")
+    
+    results = []
+    for hit in resolved:
+        if not hit or hit['title'] not in pages:
+            results.append(None)
+            continue
+        page = pages[hit['title']]
+        with instrument.span('parse_infobox'):
+            infobox = parse_infobox(page['wikitext'])
+        results.append({
+            'title': hit['title'],
+            'url': f"https://en.wikipedia.org/wiki/{quote(hit['title'])}",
+            'extract': hit.get('snippet', ''),
+            'content': page['content'],
+            'image_url': page['image_url'],
+            'infobox': infobox
+        })
+    return results
+
+def get_infobox_data(page_title: str, limiter: Optional[TokenBucket] = None) -> Dict:
     """Extract infobox data from Wikipedia page"""
     try:
         # Get page content with infobox
@@ -87,7 +333,7 @@ def get_infobox_data(page_title: str) -> Dict:
             'rvsection': 0
         }
         
-        response = requests.get(WIKIPEDIA_API_URL, params=params)
+        response = cached_get(WIKIPEDIA_API_URL, params=params, limiter=limiter)
         response.raise_for_status()
         data = response.json()
         
@@ -95,83 +341,14 @@ def get_infobox_data(page_title: str) -> Dict:
         page_id = list(pages.keys())[0]
         content = pages[page_id]['revisions'][0]['*']
         
-        # Extract infobox data
-        infobox_data = {}
-        
-        # Extract basic info
-        infobox_data['director'] = extract_infobox_field(content, 'director')
-        infobox_data['producer'] = extract_infobox_field(content, 'producer')
-        infobox_data['writer'] = extract_infobox_field(content, 'writer')
-        infobox_data['screenplay'] = extract_infobox_field(content, 'screenplay')
-        infobox_data['story'] = extract_infobox_field(content, 'story')
-        infobox_data['starring'] = extract_infobox_field(content, 'starring')
-        infobox_data['music'] = extract_infobox_field(content, 'music')
-        infobox_data['cinematography'] = extract_infobox_field(content, 'cinematography')
-        infobox_data['editing'] = extract_infobox_field(content, 'editing')
-        infobox_data['production_company'] = extract_infobox_field(content, 'production_company')
-        infobox_data['distributor'] = extract_infobox_field(content, 'distributor')
-        infobox_data['release_date'] = extract_infobox_field(content, 'release_date')
-        infobox_data['running_time'] = extract_infobox_field(content, 'running_time')
-        infobox_data['country'] = extract_infobox_field(content, 'country')
-        infobox_data['language'] = extract_infobox_field(content, 'language')
-        infobox_data['budget'] = extract_infobox_field(content, 'budget')
-        infobox_data['box_office'] = extract_infobox_field(content, 'box_office')
-        infobox_data['genre'] = extract_infobox_field(content, 'genre')
-        infobox_data['rating'] = extract_infobox_field(content, 'rating')
-        
-        return infobox_data
+        return parse_infobox(content)
     except Exception as e:
         print(f"Error getting infobox data for '{page_title}': {e}")
         return {}
 
-def extract_infobox_field(content: str, field_name: str) -> str:
-    """Extract a specific field from Wikipedia infobox"""
-    try:
-        # Look for infobox patterns with better regex
-        patterns = [
-            rf'\|\s*{field_name}\s*=\s*(.*?)(?:\n\||\n\}}|\n\|\}}|\n\|\s*\w+\s*=)',
-            rf'\|\s*{field_name}\s*=\s*(.*?)(?:\n\||\n\}}|\n\|\}})',
-            rf'{field_name}\s*=\s*(.*?)(?:\n\||\n\}}|\n\|\}})'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, content, re.IGNORECASE | re.DOTALL)
-            if match:
-                value = match.group(1).strip()
-                
-                # Clean up the value more thoroughly
-                # Remove HTML tags
-                value = re.sub(r'<[^>]+>', '', value)
-                
-                # Remove ref tags and their content
-                value = re.sub(r'<ref[^>]*>.*?</ref>', '', value, flags=re.DOTALL)
-                value = re.sub(r'<ref[^>]*/>', '', value)
-                
-                # Remove citation needed
-                value = re.sub(r'\{\{citation needed[^}]*\}\}', '', value)
-                
-                # Handle Wikipedia links - extract the display text
-                value = re.sub(r'\[\[([^|\]]+)\]\]', r'\1', value)  # Simple links
-                value = re.sub(r'\[\[([^|]+)\|([^\]]+)\]\]', r'\2', value)  # Links with display text
-                
-                # Handle templates - try to extract meaningful content
-                value = re.sub(r'\{\{plainlist\|\s*([^}]+)\}\}', r'\1', value)
-                value = re.sub(r'\{\{plainlist\|\s*([^}]+)\}\}', r'\1', value)
-                value = re.sub(r'\{\{([^}]+)\}\}', r'\1', value)
-                
-                # Remove extra whitespace and newlines
-                value = re.sub(r'\s+', ' ', value)
-                value = value.strip()
-                
-                # Remove leading/trailing punctuation
-                value = re.sub(r'^[,\s*]+|[,\s*]+$', '', value)
-                
-                return value
-        
-        return ""
-    except Exception as e:
-        print(f"Error extracting field '{field_name}': {e}")
-        return ""
+def parse_infobox(content: str) -> Dict:
+    """Extract the infobox fields used by extract_movie_info_wikipedia from section 0 wikitext"""
+    return infobox_parser.parse_infobox(content, INFOBOX_FIELDS)
 
 def clean_list_item(item: str) -> str:
     """Clean up a single list item from Wikipedia markup"""
@@ -409,45 +586,103 @@ def extract_movie_info_wikipedia(wiki_data: Dict) -> Dict:
         'total_crew_count': len(directors) + len(writers) + len(producers) + len(cinematographers) + len(composers) + len(editors)
     }
 
-def enrich_movies_data_wikipedia(csv_path: str, output_path: str, max_movies: int = None):
-    """Enrich movie data with Wikipedia information"""
+def extract_movie_credits_wikipedia(wiki_data: Dict) -> List[Dict]:
+    """List every infobox credit as {'person', 'role', 'order'}, order counted per role"""
+    if not wiki_data:
+        return []
+    infobox = wiki_data.get('infobox', {})
+    credits = []
+    counts: Dict[str, int] = {}
+    seen = set()
+    for field, role in INFOBOX_ROLES:
+        for raw in re.split(r'[,\n]', infobox.get(field, '') or ''):
+            name = clean_list_item(raw)
+            if not name or (name, role) in seen:
+                continue
+            seen.add((name, role))
+            credits.append({'person': name, 'role': role, 'order': counts.get(role, 0)})
+            counts[role] = counts.get(role, 0) + 1
+    return credits
+
+def enrich_movies_data_wikipedia(csv_path: str, output_path: str, max_movies: int = None, reuse_existing: bool = True,
+                                 batch: bool = False, resume: bool = False,
+                                 force: Optional[List[str]] = None, resolutions: Optional[str] = None):
+    """Enrich movie data with Wikipedia information
+
+    With batch=True titles are resolved first and page content/infoboxes are
+    fetched BATCH_SIZE pages per request instead of three requests per movie.
+    Rows are checkpointed as they finish; resume=True continues from the
+    checkpoint of an interrupted run. Titles or uniqids listed in `force` are
+    looked up again even if the existing output already has them. Titles are
+    matched through the TitleResolver file at `resolutions`, so only titles
+    it doesn't know are searched for.
+    """
+    resolver = TitleResolver(resolutions or resolutions_path('wikipedia'), wikipedia_candidate)
+    
     # Load existing data
-    df = pd.read_csv(csv_path)
+    rows = read_records(csv_path)
     
     if max_movies:
-        df = df.head(max_movies)
+        rows = rows[:max_movies]
     
     # Check if enriched file already exists
-    existing_enriched = None
-    if os.path.exists(output_path):
+    existing_index = None
+    if reuse_existing and os.path.exists(output_path):
         try:
-            existing_enriched = pd.read_csv(output_path)
-            print(f"Found existing enriched data with {len(existing_enriched)} movies")
+            existing_index = EnrichmentIndex.load(output_path, 'wikipedia_title')
+            print(f"Found existing enriched data with {len(existing_index)} movies")
         except Exception as e:
             print(f"Could not read existing enriched file: {e}")
+    is_forced = forced_matcher(force)
     
-    enriched_data = []
     processed_count = 0
     skipped_count = 0
     
-    for index, row in df.iterrows():
-        print(f"Processing {index + 1}/{len(df)}: {row['title']}")
+    # Check which movies are already enriched
+    # Pick up where an interrupted run left off
+    checkpoint_path = checkpoint_path_for(output_path)
+    start = resume_position(checkpoint_path, rows) if resume else 0
+    if start:
+        print(f"Resuming after {start} checkpointed movies")
+    
+    reused = {}
+    for index, row in enumerate(rows[start:], start):
+        if existing_index is not None and not is_forced(row):
+            existing_row = existing_index.lookup(row)
+            if existing_row is not None:
+                reused[index] = existing_row
+    
+    batch_results = {}
+    limiter = TokenBucket(BATCH_RATE if batch else SINGLE_RATE, 1)
+    if batch:
+        to_fetch = [index for index in range(start, len(rows)) if index not in reused]
+        print(f"Looking up {len(to_fetch)} movies in batches of {BATCH_SIZE}")
+        found = search_movies_wikipedia_batch([rows[index]['title'] for index in to_fetch], limiter=limiter,
+                                              years=[row_year(rows[index]) for index in to_fetch], resolver=resolver)
+        batch_results = dict(zip(to_fetch, found))
+    
+    writer = CheckpointWriter(checkpoint_path, append=start > 0)
+    for index, row in enumerate(rows[start:], start):
+        print(f"Processing {index + 1}/{len(rows)}: {row['title']}")
         
-        # Check if this movie is already enriched
-        if existing_enriched is not None:
-            existing_row = existing_enriched[existing_enriched['title'] == row['title']]
-            if not existing_row.empty and pd.notna(existing_row.iloc[0].get('wikipedia_title')):
-                print(f"  Skipping {row['title']} - already enriched")
-                enriched_data.append(existing_row.iloc[0].to_dict())
-                skipped_count += 1
-                continue
+        if index in reused:
+            print(f"  Skipping {row['title']} - already enriched")
+            writer.write(reused[index])
+            skipped_count += 1
+            instrument.count('rows_total', outcome='reused')
+            continue
         
         # Search for movie on Wikipedia
-        wiki_data = search_movie_wikipedia(row['title'])
+        if batch:
+            wiki_data = batch_results[index]
+        else:
+            with instrument.span('wikipedia_lookup'):
+                wiki_data = search_movie_wikipedia(row['title'], row_year(row), resolver=resolver, limiter=limiter)
         
         if wiki_data:
             # Extract information
-            movie_info = extract_movie_info_wikipedia(wiki_data)
+            with instrument.span('extract'):
+                movie_info = extract_movie_info_wikipedia(wiki_data)
             
             # Combine original data with enriched data
             enriched_row = {
@@ -455,10 +690,13 @@ def enrich_movies_data_wikipedia(csv_path: str, output_path: str, max_movies: in
                 'title': row['title'],
                 'img_url': row['img_url'],
                 'uniqid': row['uniqid'],
-                **movie_info
+                **movie_info,
+                CREDITS_KEY: extract_movie_credits_wikipedia(wiki_data)
             }
             processed_count += 1
+            instrument.count('rows_total', outcome='enriched')
         else:
+            instrument.count('rows_total', outcome='unmatched')
             # Keep original data if no match found
             enriched_row = {
                 'rank': row['rank'],
@@ -468,25 +706,49 @@ def enrich_movies_data_wikipedia(csv_path: str, output_path: str, max_movies: in
             }
             print(f"  No Wikipedia match found for {row['title']}")
         
-        enriched_data.append(enriched_row)
-        
-        # Rate limiting - be nice to Wikipedia
-        time.sleep(1)  # 1 request per second
+        writer.write(enriched_row)
+    
+    writer.close()
+    resolver.save()
+    
+    # Full credits go to the long-format tables, the wide CSV keeps its fixed columns
+    with instrument.span('write_credits'):
+        credit_count, people_count = write_credits_tables(read_checkpoint(checkpoint_path), output_path)
     
-    # Create new DataFrame and save
-    enriched_df = pd.DataFrame(enriched_data)
-    enriched_df.to_csv(output_path, index=False, encoding='utf-8')
+    # Stream the checkpoint into the final CSV
+    with instrument.span('write_output'):
+        merge_checkpoint(checkpoint_path, output_path, exclude=[CREDITS_KEY])
+        os.remove(checkpoint_path)
+        convert_csv(output_path)
     print(f"Enriched data saved to {output_path}")
+    print(f"Wrote {credit_count} credits for {people_count} people")
+    print(resolver.summary())
     print(f"Summary: {processed_count} new movies processed, {skipped_count} movies skipped (already enriched)")
 
 if __name__ == "__main__":
-    try:
-        print("Starting Wikipedia movie enrichment...")
+    parser = argparse.ArgumentParser(description="Enrich the movie list with Wikipedia details")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="input CSV with title/rank/img_url/uniqid")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'top100_wikipedia_enriched.csv'), help="enriched CSV to write")
+    parser.add_argument("--max-movies", type=int, default=10, help="only enrich the first N rows")
+    parser.add_argument("--batch", action="store_true", help=f"fetch pages {BATCH_SIZE} at a time")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--force", nargs="*", help="titles or uniqids to look up again")
+    parser.add_argument("--resolutions", default=resolutions_path('wikipedia'), help="confirmed title -> page mappings")
+    args = parser.parse_args()
+
+    with instrument.run('enrich_movies_wikipedia'):
+        try:
+            print("Starting Wikipedia movie enrichment...")
         
-        enrich_movies_data_wikipedia(
-            csv_path="src/assets/data/top100.csv",
-            output_path="src/assets/data/top100_wikipedia_enriched.csv",
-            max_movies=10  # Start with 10 movies for testing
-        )
-    except Exception as e:
-        print(f"Error: {e}") 
\ No newline at end of file
+            enrich_movies_data_wikipedia(
+                csv_path=args.csv,
+                output_path=args.output,
+                max_movies=args.max_movies,
+                batch=args.batch,
+                resume=args.resume,
+                force=args.force,
+                resolutions=args.resolutions
+            )
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
@@ -0,0 +1,99 @@
+import csv
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+NON_ALNUM = re.compile(r'[^\w]+')
+YEAR = re.compile(r'\b(1[89]\d\d|20\d\d)\b')
+
+def is_missing(value) -> bool:
+    """True for None, NaN and blank strings"""
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return isinstance(value, str) and not value.strip()
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for matching: NFKC, casefold, punctuation and extra whitespace removed"""
+    title = unicodedata.normalize('NFKC', str(title)).casefold()
+    return NON_ALNUM.sub(' ', title).strip()
+
+def row_year(row: Dict) -> Optional[int]:
+    """Best-effort release year from a 'year' or 'release_date' column"""
+    for column in ('year', 'release_date'):
+        value = row.get(column)
+        if is_missing(value):
+            continue
+        match = YEAR.search(str(value))
+        if match:
+            return int(match.group(1))
+    return None
+
+def row_key(row: Dict) -> Tuple:
+    """Composite identity of a movie row: its uniqid, else normalized title + year"""
+    uniqid = row.get('uniqid')
+    if not is_missing(uniqid):
+        return ('uniqid', str(uniqid))
+    return ('title', normalize_title(row.get('title', '')), row_year(row))
+
+class EnrichmentIndex:
+    """Prior enrichment results keyed by uniqid and by normalized title, for O(1) skip checks"""
+
+    def __init__(self, rows: Iterable[Dict], required_column: str):
+        self.by_uniqid: Dict[str, Dict] = {}
+        self.by_title: Dict[str, List[Dict]] = {}
+        self.size = 0
+        for row in rows:
+            # Only rows that actually got enriched count as done
+            if is_missing(row.get(required_column)):
+                continue
+            self.size += 1
+            uniqid = row.get('uniqid')
+            if not is_missing(uniqid):
+                self.by_uniqid.setdefault(str(uniqid), row)
+            self.by_title.setdefault(normalize_title(row.get('title', '')), []).append(row)
+
+    @classmethod
+    def load(cls, path: str, required_column: str) -> "EnrichmentIndex":
+        """Read a previous enriched CSV once and index it"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return cls(csv.DictReader(f), required_column)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(self, row: Dict) -> Optional[Dict]:
+        """Return the prior result for an input row, or None if unknown or ambiguous"""
+        key = row_key(row)
+        if key[0] == 'uniqid':
+            found = self.by_uniqid.get(key[1])
+            if found is not None:
+                return found
+        candidates = self.by_title.get(normalize_title(row.get('title', '')), [])
+        year = row_year(row)
+        if year is not None:
+            candidates = [c for c in candidates if row_year(c) in (year, None)]
+        if key[0] == 'uniqid':
+            # A different uniqid means a different movie with the same title
+            candidates = [c for c in candidates if is_missing(c.get('uniqid'))]
+        # Same-name films we can't tell apart get looked up again
+        return candidates[0] if len(candidates) == 1 else None
+
+def forced_matcher(force: Optional[Iterable[str]]):
+    """Build a predicate for rows to re-enrich, given titles and/or uniqids"""
+    wanted = set()
+    for value in force or []:
+        wanted.add(str(value))
+        wanted.add(normalize_title(value))
+
+    def is_forced(row: Dict) -> bool:
+        if not wanted:
+            return False
+        uniqid = row.get('uniqid')
+        if not is_missing(uniqid) and str(uniqid) in wanted:
+            return True
+        return normalize_title(row.get('title', '')) in wanted
+
+    return is_forced
@@ -0,0 +1,71 @@
+import os
+import gzip
+import json
+import argparse
+import pandas as pd
+from typing import Dict
+from build_overlap_index import build_overlap_index
+from common import DATA_DIR
+from storage import read_dataset
+
+BUNDLE_VERSION = 1
+
+def build_bundle(df: pd.DataFrame) -> Dict:
+    """Dictionary-encode the ballot CSV for the page
+
+    People, jobs and titles are interned tables; each ballot row becomes three
+    integers (person id, title id, rank) in one flat array. Poster URLs are
+    stored as a template when every row follows it, otherwise per title.
+    """
+    index = build_overlap_index(df)
+    person_ids = {name: i for i, name in enumerate(index['people'])}
+    title_ids = {title: i for i, title in enumerate(index['titles'])}
+
+    ballots = []
+    for person, title, rank in zip(df['person'], df['title'], df['rank']):
+        ballots.extend((person_ids[person], title_ids[title], int(rank)))
+
+    first = df.drop_duplicates('title').set_index('title')
+    uniqids = [first.at[title, 'uniqid'] for title in index['titles']]
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'people': index['people'],
+        'jobs': index['jobs'],
+        'person_jobs': index['person_jobs'],
+        'titles': index['titles'],
+        'uniqids': uniqids,
+        'ballots': ballots,
+    }
+
+    sample = df.iloc[0]
+    template = sample['img_url'].replace(sample['uniqid'], '{uniqid}')
+    if all(url == template.format(uniqid=uid) for url, uid in zip(df['img_url'], df['uniqid'])):
+        bundle['img_url_template'] = template
+    else:
+        bundle['img_urls'] = [first.at[title, 'img_url'] for title in index['titles']]
+    return bundle
+
+def encode_bundle(bundle: Dict) -> bytes:
+    """Serialize a bundle as compact UTF-8 JSON, the bytes written to bundle.json"""
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def report(csv_path: str, raw_bundle: bytes):
+    """Print raw and gzipped sizes of the CSV against the bundle"""
+    with open(csv_path, 'rb') as f:
+        raw_csv = f.read()
+    print(f"{'':10s}{'raw':>10s}{'gzip':>10s}")
+    print(f"{'csv':10s}{len(raw_csv) / 1024:9.1f}K{len(gzip.compress(raw_csv)) / 1024:9.1f}K")
+    print(f"{'bundle':10s}{len(raw_bundle) / 1024:9.1f}K{len(gzip.compress(raw_bundle)) / 1024:9.1f}K")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the dictionary-encoded data bundle loaded by index.html")
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, 'top100.csv'), help="ballot CSV with person/title/job")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'bundle.json'), help="where to write the bundle")
+    args = parser.parse_args()
+
+    df = read_dataset(args.csv)
+    raw = encode_bundle(build_bundle(df))
+    with open(args.output, 'wb') as f:
+        f.write(raw)
+    print(f"Wrote {args.output}")
+    report(args.csv, raw)
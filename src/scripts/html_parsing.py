@@ -0,0 +1,59 @@
+import re
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import List, Optional
+import instrument
+
+try:
+    import lxml  # noqa: F401  (BeautifulSoup tree builder)
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+PARSERS = ['html.parser', 'lxml', 'selectolax']
+DEFAULT_PARSER = 'lxml' if HAS_LXML else 'html.parser'
+USER_AGENT = "Mozilla/5.0"
+
+def available_parsers() -> List[str]:
+    """Backends usable in this environment"""
+    installed = {'html.parser': True, 'lxml': HAS_LXML, 'selectolax': HAS_SELECTOLAX}
+    return [name for name in PARSERS if installed[name]]
+
+def class_strainer(tags: List[str], classes: List[str]) -> SoupStrainer:
+    """Only build elements whose class list contains one of `classes`
+
+    SoupStrainer sees the raw class attribute while parsing, so multi-class
+    elements are matched with a whole-word regex rather than class_.
+    """
+    pattern = re.compile(r'(?:^|\s)(?:' + '|'.join(map(re.escape, classes)) + r')(?:\s|$)')
+    return SoupStrainer(tags, attrs={'class': pattern})
+
+def make_soup(html: str, parser: str = DEFAULT_PARSER, only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse with a BeautifulSoup tree builder, optionally restricted to the `only` subtrees"""
+    return BeautifulSoup(html, parser, parse_only=only)
+
+def make_tree(html: str):
+    """Parse with selectolax (a C parser with its own CSS selector API)"""
+    if not HAS_SELECTOLAX:
+        raise ImportError("selectolax is not installed (pip install selectolax)")
+    return HTMLParser(html)
+
+def fetch_html(url: str, html_path: Optional[str] = None, save_path: Optional[str] = None) -> str:
+    """Read a saved page when `html_path` is given, otherwise download it (and save it to `save_path`)"""
+    if html_path:
+        with open(html_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    with instrument.timed_request(url) as timing:
+        resp = requests.get(url, headers={"User-Agent": USER_AGENT})
+        timing['status'], timing['bytes'] = resp.status_code, len(resp.content)
+    resp.raise_for_status()
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as f:
+            f.write(resp.text)
+    return resp.text
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import requests
+from typing import Callable, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+import instrument
+from rate_limit import TokenBucket, retry_after_seconds
+
+# Cache lives next to secrets.txt at the repo root and is never committed
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '.cache', 'http_cache.sqlite')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Seconds to wait for a connection or response before giving up on a request
+DEFAULT_TIMEOUT = 30
+
+DAY = 24 * 60 * 60
+
+# Time-to-live per endpoint in seconds; the longest matching URL prefix wins
+DEFAULT_TTLS = {
+    "https://api.themoviedb.org/3/search/": 7 * DAY,
+    "https://api.themoviedb.org/3/movie/": 30 * DAY,
+    "https://en.wikipedia.org/w/api.php": 14 * DAY,
+}
+DEFAULT_TTL = DAY
+
+# Params that identify the caller rather than the resource
+EXCLUDED_PARAMS = {'api_key'}
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request is not in the cache"""
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response backed by a cache row"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes,
+                 from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    """Build a stable cache key from the URL and normalized params, ignoring api_key"""
+    if not params:
+        return url
+    items = sorted((str(k), str(v)) for k, v in params.items()
+                   if k not in EXCLUDED_PARAMS and v is not None)
+    return f"{url}?{urlencode(items)}"
+
+class HttpCache:
+    """SQLite-backed GET cache with per-endpoint TTLs and size-based LRU eviction"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES,
+                 session: Optional[requests.Session] = None, offline: bool = False):
+        self.path = os.path.abspath(path)
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.session = session or requests.Session()
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, url: str) -> float:
+        """Return the TTL of the longest configured prefix matching url"""
+        best = None
+        for prefix in self.ttls:
+            if url.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.ttls[best] if best is not None else self.default_ttl
+
+    def lookup(self, key: str, ttl: Optional[float] = None) -> Optional[CachedResponse]:
+        """Return a fresh cached response for key, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            url, status, headers, body, created = row
+            if ttl is not None and time.time() - created > ttl:
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return CachedResponse(url, status, json.loads(headers), body, from_cache=True)
+
+    def store(self, key: str, response, body: Optional[bytes] = None) -> None:
+        """Store a successful response (or `body` in its place) and evict least recently used rows if over budget"""
+        body = response.content if body is None else body
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() in ('content-type', 'etag', 'last-modified')}
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), body, len(body), now, now),
+            )
+            self._total_bytes += len(body)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Trim to 90% of the budget so eviction doesn't run on every insert
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+
+    def get(self, url: str, params: Optional[Dict] = None, limiter: Optional[TokenBucket] = None,
+            max_retries: int = 3, project: Optional[Callable[[bytes], bytes]] = None,
+            variant: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> CachedResponse:
+        """GET through the cache. Only 200 responses are stored
+
+        Network requests take a token from `limiter` if given; a 429 pauses the
+        limiter (or sleeps) for Retry-After and is retried up to max_retries times.
+        `project` rewrites a 200 body before it is cached and returned (e.g. to
+        drop unused fields); `variant` names the projection so entries made
+        with a different one aren't reused. Requests give up after `timeout` seconds.
+        """
+        key = cache_key(url, params)
+        if variant:
+            key = f"{key}#{variant}"
+        # Offline runs accept stale entries rather than touching the network
+        cached = self.lookup(key, None if self.offline else self.ttl_for(url))
+        host = urlsplit(url).netloc
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            instrument.count('http_cache_hits_total', host=host)
+            return cached
+        if self.offline:
+            raise CacheMiss(f"Not in cache (offline mode): {key}")
+
+        with self._lock:
+            self.misses += 1
+        instrument.count('http_cache_misses_total', host=host)
+        for attempt in range(max_retries + 1):
+            if limiter is not None:
+                limiter.acquire()
+            with instrument.timed_request(url) as timing:
+                response = self.session.get(url, params=params, timeout=timeout, **kwargs)
+                timing['status'], timing['bytes'] = response.status_code, len(response.content)
+            if response.status_code != 429 or attempt == max_retries:
+                break
+            instrument.count('http_retries_total', host=host)
+            delay = retry_after_seconds(response.headers)
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                instrument.sleep(delay, 'retry_after')
+        body = response.content
+        if response.status_code == 200:
+            if project is not None:
+                body = project(body)
+            self.store(key, response, body)
+        return CachedResponse(response.url, response.status_code, dict(response.headers), body)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache() -> HttpCache:
+    """Return the process-wide cache, configured from TOP100_HTTP_CACHE / TOP100_OFFLINE"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(
+                path=os.environ.get('TOP100_HTTP_CACHE', DEFAULT_CACHE_PATH),
+                offline=os.environ.get('TOP100_OFFLINE', '') not in ('', '0'),
+            )
+        return _default_cache
+
+def set_cache(cache: Optional[HttpCache]):
+    """Replace the process-wide cache (e.g. to point at a different file or go offline)"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
+
+def cached_get(url: str, params: Optional[Dict] = None, **kwargs) -> CachedResponse:
+    """GET through the process-wide cache"""
+    return get_cache().get(url, params=params, **kwargs)
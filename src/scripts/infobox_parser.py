@@ -0,0 +1,146 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Fields requested by the enrichment scripts, with the Infobox film parameter
+# names that carry the same information
+FIELD_ALIASES = {
+    'release_date': ['release_date', 'released'],
+    'running_time': ['running_time', 'runtime'],
+    'box_office': ['box_office', 'gross'],
+    'production_company': ['production_company', 'production_companies', 'studio'],
+}
+
+# Templates whose positional arguments are list items
+LIST_TEMPLATES = {'plainlist', 'plain list', 'ubl', 'unbulleted list', 'hlist', 'flatlist', 'flat list', 'bulleted list'}
+
+# Templates that carry no displayable value
+DROP_TEMPLATES = {'citation needed', 'cn', 'efn', 'sfn', 'refn', 'r', 'dead link', 'better source needed'}
+
+INFOBOX_START = re.compile(r'\{\{\s*infobox[ _]film\b', re.IGNORECASE)
+BRACES = re.compile(r'\{\{|\}\}')
+SPLIT_TOKEN = re.compile(r'\{\{|\}\}|\[\[|\]\]|\||<!--|<ref', re.IGNORECASE)
+COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+REF = re.compile(r'<ref[^>/]*>.*?</ref\s*>|<ref[^>]*/>', re.DOTALL | re.IGNORECASE)
+BREAK = re.compile(r'<br\s*/?>', re.IGNORECASE)
+TAG = re.compile(r'<[^>]+>')
+LINK = re.compile(r'\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]')
+EXTERNAL_LINK = re.compile(r'\[https?://[^\s\]]+\s*([^\]]*)\]')
+INNER_TEMPLATE = re.compile(r'\{\{([^{}]*)\}\}')
+BULLET = re.compile(r'\n\s*[*#]+\s*')
+MARKUP = re.compile(r'[<\[{*#,]')
+WHITESPACE = re.compile(r'\s+')
+LIST_SEPARATORS = re.compile(r'(?:\s*,\s*)+')
+EDGE_PUNCTUATION = re.compile(r'^[,\s*]+|[,\s*]+$')
+
+def find_infobox(wikitext: str) -> Optional[str]:
+    """Return the body of the first {{Infobox film ...}} template (without the outer braces)"""
+    match = INFOBOX_START.search(wikitext or '')
+    if not match:
+        return None
+    depth = 0
+    for brace in BRACES.finditer(wikitext, match.start()):
+        depth += 1 if brace.group() == '{{' else -1
+        if depth == 0:
+            return wikitext[match.start() + 2:brace.start()]
+    # Unterminated template: take everything after the opening braces
+    return wikitext[match.start() + 2:]
+
+def split_params(body: str) -> Dict[str, str]:
+    """Split a template body into {name: raw value} in one pass
+
+    Pipes and equals signs only count at the top level, outside nested
+    templates, links, comments and <ref> tags.
+    """
+    params = {}
+    parts: List[str] = []
+    start = 0
+    depth = 0
+    token = SPLIT_TOKEN.search(body)
+    while token:
+        text = token.group()
+        pos = token.end()
+        if text in ('{{', '[['):
+            depth += 1
+        elif text in ('}}', ']]'):
+            depth -= 1
+        elif text == '|':
+            if depth == 0:
+                parts.append(body[start:token.start()])
+                start = pos
+        else:
+            # Skip comments and refs whole so their pipes don't split params
+            skipped = COMMENT.match(body, token.start()) or REF.match(body, token.start())
+            if skipped:
+                pos = skipped.end()
+        token = SPLIT_TOKEN.search(body, pos)
+    parts.append(body[start:])
+
+    # parts[0] is the template name
+    for part in parts[1:]:
+        name, sep, value = part.partition('=')
+        if not sep:
+            continue
+        key = name.strip().lower().replace(' ', '_')
+        if key and key not in params:
+            params[key] = value
+    return params
+
+def _expand_template(match) -> str:
+    """Replace an innermost template with its displayable content"""
+    args = match.group(1).split('|')
+    name = args[0].strip().lower()
+    positional = [arg.strip() for arg in args[1:] if '=' not in arg]
+    if name in DROP_TEMPLATES:
+        return ''
+    if name in LIST_TEMPLATES:
+        return ', '.join(positional)
+    if name == 'runtime' and positional:
+        return f"{positional[0]} minutes"
+    if name in ('film date', 'start date') and positional:
+        date = '-'.join(part.zfill(2) for part in positional[:3])
+        # Film date repeats year|month|day|place per release; keep the first release's place
+        place = positional[3] if name == 'film date' and len(positional) > 3 else ''
+        return f"{date} ({place})" if place and not place.isdigit() else date
+    return ' '.join(positional)
+
+def clean_value(value: str) -> str:
+    """Turn raw infobox wikitext into plain text; list items are comma separated"""
+    if not MARKUP.search(value):
+        return EDGE_PUNCTUATION.sub('', WHITESPACE.sub(' ', value))
+    value = COMMENT.sub('', value)
+    value = REF.sub('', value)
+    value = BREAK.sub(', ', value)
+    value = TAG.sub('', value)
+    value = LINK.sub(r'\1', value)
+    value = EXTERNAL_LINK.sub(r'\1', value)
+    value = BULLET.sub(', ', value)
+    # Expand templates from the innermost out
+    while '{{' in value:
+        expanded = INNER_TEMPLATE.sub(_expand_template, value)
+        if expanded == value:
+            break
+        value = expanded
+    value = WHITESPACE.sub(' ', value)
+    value = LIST_SEPARATORS.sub(', ', value)
+    return EDGE_PUNCTUATION.sub('', value)
+
+def parse_infobox(wikitext: str, fields: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Parse the film infobox once and return cleaned values
+
+    Returns every parameter when fields is None, otherwise exactly the
+    requested fields (missing ones as '') resolved through FIELD_ALIASES.
+    """
+    body = find_infobox(wikitext)
+    params = split_params(body) if body is not None else {}
+    if fields is None:
+        return {key: clean_value(value) for key, value in params.items()}
+
+    result = {}
+    for field in fields:
+        raw = ''
+        for name in FIELD_ALIASES.get(field, [field]):
+            if params.get(name, '').strip():
+                raw = params[name]
+                break
+        result[field] = clean_value(raw) if raw else ''
+    return result
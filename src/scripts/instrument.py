@@ -0,0 +1,294 @@
+import os
+import sys
+import glob
+import json
+import time
+import bisect
+import cProfile
+import argparse
+import resource
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_METRICS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '.cache', 'metrics')
+PROMETHEUS_PREFIX = "top100_"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] is observations <= buckets[i], the last slot is +Inf"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return result
+
+class Registry:
+    """Thread-safe spans, counters and histograms for one script run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, script: str = ''):
+        with self._lock:
+            self.script = script
+            self.started = time.time()
+            self.spans: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[Tuple[str, Labels], float] = {}
+            self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.spans.setdefault(name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def report(self, status: str = 'ok') -> Dict:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        with self._lock:
+            return {
+                'script': self.script,
+                'status': status,
+                'started': self.started,
+                'wall_seconds': round(time.time() - self.started, 3),
+                'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+                'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KB on Linux
+                'spans': {name: {k: round(v, 6) for k, v in stats.items()}
+                          for name, stats in sorted(self.spans.items())},
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'buckets': dict(h.cumulative()),
+                                'sum': round(h.sum, 6), 'count': h.count}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+REGISTRY = Registry()
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block; spans with the same name are aggregated (count, total, max)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.add_span(name, time.perf_counter() - start)
+
+def count(name: str, value: float = 1, **labels):
+    REGISTRY.count(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+def record_request(url: str, seconds: float, status: Optional[int], size: int = 0):
+    """Count one network request and add its latency to the per-host histogram"""
+    host = urlsplit(url).netloc
+    count('http_requests_total', host=host, status=status if status is not None else 'error')
+    count('http_response_bytes_total', size, host=host)
+    observe('http_request_seconds', seconds, host=host)
+
+@contextmanager
+def timed_request(url: str) -> Iterator[Dict]:
+    """Time a request made inside the block; set result['status'] and result['bytes'] on success"""
+    result = {'status': None, 'bytes': 0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        seconds = time.perf_counter() - start
+        REGISTRY.add_span('http', seconds)
+        record_request(url, seconds, result['status'], result['bytes'])
+
+def sleep(seconds: float, reason: str):
+    """time.sleep that is accounted for, so deliberate waits show up separately from work"""
+    start = time.perf_counter()
+    time.sleep(seconds)
+    count('sleep_seconds_total', time.perf_counter() - start, reason=reason)
+
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+def prometheus_text(report: Dict) -> str:
+    """Render a report in the Prometheus text exposition format (for node_exporter's textfile collector)"""
+    script = {'script': report['script']}
+    # Samples grouped by metric family, each family preceded by its # TYPE line
+    families: Dict[str, Tuple[str, List[str]]] = {}
+
+    def sample(family: str, kind: str, value, labels: Dict[str, str], suffix: str = ''):
+        name = PROMETHEUS_PREFIX + family
+        families.setdefault(name, (kind, []))[1].append(f"{name}{suffix}{_prometheus_labels(labels)} {value}")
+
+    sample('run_wall_seconds', 'gauge', report['wall_seconds'], script)
+    sample('run_cpu_seconds', 'gauge', report['cpu_seconds'], script)
+    sample('run_peak_rss_mb', 'gauge', report['peak_rss_mb'], script)
+    sample('run_success', 'gauge', int(report['status'] == 'ok'), script)
+    for name, stats in report['spans'].items():
+        labels = {**script, 'span': name}
+        sample('span_seconds_total', 'counter', stats['total_seconds'], labels)
+        sample('span_count_total', 'counter', stats['count'], labels)
+    for counter in report['counters']:
+        sample(counter['name'], 'counter', counter['value'], {**script, **counter['labels']})
+    for histogram in report['histograms']:
+        base = {**script, **histogram['labels']}
+        for bound, total in histogram['buckets'].items():
+            sample(histogram['name'], 'histogram', total, {**base, 'le': bound}, '_bucket')
+        sample(histogram['name'], 'histogram', histogram['sum'], base, '_sum')
+        sample(histogram['name'], 'histogram', histogram['count'], base, '_count')
+
+    lines = []
+    for name, (kind, samples) in families.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+def metrics_dir() -> Optional[str]:
+    """Where reports are written: TOP100_METRICS_DIR, else DEFAULT_METRICS_DIR; None when set to '' or '0'"""
+    directory = os.environ.get('TOP100_METRICS_DIR', DEFAULT_METRICS_DIR)
+    return None if directory in ('', '0') else directory
+
+def write_reports(status: str = 'ok') -> Optional[str]:
+    """Write the JSON report (and the Prometheus textfile if TOP100_PROMETHEUS is set). Returns the JSON path"""
+    report = REGISTRY.report(status)
+    directory = metrics_dir()
+    path = None
+    if directory:
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(report['started']))
+        path = os.path.join(directory, f"{report['script']}-{stamp}-{os.getpid()}.json")
+        _write_atomic(path, json.dumps(report, indent=1) + "\n")
+    if os.environ.get('TOP100_PROMETHEUS'):
+        _write_atomic(os.environ['TOP100_PROMETHEUS'], prometheus_text(report))
+    return path
+
+@contextmanager
+def run(script: str) -> Iterator[Registry]:
+    """Instrument a script run: a root span, optional cProfile, and the reports written at the end
+
+    Reports go to TOP100_METRICS_DIR (default .cache/metrics; '0' disables
+    them). TOP100_PROMETHEUS names a textfile to write for Prometheus, and
+    TOP100_PROFILE a file for cProfile stats of the main thread.
+    """
+    REGISTRY.reset(script)
+    profile_path = os.environ.get('TOP100_PROFILE')
+    profiler = cProfile.Profile() if profile_path else None
+    status = 'ok'
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with span(script):
+            yield REGISTRY
+    except BaseException as e:
+        status = 'ok' if isinstance(e, SystemExit) and not e.code else type(e).__name__
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        path = write_reports(status)
+        if path:
+            print(f"Metrics report: {path}")
+
+def latest_reports(script: str, directory: Optional[str] = None, n: int = 2) -> List[str]:
+    """The n most recent reports for a script in `directory` (default: metrics_dir()), oldest first"""
+    directory = directory or metrics_dir() or DEFAULT_METRICS_DIR
+    paths = sorted(glob.glob(os.path.join(directory, f"{script}-*.json")), key=os.path.getmtime)
+    return paths[-n:]
+
+def _counter_totals(report: Dict) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for counter in report['counters']:
+        labels = ','.join(f"{k}={v}" for k, v in counter['labels'].items())
+        key = f"{counter['name']}{{{labels}}}" if labels else counter['name']
+        totals[key] = totals.get(key, 0) + counter['value']
+    return totals
+
+def compare(before: Dict, after: Dict):
+    """Print wall time, spans and counters of two reports side by side"""
+    def row(label: str, a: float, b: float):
+        change = f"{(b - a) / a:+.0%}" if a else ''
+        print(f"  {label:48s}{a:12.3f}{b:12.3f}  {change}")
+
+    print(f"  {'':48s}{'before':>12s}{'after':>12s}")
+    for key in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb'):
+        row(key, before[key], after[key])
+    for name in sorted(set(before['spans']) | set(after['spans'])):
+        row(f"span {name} (s)", before['spans'].get(name, {}).get('total_seconds', 0),
+            after['spans'].get(name, {}).get('total_seconds', 0))
+    a, b = _counter_totals(before), _counter_totals(after)
+    for name in sorted(set(a) | set(b)):
+        row(name, a.get(name, 0), b.get(name, 0))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and compare run reports written by instrumented scripts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="print a report as Prometheus text")
+    show.add_argument("report", help="report JSON, or a script name for its latest report")
+    diff = commands.add_parser("compare", help="compare two reports")
+    diff.add_argument("reports", nargs="+", help="two report JSONs, or a script name to compare its last two runs")
+    for command in (show, diff):
+        command.add_argument("--metrics-dir", default=metrics_dir() or DEFAULT_METRICS_DIR,
+                             help="where reports are written (default: TOP100_METRICS_DIR or .cache/metrics)")
+    args = parser.parse_args()
+
+    def load(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    if args.command == "show":
+        path = args.report if os.path.exists(args.report) else (latest_reports(args.report, args.metrics_dir, 1) or [None])[0]
+        if path is None:
+            sys.exit(f"No reports for {args.report} in {args.metrics_dir}")
+        print(prometheus_text(load(path)), end='')
+    else:
+        paths = args.reports if len(args.reports) == 2 else latest_reports(args.reports[0], args.metrics_dir)
+        if len(paths) != 2:
+            sys.exit("Need two reports (or a script with at least two runs)")
+        print(f"{paths[0]}\n  -> {paths[1]}")
+        compare(load(paths[0]), load(paths[1]))
@@ -0,0 +1,74 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+UNKNOWN_JOB = "Unknown"
+WHITESPACE = re.compile(r'\s+')
+
+def normalize_name(name: str) -> str:
+    """Normalize a person's name for matching: NFKC, casefold, collapsed whitespace"""
+    name = unicodedata.normalize('NFKC', str(name)).casefold()
+    return WHITESPACE.sub(' ', name).strip()
+
+def load_jobs(jobs_path: str) -> pd.DataFrame:
+    """Read jobs.txt (`category<TAB>name, name, ...` per line) into a (name, job, key) frame"""
+    records = []
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or "\t" not in line:
+                continue
+            category, names = line.split("\t", 1)
+            for name in names.split(","):
+                if name.strip():
+                    records.append((name.strip(), category.strip()))
+    jobs = pd.DataFrame(records, columns=['name', 'job'])
+    jobs['key'] = jobs['name'].map(normalize_name)
+    return jobs
+
+def join_jobs(df: pd.DataFrame, jobs: pd.DataFrame, person_column: str = 'person') -> Tuple[pd.DataFrame, Dict[str, List]]:
+    """Attach a categorical `job` column to ballots by normalized person name
+
+    Names are normalized once per distinct person (via the categorical codes)
+    and joined with a single merge. Names listed under more than one category
+    keep the first one. Returns the joined frame and a report with the
+    'unmatched' ballot names, 'ambiguous' names as (name, [jobs]) and the
+    'unused' jobs.txt entries no ballot refers to.
+    """
+    lookup = jobs.drop_duplicates('key')[['key', 'job', 'name']]
+    categories_per_key = jobs.groupby('key', sort=False)['job'].unique()
+    ambiguous_keys = categories_per_key[categories_per_key.map(len) > 1]
+
+    # Normalize and merge the distinct names only, then expand through the codes
+    people = df[person_column].astype('category')
+    names = pd.DataFrame({'person': people.cat.categories})
+    names['key'] = names['person'].map(normalize_name)
+    names = names.merge(lookup[['key', 'job']], on='key', how='left')
+    codes = people.cat.codes.values
+    name_jobs = names['job'].fillna(UNKNOWN_JOB).values
+    job_categories = sorted(set(jobs['job'])) + [UNKNOWN_JOB]
+    result = df.copy()
+    result['job'] = pd.Categorical(np.where(codes >= 0, name_jobs[codes], UNKNOWN_JOB), categories=job_categories)
+
+    ballot_keys = set(names['key'])
+    first_names = lookup.set_index('key')['name']
+    report = {
+        'unmatched': sorted(names.loc[names['job'].isna(), 'person']),
+        'ambiguous': [(first_names[key], list(found)) for key, found in ambiguous_keys.items() if key in ballot_keys],
+        'unused': sorted(first_names[key] for key in first_names.index if key not in ballot_keys),
+    }
+    return result, report
+
+def print_report(report: Dict[str, List]):
+    """Print the validation report of a jobs join"""
+    print(f"Unmatched names ({len(report['unmatched'])}):")
+    for name in report['unmatched']:
+        print(f"  {name}")
+    print(f"Ambiguous names ({len(report['ambiguous'])}), first category used:")
+    for name, found in report['ambiguous']:
+        print(f"  {name}: {', '.join(found)}")
+    print(f"Names in the jobs file that no ballot uses ({len(report['unused'])}):")
+    for name in report['unused']:
+        print(f"  {name}")
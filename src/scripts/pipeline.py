@@ -0,0 +1,307 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set
+from common import DATA_DIR
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(SCRIPTS_DIR, '..', '..'))
+IMAGES_DIR = os.path.join(SCRIPTS_DIR, '..', 'assets', 'images')
+POSTERS_DIR = os.path.join(SCRIPTS_DIR, '..', 'assets', 'posters')
+WORK_DIR = os.path.join(REPO_DIR, '.cache', 'pipeline')
+
+class Stage:
+    """One pipeline step: a script run with fixed arguments, reading `inputs` and writing `outputs`
+
+    Network stages fetch live data, so they are opt-in: see `is_stale`.
+    `requires` returns why the stage can't run here (e.g. no API key), or None.
+    """
+
+    def __init__(self, name: str, script: str, args: List[str], inputs: List[str], outputs: List[str],
+                 deps: List[str] = (), network: bool = False,
+                 requires: Optional[Callable[[], Optional[str]]] = None):
+        self.name = name
+        self.script = script
+        self.args = args
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = list(deps)
+        self.network = network
+        self.requires = requires
+
+def tmdb_key_missing() -> Optional[str]:
+    """Why the TMDB stage can't run, or None when an API key is configured"""
+    from enrich_movies import load_api_key
+    try:
+        load_api_key()
+    except Exception:
+        return "no TMDB API key: set TMDB_API_KEY or add it to secrets.txt"
+    return None
+
+def build_stages(data_dir: str = DATA_DIR, images_dir: str = IMAGES_DIR, work_dir: str = WORK_DIR,
+                 max_movies: int = 100, workers: int = 8, posters_dir: str = POSTERS_DIR) -> Dict[str, Stage]:
+    """The pipeline DAG: scrape -> jobs -> (posters -> transcode -> sprites | TMDB | Wikipedia | recommend | export)"""
+    data = os.path.abspath(data_dir)
+    scraped = os.path.join(os.path.abspath(work_dir), 'top100_scraped.csv')
+    ballots = os.path.join(data, 'top100.csv')
+    stages = [
+        Stage('scrape', 'scrape_top100.py', ['--output', scraped], [], [scraped], network=True),
+        Stage('top500', 'popular_top500.py', ['--output', os.path.join(data, 'top500.csv')],
+              [], [os.path.join(data, 'top500.csv')], network=True),
+        Stage('jobs', 'addjobs.py', ['--csv', scraped, '--jobs', os.path.join(data, 'jobs.txt'), '--output', ballots],
+              [scraped, os.path.join(data, 'jobs.txt')], [ballots], deps=['scrape']),
+        Stage('posters', 'scrape_jpgs.py',
+              ['--csv', ballots, '--out-dir', os.path.abspath(images_dir), '--workers', str(workers), '--incremental'],
+              [ballots], [os.path.abspath(images_dir)], deps=['jobs'], network=True),
+        Stage('transcode', 'transcode_posters.py', ['--src', os.path.abspath(images_dir), '--out', os.path.abspath(posters_dir)],
+              [os.path.abspath(images_dir)], [os.path.join(os.path.abspath(posters_dir), 'manifest.json')], deps=['posters']),
+        Stage('sprites', 'build_sprites.py', ['--src', os.path.abspath(posters_dir), '--csv', ballots,
+                                              '--out', os.path.join(data, '..', 'sprites')],
+              [os.path.join(os.path.abspath(posters_dir), 'manifest.json'), ballots],
+              [os.path.join(data, '..', 'sprites', 'atlas.json')], deps=['transcode']),
+        Stage('tmdb', 'enrich_movies.py',
+              ['--csv', ballots, '--output', os.path.join(data, 'top100_enriched.csv'),
+               '--max-movies', str(max_movies), '--workers', str(workers)],
+              [ballots], [os.path.join(data, 'top100_enriched.csv')], deps=['jobs'], network=True,
+              requires=tmdb_key_missing),
+        Stage('wikipedia', 'enrich_movies_wikipedia.py',
+              ['--csv', ballots, '--output', os.path.join(data, 'top100_wikipedia_enriched.csv'),
+               '--max-movies', str(max_movies), '--batch'],
+              [ballots], [os.path.join(data, 'top100_wikipedia_enriched.csv')], deps=['jobs'], network=True),
+        Stage('recommend', 'build_recommendations.py',
+              ['--csv', ballots, '--popularity', os.path.join(data, 'top500.csv'),
+               '--output', os.path.join(data, 'recommendations.json')],
+              [ballots, os.path.join(data, 'top500.csv')], [os.path.join(data, 'recommendations.json')],
+              deps=['jobs', 'top500']),
+        Stage('export', 'export_bundle.py', ['--csv', ballots, '--output', os.path.join(data, 'bundle.json')],
+              [ballots], [os.path.join(data, 'bundle.json')], deps=['jobs']),
+    ]
+    return {stage.name: stage for stage in stages}
+
+def local_modules(script: str) -> Set[str]:
+    """The script plus every module from this directory it imports, transitively"""
+    found = set()
+    pending = [os.path.join(SCRIPTS_DIR, script)]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.add(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            names = []
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            pending.extend(os.path.join(SCRIPTS_DIR, name.split('.')[0] + '.py') for name in names)
+    return found
+
+def hash_path(digest, path: str):
+    """Feed a file's bytes, or every file under a directory, into `digest`"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode('utf-8'))
+                hash_path(digest, full)
+    elif os.path.exists(path):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        digest.update(b'<missing>')
+
+def fingerprint(stage: Stage) -> str:
+    """Hash of the stage's code (script and local imports), arguments and input contents
+
+    Network stages only hash their own script: shared helpers change far
+    more often than the pages they scrape.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([stage.script, stage.args]).encode('utf-8'))
+    code = [os.path.join(SCRIPTS_DIR, stage.script)] if stage.network else sorted(local_modules(stage.script))
+    for path in code + stage.inputs:
+        digest.update(path.encode('utf-8'))
+        hash_path(digest, path)
+    return digest.hexdigest()
+
+def load_state(work_dir: str = WORK_DIR) -> Dict[str, str]:
+    """Fingerprints of the last successful run of each stage"""
+    path = os.path.join(work_dir, 'state.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, str], work_dir: str = WORK_DIR):
+    os.makedirs(work_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=work_dir, suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(work_dir, 'state.json'))
+
+def outputs_exist(stage: Stage) -> bool:
+    return all(os.path.exists(path) for path in stage.outputs)
+
+def fetch_needed(stage: Stage, stages: Dict[str, Stage]) -> bool:
+    """Whether a network stage has to run without --force: a stage built from it has no output to keep
+
+    Stages nothing local is built from (the enrichers) only run when forced.
+    """
+    if outputs_exist(stage):
+        return False
+    dependents = [other for other in stages.values() if stage.name in other.deps]
+    return any(not outputs_exist(other) for other in dependents)
+
+def unfetched_dependency(stage: Stage, stages: Dict[str, Stage]) -> Optional[str]:
+    """A network dependency that wasn't fetched, when this stage's existing outputs are kept instead"""
+    if not outputs_exist(stage):
+        return None
+    for dep in stage.deps:
+        if dep in stages and stages[dep].network and not outputs_exist(stages[dep]):
+            return dep
+    return None
+
+def is_stale(stage: Stage, state: Dict[str, str], stages: Dict[str, Stage]) -> bool:
+    """Whether a stage needs to run (ignoring --force)
+
+    Local stages are stale when their fingerprint differs from the last
+    successful run or an output is missing. Network stages (scrape, top500,
+    posters, tmdb, wikipedia) never rerun on their own; they only run when
+    a stage built from them has nothing to keep (see `fetch_needed`), so a
+    fresh checkout builds from the committed top100.csv and posters instead
+    of fetching. Stages fed by an unfetched network
+    stage keep their existing outputs until they have a fingerprint of
+    their own; from then on they are rebuilt when it changes as usual.
+    """
+    if stage.network:
+        return fetch_needed(stage, stages)
+    if stage.name not in state and unfetched_dependency(stage, stages):
+        return False
+    if state.get(stage.name) != fingerprint(stage):
+        return True
+    return not outputs_exist(stage)
+
+def describe(stage: Stage, stages: Dict[str, Stage]) -> str:
+    """Status shown for a stage that doesn't need to run"""
+    if stage.network and not outputs_exist(stage):
+        return f"not fetched (--force {stage.name} to fetch)"
+    dep = unfetched_dependency(stage, stages)
+    if dep:
+        return f"up to date (kept, {dep} not fetched)"
+    return "up to date"
+
+def run_stage(stage: Stage, work_dir: str = WORK_DIR) -> bool:
+    """Run a stage's script, logging to <work_dir>/logs/<stage>.log. Returns success"""
+    log_dir = os.path.join(work_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, stage.script)] + stage.args
+    if os.environ.get('TOP100_RECORD') or os.environ.get('TOP100_REPLAY'):
+        # Route the stage's HTTP traffic through the record/replay hook
+        command[1:1] = [os.path.join(SCRIPTS_DIR, 'replay.py'), 'run']
+    with open(os.path.join(log_dir, f"{stage.name}.log"), 'w', encoding='utf-8') as log:
+        result = subprocess.run(command, cwd=SCRIPTS_DIR, stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode == 0
+
+def build(stages: Dict[str, Stage], force: Optional[List[str]] = None, only: Optional[List[str]] = None,
+          parallel: int = 4, dry_run: bool = False, work_dir: str = WORK_DIR) -> bool:
+    """Run stale stages in dependency order, independent ones in parallel
+
+    A stage is stale when its fingerprint differs from the last successful
+    run or one of its outputs is missing; network stages only run when forced
+    or when their data is missing (see `is_stale`), and stages whose
+    `requires` check fails are skipped. Fingerprints are taken when a stage
+    becomes ready, so upstream outputs written in this build are accounted
+    for. Stages in `force` always run; `only` limits the build to those
+    stages (their dependencies are not run). Returns True if nothing failed.
+    """
+    state = load_state(work_dir)
+    selected = [name for name in stages if not only or name in only]
+    done: Set[str] = set()
+    failed: Set[str] = set()
+    would_run: Set[str] = set()
+    running = {}
+
+    def ready(name: str) -> bool:
+        return all(dep in done or dep not in selected for dep in stages[name].deps)
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+        pending = list(selected)
+        while pending or running:
+            for name in list(pending):
+                stage = stages[name]
+                if any(dep in failed for dep in stage.deps):
+                    print(f"  {name:10s} skipped (a dependency failed)")
+                    failed.add(name)
+                    pending.remove(name)
+                elif ready(name):
+                    pending.remove(name)
+                    # In a dry run nothing is rebuilt, so anything local downstream of a stale stage counts as stale
+                    upstream_changes = not stage.network and any(dep in would_run for dep in stage.deps)
+                    if name not in (force or []) and not upstream_changes and not is_stale(stage, state, stages):
+                        print(f"  {name:10s} {describe(stage, stages)}")
+                        if not dry_run and not stage.network and name not in state and unfetched_dependency(stage, stages):
+                            # Kept outputs get a fingerprint so later changes to their other inputs rebuild them
+                            state[name] = fingerprint(stage)
+                            save_state(state, work_dir)
+                        done.add(name)
+                    elif stage.requires and stage.requires():
+                        print(f"  {name:10s} skipped ({stage.requires()})")
+                        done.add(name)
+                    elif dry_run:
+                        print(f"  {name:10s} would run")
+                        would_run.add(name)
+                        done.add(name)
+                    else:
+                        print(f"  {name:10s} running")
+                        running[executor.submit(run_stage, stage, work_dir)] = (name, time.time())
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, start = running.pop(future)
+                if future.result():
+                    # Fingerprint again after the run: the inputs are what this output was built from
+                    state[name] = fingerprint(stages[name])
+                    save_state(state, work_dir)
+                    done.add(name)
+                    print(f"  {name:10s} done in {time.time() - start:.1f}s")
+                else:
+                    failed.add(name)
+                    print(f"  {name:10s} FAILED, see {os.path.join(work_dir, 'logs', name + '.log')}")
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the data pipeline, rerunning only stages whose inputs changed")
+    parser.add_argument("command", choices=["build", "status"], help="build stale stages, or list what is stale")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to rerun regardless of fingerprints")
+    parser.add_argument("--only", nargs="*", help="only consider these stages")
+    parser.add_argument("--parallel", type=int, default=4, help="stages to run at once")
+    parser.add_argument("--dry-run", action="store_true", help="print what would run without running it")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where the CSVs and bundle.json live")
+    parser.add_argument("--images-dir", default=IMAGES_DIR, help="where posters are downloaded to")
+    parser.add_argument("--posters-dir", default=POSTERS_DIR, help="where transcoded poster variants are written")
+    parser.add_argument("--work-dir", default=WORK_DIR, help="intermediate files, logs and stage fingerprints")
+    parser.add_argument("--max-movies", type=int, default=100, help="rows the enrichers process")
+    parser.add_argument("--workers", type=int, default=8, help="concurrency within the poster and TMDB stages")
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir)
+    stages = build_stages(args.data_dir, args.images_dir, work_dir, args.max_movies, args.workers, args.posters_dir)
+    if args.command == "status":
+        state = load_state(work_dir)
+        for name, stage in stages.items():
+            print(f"  {name:10s} {'stale' if is_stale(stage, state, stages) else describe(stage, stages)}")
+    else:
+        ok = build(stages, args.force, args.only, args.parallel, args.dry_run, work_dir)
+        sys.exit(0 if ok else 1)
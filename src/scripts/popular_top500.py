@@ -1,87 +1,124 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
 import os
+import re
+import argparse
+import pandas as pd
+from typing import Dict, List, Optional
+from common import DATA_DIR
+from html_parsing import DEFAULT_PARSER, PARSERS, class_strainer, fetch_html, make_soup, make_tree
+from storage import write_dataset
 
-url = "https://www.nytimes.com/interactive/2025/movies/readers-movies-21st-century.html"
-resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-soup = BeautifulSoup(resp.text, "html.parser")
-
-rows = []
+URL = "https://www.nytimes.com/interactive/2025/movies/readers-movies-21st-century.html"
 
-# Scrape top 100 movies (they have individual div elements with images)
-for row in soup.select("div.row-outer.svelte-1l6f6x5"):
-    img = row.select_one("img")
-    if not img:
-        continue
-    
-    rank_el = row.select_one(".rank.svelte-1l6f6x5")
-    rank = int(rank_el.get_text(strip=True).rstrip('.')) if rank_el else 999
-    
-    title_el = row.select_one("h3.svelte-1l6f6x5")
-    if title_el:
-        title_text = title_el.get_text(strip=True)
-        title = re.sub(r'^\d+\.\s*', '', title_text)
-    else:
-        title = ""
-    
-    img_url = img.get("src", "")
+def top_row(rank_text: Optional[str], title_text: Optional[str], img_url: str) -> Dict:
+    """Build one row for the illustrated top 100"""
+    rank = int(rank_text.rstrip('.')) if rank_text else 999
+    title = re.sub(r'^\d+\.\s*', '', title_text) if title_text is not None else ""
     uniqid = img_url.rstrip("/").split("/")[-1].split(".")[0] if img_url else ""
-    
-    rows.append({
+    return {
         "rank": rank,
         "title": title,
         "img_url": img_url,
         "uniqid": uniqid
-    })
+    }
 
-# Scrape movies 101-500 (they're in a paragraph with spans)
-rest_paragraph = soup.select_one("p.rest.svelte-nxbyro")
-if rest_paragraph:
-    # Find all spans containing movie entries
-    spans = rest_paragraph.find_all("span")
-    
-    for span in spans:
-        # Look for span with class "num" (contains rank)
-        num_span = span.find("span", class_="num")
-        if not num_span:
-            continue
-            
-        rank_text = num_span.get_text(strip=True).rstrip('.')
-        try:
-            rank = int(rank_text)
-        except ValueError:
-            continue
-            
-        # Find the link with the movie title
-        link = span.find("a")
-        if not link:
+def rest_row(rank_text: str, title: str) -> Optional[Dict]:
+    """Build one row for movies 101-500, or None if the rank isn't a number"""
+    try:
+        rank = int(rank_text.rstrip('.'))
+    except ValueError:
+        return None
+    return {
+        "rank": rank,
+        "title": title,
+        "img_url": "",  # No images for 101-500
+        "uniqid": ""    # No unique IDs for 101-500
+    }
+
+def parse_top500(html: str, parser: str = DEFAULT_PARSER, restrict: bool = True) -> List[Dict]:
+    """Extract rank/title/img_url/uniqid rows for the readers' top 500, sorted by rank
+
+    With restrict=True only the row-outer and p.rest subtrees are built.
+    """
+    if parser == 'selectolax':
+        rows = _parse_top500_selectolax(html)
+    else:
+        soup = make_soup(html, parser, class_strainer(["div", "p"], ["row-outer", "rest"]) if restrict else None)
+        rows = []
+
+        # Scrape top 100 movies (they have individual div elements with images)
+        for row in soup.select("div.row-outer.svelte-1l6f6x5"):
+            img = row.select_one("img")
+            if not img:
+                continue
+            rank_el = row.select_one(".rank.svelte-1l6f6x5")
+            title_el = row.select_one("h3.svelte-1l6f6x5")
+            rows.append(top_row(rank_el.get_text(strip=True) if rank_el else None,
+                                title_el.get_text(strip=True) if title_el else None,
+                                img.get("src", "")))
+
+        # Scrape movies 101-500 (they're in a paragraph with spans)
+        rest_paragraph = soup.select_one("p.rest.svelte-nxbyro")
+        if rest_paragraph:
+            for span in rest_paragraph.find_all("span"):
+                # Look for span with class "num" (contains rank) and the link with the title
+                num_span = span.find("span", class_="num")
+                link = span.find("a")
+                if not num_span or not link:
+                    continue
+                row = rest_row(num_span.get_text(strip=True), link.get_text(strip=True))
+                if row:
+                    rows.append(row)
+
+    # Sort by rank to ensure proper ordering
+    rows.sort(key=lambda x: x["rank"])
+    return rows
+
+def _parse_top500_selectolax(html: str) -> List[Dict]:
+    tree = make_tree(html)
+    rows = []
+    for row in tree.css("div.row-outer.svelte-1l6f6x5"):
+        img = row.css_first("img")
+        if img is None:
             continue
-            
-        title = link.get_text(strip=True)
-        
-        rows.append({
-            "rank": rank,
-            "title": title,
-            "img_url": "",  # No images for 101-500
-            "uniqid": ""    # No unique IDs for 101-500
-        })
+        rank_el = row.css_first(".rank.svelte-1l6f6x5")
+        title_el = row.css_first("h3.svelte-1l6f6x5")
+        rows.append(top_row(rank_el.text(strip=True) if rank_el is not None else None,
+                            title_el.text(strip=True) if title_el is not None else None,
+                            img.attributes.get("src") or ""))
 
-# Sort by rank to ensure proper ordering
-rows.sort(key=lambda x: x["rank"])
+    rest_paragraph = tree.css_first("p.rest.svelte-nxbyro")
+    if rest_paragraph is not None:
+        for span in rest_paragraph.css("span"):
+            num_span = span.css_first("span.num")
+            link = span.css_first("a")
+            if num_span is None or link is None:
+                continue
+            row = rest_row(num_span.text(strip=True), link.text(strip=True))
+            if row:
+                rows.append(row)
+    return rows
 
-df = pd.DataFrame(rows)
-print(f"Scraped {len(df)} movies")
-print("DataFrame shape:", df.shape)
-print("DataFrame columns:", df.columns.tolist())
-print(df.head(10))
-print(f"\nLast 10 movies:")
-print(df.tail(10))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the NYT readers' poll into top500.csv")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'top500.csv'), help="where to write the list")
+    parser.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER, help="HTML parser backend")
+    parser.add_argument("--full-parse", action="store_true", help="build the whole document instead of only the list subtrees")
+    parser.add_argument("--html", help="parse a saved copy of the page instead of downloading it")
+    parser.add_argument("--save-html", help="save the downloaded page here (e.g. as a benchmark fixture)")
+    args = parser.parse_args()
 
-if df.empty:
-    print("WARNING: DataFrame is empty! No data will be saved.")
-else:
-    out_path = os.path.abspath("./../assets/data/top500.csv")
-    df.to_csv(out_path, index=False, encoding='utf-8')
-    print(f"\nSaved to {out_path}")
+    html = fetch_html(URL, args.html, args.save_html)
+    df = pd.DataFrame(parse_top500(html, args.parser, restrict=not args.full_parse))
+    print(f"Scraped {len(df)} movies")
+    print("DataFrame shape:", df.shape)
+    print("DataFrame columns:", df.columns.tolist())
+    print(df.head(10))
+    print(f"\nLast 10 movies:")
+    print(df.tail(10))
+
+    if df.empty:
+        print("WARNING: DataFrame is empty! No data will be saved.")
+    else:
+        out_path = os.path.abspath(args.output)
+        write_dataset(df, out_path)
+        print(f"\nSaved to {out_path}")
@@ -0,0 +1,61 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+import instrument
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens: int = 1):
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait = (tokens - self._tokens) / self.rate
+            instrument.sleep(wait, 'rate_limit')
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (e.g. after a 429) and drain the bucket"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+def retry_after_seconds(headers: Mapping[str, str], default: float = 1.0) -> float:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    value: Optional[str] = headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import runpy
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from requests.adapters import HTTPAdapter
+from http_cache import EXCLUDED_PARAMS
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '.cache', 'replay')
+INDEX_NAME = "index.jsonl"
+BODY_DIR = "bodies"
+
+# Headers that describe the original transfer, not the (already decoded) body we store
+TRANSFER_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'}
+
+def fixture_key(method: str, url: str) -> str:
+    """Identify a request by method, host, path and sorted query, ignoring scheme and api_key"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in EXCLUDED_PARAMS)
+    key = f"{method.upper()} {parts.netloc}{parts.path or '/'}"
+    return f"{key}?{urlencode(query)}" if query else key
+
+class FixtureStore:
+    """Recorded responses: an append-only JSONL index plus content-addressed body files"""
+
+    def __init__(self, path: str = DEFAULT_FIXTURES_DIR):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.path, INDEX_NAME)
+
+    def count(self) -> int:
+        """Number of responses recorded so far"""
+        if not os.path.exists(self.index_path):
+            return 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            return sum(1 for _ in f)
+
+    def load(self) -> Dict[str, Dict]:
+        """Return the index keyed by fixture_key; the latest recording of a request wins"""
+        fixtures = {}
+        if not os.path.exists(self.index_path):
+            return fixtures
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                fixtures[entry['key']] = entry
+        return fixtures
+
+    def body(self, entry: Dict) -> bytes:
+        with open(os.path.join(self.path, BODY_DIR, entry['body']), 'rb') as f:
+            return f.read()
+
+    def record(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            'key': fixture_key(method, url),
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in TRANSFER_HEADERS},
+            'body': digest,
+        }
+        with self._lock:
+            os.makedirs(os.path.join(self.path, BODY_DIR), exist_ok=True)
+            body_path = os.path.join(self.path, BODY_DIR, digest)
+            if not os.path.exists(body_path):
+                with open(body_path, 'wb') as f:
+                    f.write(body)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+_original_send = HTTPAdapter.send
+
+def install_recorder(store: FixtureStore):
+    """Record every response fetched through requests into `store`"""
+    def send(adapter, request, **kwargs):
+        response = _original_send(adapter, request, **kwargs)
+        store.record(request.method, request.url, response.status_code, dict(response.headers), response.content)
+        return response
+    HTTPAdapter.send = send
+
+def install_replay(base_url: str):
+    """Send every requests call to the stand-in server at `base_url` instead of the real host"""
+    base_url = base_url.rstrip('/')
+
+    def send(adapter, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"{base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return _original_send(adapter, request, **kwargs)
+    HTTPAdapter.send = send
+
+def install_from_env():
+    """Turn on recording (TOP100_RECORD=<fixtures dir>) or replay (TOP100_REPLAY=<server url>)"""
+    if os.environ.get('TOP100_REPLAY'):
+        install_replay(os.environ['TOP100_REPLAY'])
+    elif os.environ.get('TOP100_RECORD'):
+        install_recorder(FixtureStore(os.environ['TOP100_RECORD']))
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves /<host>/<path>?<query> from the recorded fixtures"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool):
+        key = fixture_key(self.command, "http://" + self.path.lstrip('/'))
+        entry = self.server.fixtures.get(key)
+        if entry is None and self.command == 'HEAD':
+            entry = self.server.fixtures.get(key.replace('HEAD ', 'GET ', 1))
+        if entry is None:
+            self.server.count(missing=True)
+            body = f"No fixture for {key}".encode('utf-8')
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        self.server.count()
+        headers = entry['headers']
+        etag = next((v for k, v in headers.items() if k.lower() == 'etag'), None)
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = self.server.store.body(entry)
+        self.send_response(entry['status'])
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    """Local stand-in for NYT, TMDB and Wikipedia that answers from recorded fixtures"""
+    daemon_threads = True
+
+    def __init__(self, fixtures_dir: str = DEFAULT_FIXTURES_DIR, port: int = 0):
+        self.store = FixtureStore(fixtures_dir)
+        self.fixtures = self.store.load()
+        self.requests = 0
+        self.missing = 0
+        self._stats_lock = threading.Lock()
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, missing: bool = False):
+        with self._stats_lock:
+            self.requests += 1
+            self.missing += missing
+
+    def reset_stats(self) -> Dict[str, int]:
+        """Return request counts since the last reset and start counting again"""
+        with self._stats_lock:
+            stats = {'requests': self.requests, 'missing': self.missing}
+            self.requests = self.missing = 0
+        return stats
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def run_script(script: str, args):
+    """Run a pipeline script as __main__ with recording/replay installed from the environment"""
+    install_from_env()
+    script = os.path.abspath(script)
+    sys.argv = [script] + list(args)
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name="__main__")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay the pipeline's HTTP traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="serve recorded fixtures on a local port")
+    serve.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="fixtures directory")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on")
+    run = commands.add_parser("run", help="run a script with TOP100_RECORD / TOP100_REPLAY applied")
+    run.add_argument("script", help="pipeline script to run")
+    run.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the script")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = StandInServer(args.fixtures, args.port)
+        print(f"Serving {len(server.fixtures)} fixtures on {server.url}")
+        server.serve_forever()
+    else:
+        run_script(args.script, args.args)
@@ -1,17 +1,175 @@
 import os
+import json
+import time
+import hashlib
+import argparse
 import requests
-import pandas as pd
+from common import atomic_write
+from storage import read_dataset
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import instrument
 
-df = pd.read_csv("top100.csv", usecols=["uniqid", "img_url"])
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30
+MANIFEST_NAME = "manifest.json"
 
-os.makedirs("images", exist_ok=True)
+def make_session(workers: int = DEFAULT_WORKERS) -> requests.Session:
+    """Create a session whose keep-alive pool is large enough for every worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-for _, row in df.iterrows():
-    uniqid = row["uniqid"]
-    url = row["img_url"]
-    resp = requests.get(url, stream=True)
-    resp.raise_for_status()
-    out_path = os.path.join("images", f"{uniqid}.png")
-    with open(out_path, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
-            f.write(chunk)
+def load_poster_urls(csv_path: str) -> List[Tuple[str, str]]:
+    """Return unique (uniqid, img_url) pairs from a ballot CSV"""
+    df = read_dataset(csv_path, columns=["uniqid", "img_url"])
+    df = df.dropna().drop_duplicates(subset="uniqid")
+    return list(zip(df["uniqid"], df["img_url"]))
+
+def load_manifest(out_dir: str) -> Dict[str, Dict]:
+    """Load the poster manifest ({uniqid: {size, sha256, etag, last_modified}})"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(out_dir: str, manifest: Dict[str, Dict]):
+    """Atomically write the poster manifest"""
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+    atomic_write(os.path.join(out_dir, MANIFEST_NAME), data)
+
+def poster_filename(uniqid: str, url: str) -> str:
+    """File name for a poster: <uniqid>.png, the name the committed posters have always had"""
+    return f"{uniqid}.png"
+
+def download_poster(session: requests.Session, uniqid: str, url: str, out_dir: str,
+                    retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                    timeout: float = DEFAULT_TIMEOUT,
+                    entry: Optional[Dict] = None) -> Tuple[Optional[str], Optional[Dict]]:
+    """Download one poster, retrying with exponential backoff.
+
+    When a manifest entry is given the request is conditional and the file is
+    only rewritten if its content changed. Returns (error, manifest entry).
+    """
+    out_path = os.path.join(out_dir, poster_filename(uniqid, url))
+    have_file = entry is not None and os.path.exists(out_path)
+    headers = {}
+    if have_file:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    error = None
+    for attempt in range(retries + 1):
+        try:
+            with instrument.timed_request(url) as timing:
+                resp = session.get(url, headers=headers, timeout=timeout)
+                timing['status'], timing['bytes'] = resp.status_code, len(resp.content)
+            if resp.status_code == 304 and have_file:
+                instrument.count('posters_total', outcome='not_modified')
+                return None, entry
+            resp.raise_for_status()
+            body = resp.content
+            new_entry = {
+                "url": url,
+                "size": len(body),
+                "sha256": hashlib.sha256(body).hexdigest(),
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+            if not (have_file and entry.get("sha256") == new_entry["sha256"]):
+                try:
+                    with instrument.span('write_poster'):
+                        atomic_write(out_path, body)
+                except OSError as e:
+                    # A full or read-only disk fails this poster, not the whole run
+                    instrument.count('posters_total', outcome='failed')
+                    return f"write failed: {e}", None
+                instrument.count('posters_total', outcome='written')
+            else:
+                instrument.count('posters_total', outcome='unchanged')
+            return None, new_entry
+        except requests.RequestException as e:
+            error = str(e)
+            # Client errors other than rate limiting will not fix themselves
+            status = getattr(e.response, "status_code", None)
+            if status is not None and 400 <= status < 500 and status != 429:
+                break
+            if attempt < retries:
+                instrument.count('http_retries_total', host=urlsplit(url).netloc)
+                instrument.sleep(backoff * (2 ** attempt), 'backoff')
+    instrument.count('posters_total', outcome='failed')
+    return error, None
+
+def download_posters(posters: List[Tuple[str, str]], out_dir: str = "images",
+                     workers: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES,
+                     backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                     session: Optional[requests.Session] = None,
+                     incremental: bool = False) -> Dict[str, str]:
+    """Download posters with a bounded worker pool. Returns {uniqid: error} for failures
+
+    In incremental mode the manifest in out_dir is used to send conditional
+    requests, so unchanged posters cost one round-trip and no disk writes.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, workers)
+    if session is None:
+        session = make_session(workers)
+
+    manifest = load_manifest(out_dir)
+    previous = manifest if incremental else {}
+    failures = {}
+    changed = False
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(download_poster, session, uniqid, url, out_dir, retries, backoff,
+                            timeout, previous.get(uniqid)): uniqid
+            for uniqid, url in posters
+        }
+        for future, uniqid in futures.items():
+            error, entry = future.result()
+            if error:
+                failures[uniqid] = error
+            elif entry != manifest.get(uniqid):
+                manifest[uniqid] = entry
+                changed = True
+
+    if changed:
+        save_manifest(out_dir, manifest)
+    return failures
+
+def print_summary(total: int, failures: Dict[str, str]):
+    """Print a short summary of a download run"""
+    print(f"Downloaded {total - len(failures)}/{total} posters")
+    if failures:
+        print(f"{len(failures)} failed:")
+        for uniqid, error in sorted(failures.items()):
+            print(f"  {uniqid}: {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download movie poster images")
+    parser.add_argument("--csv", default="top100.csv", help="ballot CSV with uniqid and img_url columns")
+    parser.add_argument("--out-dir", default="images", help="directory to write posters into")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of concurrent downloads")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries per poster")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="base backoff in seconds")
+    parser.add_argument("--incremental", action="store_true",
+                        help="use the manifest to skip posters that have not changed")
+    args = parser.parse_args()
+
+    with instrument.run('scrape_jpgs'):
+        posters = load_poster_urls(args.csv)
+        start = time.time()
+        failures = download_posters(posters, args.out_dir, workers=args.workers,
+                                    retries=args.retries, backoff=args.backoff,
+                                    incremental=args.incremental)
+        print_summary(len(posters), failures)
+        print(f"Finished in {time.time() - start:.1f}s")
@@ -1,36 +1,80 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import argparse
 import pandas as pd
+from typing import Dict, List, Optional
+from common import DATA_DIR
+from html_parsing import DEFAULT_PARSER, PARSERS, class_strainer, fetch_html, make_soup, make_tree
+from storage import write_dataset
+import instrument
 
-url = "https://www.nytimes.com/interactive/2025/movies/votes-movies-21st-century.html"
-resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-soup = BeautifulSoup(resp.text, "html.parser")
-
-rows = []
-for person in soup.select("div.person-box"):
-    name = person.select_one("h2").get_text(strip=True)
-    for box in person.select(".movies-wrapper .grid-item"):
-        img = box.select_one("img")
-        if not img:
-            continue
-
-        rank_el = box.select_one(".top-position span")
-        rank = int(rank_el.get_text(strip=True)) if rank_el else 999
-
-        alt = img.get("alt", "")
-        title = alt.replace("movie cover for ", "").rsplit(" by", 1)[0]
-
-        img_url = img["src"]
-        uniqid = img_url.rstrip("/").split("/")[-1].split(".")[0]
-
-        rows.append({
-            "person": name,
-            "rank": rank,
-            "title": title,
-            "img_url": img_url,
-            "uniqid": uniqid
-        })
-
-df = pd.DataFrame(rows)
-print(df.head())
-df.to_csv("top100.csv", index=False)
+URL = "https://www.nytimes.com/interactive/2025/movies/votes-movies-21st-century.html"
+
+def ballot_row(name: str, rank_text: Optional[str], alt: str, img_url: str) -> Dict:
+    """Build one ballot row from the pieces of a poster grid item"""
+    rank = int(rank_text) if rank_text else 999
+    title = alt.replace("movie cover for ", "").rsplit(" by", 1)[0]
+    uniqid = img_url.rstrip("/").split("/")[-1].split(".")[0]
+    return {
+        "person": name,
+        "rank": rank,
+        "title": title,
+        "img_url": img_url,
+        "uniqid": uniqid
+    }
+
+def parse_ballots(html: str, parser: str = DEFAULT_PARSER, restrict: bool = True) -> List[Dict]:
+    """Extract (person, rank, title, img_url, uniqid) rows from the votes page
+
+    With restrict=True only the person-box subtrees are built; the rest of
+    the page (scripts, styles, the interactive chrome) is skipped while parsing.
+    """
+    if parser == 'selectolax':
+        return _parse_ballots_selectolax(html)
+
+    soup = make_soup(html, parser, class_strainer(["div"], ["person-box"]) if restrict else None)
+    rows = []
+    for person in soup.select("div.person-box"):
+        name = person.select_one("h2").get_text(strip=True)
+        for box in person.select(".movies-wrapper .grid-item"):
+            img = box.select_one("img")
+            if not img:
+                continue
+            rank_el = box.select_one(".top-position span")
+            rank_text = rank_el.get_text(strip=True) if rank_el else None
+            rows.append(ballot_row(name, rank_text, img.get("alt", ""), img["src"]))
+    return rows
+
+def _parse_ballots_selectolax(html: str) -> List[Dict]:
+    tree = make_tree(html)
+    rows = []
+    for person in tree.css("div.person-box"):
+        name = person.css_first("h2").text(strip=True)
+        for box in person.css(".movies-wrapper .grid-item"):
+            img = box.css_first("img")
+            if img is None:
+                continue
+            rank_el = box.css_first(".top-position span")
+            rank_text = rank_el.text(strip=True) if rank_el is not None else None
+            rows.append(ballot_row(name, rank_text, img.attributes.get("alt") or "", img.attributes["src"]))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the NYT ballots into top100_scraped.csv")
+    # Not top100.csv: that file is the job-joined output of addjobs.py
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, 'top100_scraped.csv'),
+                        help="where to write the raw ballots (run addjobs.py on them to update top100.csv)")
+    parser.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER, help="HTML parser backend")
+    parser.add_argument("--full-parse", action="store_true", help="build the whole document instead of only the ballot subtrees")
+    parser.add_argument("--html", help="parse a saved copy of the page instead of downloading it")
+    parser.add_argument("--save-html", help="save the downloaded page here (e.g. as a benchmark fixture)")
+    args = parser.parse_args()
+
+    with instrument.run('scrape_top100'):
+        with instrument.span('fetch'):
+            html = fetch_html(URL, args.html, args.save_html)
+        with instrument.span('parse'):
+            df = pd.DataFrame(parse_ballots(html, args.parser, restrict=not args.full_parse))
+        instrument.count('ballot_rows_total', len(df))
+        print(df.head())
+        with instrument.span('write'):
+            write_dataset(df, args.output)
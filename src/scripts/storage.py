@@ -0,0 +1,163 @@
+import os
+import pandas as pd
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Explicit column types so readers never re-infer them
+BALLOT_SCHEMA = {
+    'person': 'category',
+    'rank': 'Int16',
+    'title': 'string',
+    'img_url': 'string',
+    'uniqid': 'string',
+    'job': 'category',
+}
+
+LIST_SCHEMA = {
+    'rank': 'Int16',
+    'title': 'string',
+    'img_url': 'string',
+    'uniqid': 'string',
+}
+
+ENRICHED_SCHEMA = {
+    **LIST_SCHEMA,
+    'tmdb_id': 'Int64',
+    'original_title': 'string',
+    'original_language': 'category',
+    'runtime': 'Int32',
+    'budget': 'Int64',
+    'revenue': 'Int64',
+    'box_office': 'Int64',
+    'vote_average': 'Float64',
+    'vote_count': 'Int64',
+    'popularity': 'Float64',
+    'status': 'category',
+    'adult': 'boolean',
+    'video': 'boolean',
+    'imdb_id': 'string',
+    'wikidata_id': 'string',
+    'us_certification': 'category',
+    'rating': 'category',
+    'distributor': 'string',
+    'wikipedia_title': 'string',
+    'total_cast_count': 'Int32',
+    'total_crew_count': 'Int32',
+    'total_actors_count': 'Int32',
+}
+
+# Long-format credits and the people they point to
+CREDITS_SCHEMA = {
+    'movie_id': 'string',
+    'person_id': 'Int32',
+    'name': 'string',
+    'role': 'category',
+    'order': 'Int16',
+}
+
+# Wide actor_1..actor_5 style columns become one list column each
+NUMBERED_LIST_COLUMNS = {
+    'directors': 'director_',
+    'actors': 'actor_',
+    'cinematographers': 'cinematographer_',
+    'producers': 'producer_',
+    'writers': 'writer_',
+    'composers': 'composer_',
+    'editors': 'editor_',
+}
+
+# Comma-joined columns that hold lists
+COMMA_LIST_COLUMNS = ['genres', 'production_companies', 'production_countries', 'spoken_languages', 'keywords']
+
+def parquet_path_for(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+def schema_for(columns: List[str]) -> Dict[str, str]:
+    """Pick the schema matching a dataset's columns"""
+    if 'person_id' in columns:
+        return CREDITS_SCHEMA
+    if 'person' in columns:
+        return BALLOT_SCHEMA
+    if 'tmdb_id' in columns or 'wikipedia_title' in columns:
+        return ENRICHED_SCHEMA
+    return LIST_SCHEMA
+
+def _split_list(value) -> List[str]:
+    if not isinstance(value, str) or not value.strip():
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def _apply_schema(df: pd.DataFrame, schema: Dict[str, str]):
+    for column, dtype in schema.items():
+        if column not in df:
+            continue
+        if dtype.startswith(('Int', 'Float')):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        elif dtype == 'boolean':
+            df[column] = df[column].map({True: True, False: False, 'True': True, 'False': False}).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the explicit schema and turn wide/comma-joined credit columns into list columns"""
+    df = df.copy()
+    _apply_schema(df, schema_for(list(df.columns)))
+
+    if 'tmdb_id' in df and 'release_date' in df:
+        # TMDB dates are ISO; Wikipedia's are free text and stay strings
+        df['release_date'] = pd.to_datetime(df['release_date'], errors='coerce')
+
+    for list_column, prefix in NUMBERED_LIST_COLUMNS.items():
+        numbered = sorted((c for c in df.columns if c.startswith(prefix) and c[len(prefix):].isdigit()),
+                          key=lambda c: int(c[len(prefix):]))
+        if not numbered:
+            continue
+        values = df[numbered].astype(object).where(df[numbered].notna(), None).values.tolist()
+        df[list_column] = [[v for v in row if isinstance(v, str) and v] for row in values]
+        df = df.drop(columns=numbered)
+
+    for column in COMMA_LIST_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(_split_list)
+    return df
+
+def write_dataset(df: pd.DataFrame, csv_path: str, write_csv: bool = True) -> Optional[str]:
+    """Write the CSV and, when pyarrow is installed, a typed Parquet copy next to it
+
+    Returns the Parquet path, or None if Parquet is unavailable.
+    """
+    if write_csv:
+        df.to_csv(csv_path, index=False, encoding='utf-8')
+    if not HAS_PARQUET:
+        return None
+    parquet_path = parquet_path_for(csv_path)
+    to_typed(df).to_parquet(parquet_path, index=False)
+    return parquet_path
+
+def convert_csv(csv_path: str) -> Optional[str]:
+    """Write the typed Parquet copy of an existing CSV"""
+    return write_dataset(pd.read_csv(csv_path), csv_path, write_csv=False)
+
+def read_dataset(csv_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a dataset, preferring its Parquet copy when that is at least as new as the CSV
+
+    Only the requested columns are read from Parquet. The CSV fallback goes
+    through the same schema so both paths return the same columns and dtypes.
+    """
+    parquet_path = parquet_path_for(csv_path)
+    if (HAS_PARQUET and os.path.exists(parquet_path)
+            and (not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path))):
+        return pd.read_parquet(parquet_path, columns=columns)
+
+    df = to_typed(pd.read_csv(csv_path))
+    return df[columns] if columns is not None else df
+
+def read_records(csv_path: str, columns: Optional[List[str]] = None) -> List[Dict]:
+    """Read a dataset as a list of plain dicts, with missing values as None"""
+    df = read_dataset(csv_path, columns)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
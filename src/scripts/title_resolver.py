@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from common import DATA_DIR, atomic_write
+from enrichment_index import YEAR, normalize_title
+
+# Best candidates scoring below this are reported as unresolved rather than guessed
+MIN_SCORE = 0.75
+# Score when one title is the other plus more words, e.g. "Borat" vs "Borat Cultural Learnings of ..."
+PREFIX_SCORE = 0.9
+YEAR_BONUS = 0.1
+YEAR_PENALTY = 0.3
+# Later search results lose a little, so exact ties keep the search engine's order
+POSITION_PENALTY = 0.01
+
+LEADING_ARTICLE = re.compile(r'^(the|a|an) ')
+TRAILING_ARTICLE = re.compile(r' (the|a|an)$')
+# Wikipedia disambiguation suffix, e.g. "Amour (2012 film)"
+QUALIFIER = re.compile(r'\s*\(([^)]*)\)\s*$')
+
+def resolutions_path(source: str) -> str:
+    """Where the confirmed mappings for one source ('tmdb', 'wikipedia') are kept"""
+    return os.path.join(DATA_DIR, f"title_resolutions_{source}.json")
+
+def split_qualifier(title: str) -> Tuple[str, str]:
+    """Split "Amour (2012 film)" into ("Amour", "2012 film")"""
+    match = QUALIFIER.search(title)
+    if not match:
+        return title, ''
+    return title[:match.start()], match.group(1)
+
+def fold_accents(text: str) -> str:
+    """Drop combining accents, so "amélie" also matches "amelie\""""
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+def title_aliases(title: str, main_title: bool = False) -> List[str]:
+    """Normalized spellings a title may be listed under, most specific first
+
+    Covers "&" vs "and", accents, leading/trailing articles ("Godfather, The")
+    and Wikipedia's "(film)" qualifiers. Subtitles are kept unless
+    `main_title` is set, which also adds the part before the first ':'.
+    That is for search results, where "Borat: Cultural Learnings of ..." is
+    listed as "Borat"; for query titles it would make "The Godfather:
+    Part II" an exact match for "The Godfather".
+    """
+    base, _ = split_qualifier(str(title))
+    names = [base]
+    if main_title and ':' in base:
+        names.append(base.split(':', 1)[0])
+    aliases = []
+    for name in names:
+        name = normalize_title(name.replace('&', ' and '))
+        for alias in (name, LEADING_ARTICLE.sub('', name), TRAILING_ARTICLE.sub('', name)):
+            for spelling in (alias, fold_accents(alias)):
+                if spelling and spelling not in aliases:
+                    aliases.append(spelling)
+    return aliases
+
+def title_similarity(a: List[str], b: List[str]) -> float:
+    """Best similarity between two alias lists
+
+    Identical aliases score 1 and an alias that is a whole-word prefix of the
+    other scores PREFIX_SCORE. Other pairs get their SequenceMatcher ratio,
+    but only if they share a whole word, so "Hero" doesn't match "Her".
+    Pairs whose upper bound can't beat the best so far are skipped.
+    """
+    best = 0.0
+    for x in a:
+        for y in b:
+            if x == y:
+                return 1.0
+            if y.startswith(x + ' ') or x.startswith(y + ' '):
+                best = max(best, PREFIX_SCORE)
+                continue
+            if not set(x.split()) & set(y.split()):
+                continue
+            matcher = SequenceMatcher(None, x, y, autojunk=False)
+            if matcher.real_quick_ratio() <= best or matcher.quick_ratio() <= best:
+                continue
+            best = max(best, matcher.ratio())
+    return best
+
+def score_candidate(aliases: List[str], year: Optional[int], titles: Iterable[str],
+                    candidate_year: Optional[int], position: int = 0) -> float:
+    """Title similarity, adjusted by the year hint and the candidate's search position"""
+    candidate_aliases = []
+    for title in titles:
+        if title:
+            candidate_aliases.extend(a for a in title_aliases(title, main_title=True) if a not in candidate_aliases)
+    score = title_similarity(aliases, candidate_aliases) - POSITION_PENALTY * position
+    if year and candidate_year:
+        score += YEAR_BONUS if abs(year - candidate_year) <= 1 else -YEAR_PENALTY
+    return score
+
+def year_in(text: Optional[str]) -> Optional[int]:
+    match = YEAR.search(text or '')
+    return int(match.group(1)) if match else None
+
+# Turns a search result into (titles to compare against, release year)
+Describe = Callable[[Dict], Tuple[List[str], Optional[int]]]
+
+def best_candidate(title: str, year: Optional[int], candidates: List[Dict],
+                   describe: Describe) -> Tuple[Optional[Dict], float]:
+    """Return the highest-scoring candidate and its score"""
+    aliases = title_aliases(title)
+    best, best_score = None, 0.0
+    for position, candidate in enumerate(candidates):
+        titles, candidate_year = describe(candidate)
+        score = score_candidate(aliases, year, titles, candidate_year, position)
+        if score > best_score:
+            best, best_score = candidate, score
+    return best, best_score
+
+class TitleResolver:
+    """Confirmed title -> match mappings for one source, shared across lists and runs
+
+    Mappings are stored as JSON keyed by normalized title and year hint, and
+    are also indexed under every alias of the query title, so
+    "The Godfather: Part II" finds a match recorded for "Godfather Part II".
+    Entries marked "confirmed": true are manual fixes and are never replaced.
+    Only titles missing from the file are searched for.
+    """
+
+    def __init__(self, path: str, describe: Describe, min_score: float = MIN_SCORE):
+        self.path = path
+        self.describe = describe
+        self.min_score = min_score
+        self.entries: Dict[str, Dict] = {}
+        self.by_alias: Dict[str, List[str]] = {}
+        self.hits = 0
+        self.searches = 0
+        self.unresolved = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for key, entry in json.load(f).items():
+                    self._add(key, entry)
+
+    @staticmethod
+    def key(title: str, year: Optional[int]) -> str:
+        return f"{normalize_title(title)}|{year or ''}"
+
+    def _add(self, key: str, entry: Dict):
+        self.entries[key] = entry
+        for alias in title_aliases(entry['query']):
+            keys = self.by_alias.setdefault(alias, [])
+            if key not in keys:
+                keys.append(key)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, title: str, year: Optional[int] = None) -> Optional[Dict]:
+        """Return the recorded match for a title, or None if unknown or ambiguous"""
+        with self._lock:
+            entry = self.entries.get(self.key(title, year))
+            if entry is not None:
+                return entry['match']
+            keys = []
+            for alias in title_aliases(title):
+                keys.extend(k for k in self.by_alias.get(alias, []) if k not in keys)
+            entries = [self.entries[k] for k in keys]
+            if year:
+                entries = [e for e in entries if e.get('year') in (year, None)]
+            # Different films sharing a title are only told apart by a year hint
+            return entries[0]['match'] if len(entries) == 1 else None
+
+    def record(self, title: str, year: Optional[int], match: Dict, score: float):
+        with self._lock:
+            key = self.key(title, year)
+            if self.entries.get(key, {}).get('confirmed'):
+                return
+            self._add(key, {'query': title, 'year': year, 'match': match, 'score': round(score, 3)})
+
+    def resolve(self, title: str, year: Optional[int],
+                search: Callable[[str, Optional[int]], List[Dict]]) -> Optional[Dict]:
+        """Return the match for a title, searching and scoring candidates only when it isn't recorded"""
+        found = self.lookup(title, year)
+        with self._lock:
+            if found is not None:
+                self.hits += 1
+                return found
+            self.searches += 1
+        candidates = search(title, year)
+        best, score = best_candidate(title, year, candidates, self.describe)
+        if best is None or score < self.min_score:
+            with self._lock:
+                self.unresolved += 1
+            if best is not None:
+                print(f"  Unresolved '{title}': best candidate {self.describe(best)[0][0]!r} scored {score:.2f}")
+            return None
+        self.record(title, year, best, score)
+        return best
+
+    def save(self):
+        """Write the mappings back, sorted so the file diffs cleanly"""
+        with self._lock:
+            data = json.dumps(dict(sorted(self.entries.items())), indent=1, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        atomic_write(self.path, (data + "\n").encode('utf-8'))
+
+    def summary(self) -> str:
+        return (f"Title resolution: {self.hits} from {os.path.basename(self.path)}, "
+                f"{self.searches} searched, {self.unresolved} unresolved")
@@ -0,0 +1,188 @@
+import io
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from PIL import Image, features
+from concurrent.futures import ProcessPoolExecutor
+from common import atomic_write
+from typing import Dict, List, Optional, Tuple
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets')
+SOURCE_DIR = os.path.join(ASSETS_DIR, 'images')
+OUTPUT_DIR = os.path.join(ASSETS_DIR, 'posters')
+MANIFEST_NAME = "manifest.json"
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Target widths: thumb covers the 52px share-card tiles at 2x, full the 300px cards
+VARIANTS = {'thumb': 104, 'full': 300}
+FORMATS = ['webp', 'avif']
+QUALITY = {'webp': 80, 'avif': 55}
+BLURHASH_COMPONENTS = (4, 3)
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def _base83(value: int, length: int) -> str:
+    return ''.join(BASE83[(value // 83 ** (length - 1 - i)) % 83] for i in range(length))
+
+def _srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    values = values / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+def _linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def blurhash(image: Image.Image, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """Encode a BlurHash placeholder (https://blurha.sh) from a small RGB copy of the image"""
+    cx, cy = components
+    small = image.convert('RGB')
+    small.thumbnail((32, 32))
+    pixels = _srgb_to_linear(np.asarray(small, dtype=np.float64))
+    height, width, _ = pixels.shape
+    xs = np.arange(width) / width
+    ys = np.arange(height) / height
+
+    factors = []
+    for j in range(cy):
+        for i in range(cx):
+            basis = np.outer(np.cos(np.pi * j * ys), np.cos(np.pi * i * xs))
+            scale = 1.0 if i == 0 and j == 0 else 2.0
+            factors.append(scale * (pixels * basis[:, :, None]).mean(axis=(0, 1)))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((cx - 1) + (cy - 1) * 9, 1)
+    if ac:
+        actual_max = max(float(np.abs(f).max()) for f in ac)
+        quantised_max = int(max(0, min(82, np.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        q = [int(max(0, min(18, np.floor(np.sign(v) * abs(v / max_value) ** 0.5 * 9 + 9.5)))) for v in factor]
+        result += _base83(q[0] * 19 * 19 + q[1] * 19 + q[2], 2)
+    return result
+
+def available_formats(formats: List[str]) -> List[str]:
+    """The requested output formats this Pillow build can encode"""
+    return [fmt for fmt in formats if features.check(fmt)]
+
+def variant_path(out_dir: str, variant: str, uniqid: str, fmt: str) -> str:
+    return os.path.join(out_dir, variant, f"{uniqid}.{fmt}")
+
+def transcode_poster(job: Tuple[str, str, str, str, Dict[str, int], List[str]]) -> Tuple[str, Dict]:
+    """Decode one source poster once and write every variant/format. Runs in a worker process"""
+    uniqid, source_path, sha256, out_dir, variants, formats = job
+    with Image.open(source_path) as source:
+        image = source.convert('RGB')
+    entry = {
+        'source': os.path.basename(source_path),
+        'sha256': sha256,
+        'width': image.width,
+        'height': image.height,
+        'blurhash': blurhash(image),
+        'variants': {},
+    }
+    for variant, width in variants.items():
+        resized = image if image.width <= width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS)
+        files = {}
+        for fmt in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+            path = variant_path(out_dir, variant, uniqid, fmt)
+            atomic_write(path, buffer.getvalue())
+            files[fmt] = {'path': os.path.relpath(path, out_dir), 'bytes': buffer.tell()}
+        entry['variants'][variant] = {'width': resized.width, 'height': resized.height, **files}
+    return uniqid, entry
+
+def find_sources(source_dir: str) -> Dict[str, str]:
+    """Map uniqid -> source poster path"""
+    sources = {}
+    for name in sorted(os.listdir(source_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in SOURCE_EXTENSIONS:
+            sources[stem] = os.path.join(source_dir, name)
+    return sources
+
+def file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_manifest(out_dir: str) -> Dict:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def transcode_posters(source_dir: str = SOURCE_DIR, out_dir: str = OUTPUT_DIR,
+                      workers: Optional[int] = None, variants: Dict[str, int] = VARIANTS,
+                      formats: List[str] = FORMATS, force: bool = False) -> Dict:
+    """Write WebP/AVIF variants of every source poster and a manifest of sizes and blurhashes
+
+    Only posters whose source hash changed (or whose outputs are missing) are
+    processed, on a pool of `workers` processes. Changing the variants,
+    formats or quality settings reprocesses everything.
+    """
+    formats = available_formats(formats)
+    settings = {'variants': variants, 'formats': formats, 'quality': {f: QUALITY[f] for f in formats}}
+    for variant in variants:
+        os.makedirs(os.path.join(out_dir, variant), exist_ok=True)
+
+    manifest = load_manifest(out_dir)
+    previous = manifest.get('posters', {}) if manifest.get('settings') == settings and not force else {}
+    sources = find_sources(source_dir)
+
+    posters = {}
+    jobs = []
+    for uniqid, path in sources.items():
+        sha256 = file_sha256(path)
+        entry = previous.get(uniqid)
+        outputs_exist = all(os.path.exists(variant_path(out_dir, v, uniqid, f)) for v in variants for f in formats)
+        if entry is not None and entry['sha256'] == sha256 and outputs_exist:
+            posters[uniqid] = entry
+        else:
+            jobs.append((uniqid, path, sha256, out_dir, variants, formats))
+
+    print(f"{len(sources)} posters, {len(jobs)} to transcode into {', '.join(formats)}")
+    start = time.time()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for uniqid, entry in executor.map(transcode_poster, jobs, chunksize=8):
+                posters[uniqid] = entry
+    print(f"Transcoded {len(jobs)} posters in {time.time() - start:.1f}s")
+
+    manifest = {'settings': settings, 'posters': dict(sorted(posters.items()))}
+    atomic_write(os.path.join(out_dir, MANIFEST_NAME),
+                 json.dumps(manifest, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return manifest
+
+def print_sizes(source_dir: str, manifest: Dict):
+    """Compare total bytes of the sources with each variant/format"""
+    source_bytes = sum(os.path.getsize(p) for p in find_sources(source_dir).values())
+    print(f"  {'source':14s}{source_bytes / 1e6:8.2f} MB")
+    posters = manifest['posters'].values()
+    for variant in manifest['settings']['variants']:
+        for fmt in manifest['settings']['formats']:
+            total = sum(p['variants'][variant][fmt]['bytes'] for p in posters)
+            print(f"  {variant + ' ' + fmt:14s}{total / 1e6:8.2f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcode posters to responsive WebP/AVIF variants")
+    parser.add_argument("--src", default=SOURCE_DIR, help="directory of downloaded posters")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="directory for variants and manifest.json")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=FORMATS, help="output formats")
+    parser.add_argument("--force", action="store_true", help="reprocess every poster")
+    args = parser.parse_args()
+
+    manifest = transcode_posters(args.src, args.out, args.workers, formats=args.formats, force=args.force)
+    print_sizes(args.src, manifest)
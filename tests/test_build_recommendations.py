@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from ballot_matrix import BallotMatrix
+from build_recommendations import build_recommendations, cooccurrence, recommend, smoothed_lift, top_k_rows
+
+BALLOTS = pd.DataFrame({
+    'person': ['Ana', 'Ana', 'Ben', 'Ben', 'Cy', 'Cy', 'Cy', 'Dee', 'Eve'],
+    'title': ['Her', 'Hero', 'Her', 'Hero', 'Her', 'Hero', 'Borat', 'Amour', 'Borat'],
+})
+
+def table(**kwargs):
+    return build_recommendations(BallotMatrix.from_frame(BALLOTS), **kwargs)
+
+def neighbors_of(result, title):
+    i = result['titles'].index(title)
+    return [result['titles'][j] for j in result['neighbors'][i]]
+
+def test_cooccurrence_counts_shared_voters_without_diagonal():
+    matrix = BallotMatrix.from_frame(BALLOTS)
+    counts = cooccurrence(matrix).toarray()
+    her, hero = matrix.titles.index('Her'), matrix.titles.index('Hero')
+    assert counts[her, hero] == counts[hero, her] == 3
+    assert np.all(np.diag(counts) == 0)
+
+def test_smoothing_damps_rare_pairs():
+    counts = sparse.csr_matrix(np.array([[0, 1, 10], [1, 0, 0], [10, 0, 0]]))
+    votes = np.array([10, 1, 10])
+    lift = smoothed_lift(counts, votes, voters=100, prior=3).toarray()
+    assert lift[0, 2] > lift[0, 1]
+    assert lift[0, 1] == pytest.approx(1 * 100 / (13 * 4))
+
+def test_top_k_keeps_best_columns_first():
+    scores = sparse.csr_matrix(np.array([[0, 3.0, 1.0, 2.0]], dtype=np.float32))
+    neighbors, kept = top_k_rows(scores, k=2)
+    assert neighbors == [[1, 3]] and kept == [[3.0, 2.0]]
+
+def test_frequent_pair_ranks_first():
+    result = table()
+    assert neighbors_of(result, 'Her')[0] == 'Hero'
+    assert neighbors_of(result, 'Amour') == []
+
+def test_recommend_skips_the_selection_and_pads_with_popular_titles():
+    suggestions = recommend(table(), ['Her'], count=3)
+    titles = [title for title, _ in suggestions]
+    assert titles[:2] == ['Hero', 'Borat']
+    assert 'Her' not in titles and len(titles) == 3
+    assert suggestions[2] == ('Amour', 0.0)
+
+def test_popularity_csv_orders_the_fallback(tmp_path):
+    path = tmp_path / 'top500.csv'
+    pd.DataFrame({'title': ['AMOUR', 'Borat'], 'rank': [1, 2]}).to_csv(path, index=False)
+    result = table(popularity_csv=str(path))
+    assert [result['titles'][j] for j in result['popular'][:2]] == ['Amour', 'Borat']
+    assert recommend(result, ['Amour'], count=1) == [('Borat', 0.0)]
+
+def test_unknown_titles_are_ignored():
+    result = table()
+    assert recommend(result, ['Not on the list'], count=2) == [
+        (result['titles'][j], 0.0) for j in result['popular'][:2]]
@@ -0,0 +1,41 @@
+import csv
+from checkpoint import CheckpointWriter, merge_checkpoint, read_checkpoint, resume_position
+
+ROWS = [{'title': 'Mulholland Drive'}, {'title': 'In the Mood for Love'}, {'title': 'There Will Be Blood'}]
+
+def write(path, rows, torn=''):
+    writer = CheckpointWriter(str(path))
+    for row in rows:
+        writer.write(row)
+    writer.close()
+    if torn:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(torn)
+
+def test_resume_position_counts_rows_and_drops_torn_line(tmp_path):
+    path = tmp_path / 'out.csv.partial.jsonl'
+    write(path, ROWS[:2], torn='{"title": "There Will')
+    assert resume_position(str(path), ROWS) == 2
+    # The torn line is gone, so appending continues on a clean line
+    writer = CheckpointWriter(str(path), append=True)
+    writer.write(ROWS[2])
+    writer.close()
+    assert [row['title'] for row in read_checkpoint(str(path))] == [row['title'] for row in ROWS]
+
+def test_resume_position_rejects_other_input(tmp_path):
+    path = tmp_path / 'out.csv.partial.jsonl'
+    write(path, ROWS[1:])
+    assert resume_position(str(path), ROWS) == 0
+    assert resume_position(str(tmp_path / 'missing.jsonl'), ROWS) == 0
+
+def test_merge_checkpoint_unions_columns(tmp_path):
+    path = tmp_path / 'out.csv.partial.jsonl'
+    write(path, [{'title': 'Her', 'runtime': 126, 'credits': [1]},
+                 {'title': 'Hero', 'director': 'Zhang Yimou', 'runtime': None}])
+    output = tmp_path / 'out.csv'
+    assert merge_checkpoint(str(path), str(output), exclude=['credits']) == 2
+    with open(output, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == ['title', 'runtime', 'director']
+        assert list(reader) == [{'title': 'Her', 'runtime': '126', 'director': ''},
+                                {'title': 'Hero', 'runtime': '', 'director': 'Zhang Yimou'}]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ballot_matrix import BallotMatrix
+from consensus_rank import aggregate, ballot_weights, bootstrap_ranks, rank_scores
+
+BALLOTS = pd.DataFrame({
+    'person': ['Ana', 'Ana', 'Ana', 'Ben', 'Cy', 'Cy'],
+    'title': ['Her', 'Hero', 'Borat', 'Her', 'Her', 'Borat'],
+    'rank': [5, 999, 60, 5, 5, 60],
+})
+
+def scores(method):
+    matrix = BallotMatrix.from_frame(BALLOTS)
+    totals = aggregate(ballot_weights(BALLOTS, matrix, method))
+    return dict(zip(matrix.titles, totals))
+
+def test_count_gives_one_point_per_pick():
+    assert scores('count') == {'Borat': 2, 'Her': 3, 'Hero': 1}
+
+def test_points_split_one_point_per_voter():
+    result = scores('points')
+    assert result == pytest.approx({'Borat': 1 / 3 + 1 / 2, 'Her': 1 / 3 + 1 + 1 / 2, 'Hero': 1 / 3})
+    assert sum(result.values()) == pytest.approx(3)
+
+def test_positional_rules_are_rejected():
+    with pytest.raises(ValueError):
+        ballot_weights(BALLOTS, BallotMatrix.from_frame(BALLOTS), 'borda')
+
+def test_rank_scores_share_ties():
+    assert rank_scores(np.array([3.0, 1.0, 3.0, 2.0])).tolist() == [1, 4, 1, 3]
+
+def test_bootstrap_is_independent_of_workers():
+    weights = ballot_weights(BALLOTS, BallotMatrix.from_frame(BALLOTS), 'count')
+    serial = bootstrap_ranks(weights, resamples=300, workers=1, seed=7)
+    assert serial.shape == (300, 3)
+    assert np.array_equal(serial, bootstrap_ranks(weights, resamples=300, workers=2, seed=7))
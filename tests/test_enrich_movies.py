@@ -0,0 +1,40 @@
+import json
+import pytest
+from enrich_movies import FetchPlan
+
+PAYLOAD = {
+    'id': 238, 'title': 'The Godfather', 'runtime': 175, 'budget': 6000000, 'homepage': 'https://example.com',
+    'genres': [{'id': 18, 'name': 'Drama'}, {'id': 80, 'name': 'Crime'}],
+    'credits': {'cast': [{'name': 'Marlon Brando', 'character': 'Vito', 'profile_path': '/a.jpg'}],
+                'crew': [{'name': 'Francis Ford Coppola', 'job': 'Director', 'department': 'Directing'}]},
+    'keywords': {'keywords': [{'id': 1, 'name': 'mafia'}]},
+    'external_ids': {'imdb_id': 'tt0068646', 'wikidata_id': 'Q47703'},
+}
+
+def test_project_body_keeps_only_fields_the_columns_read():
+    plan = FetchPlan(['tmdb_id', 'runtime', 'genres'])
+    body = json.loads(plan.project_body(json.dumps(PAYLOAD).encode('utf-8')))
+    assert body == {
+        'id': 238, 'runtime': 175,
+        'genres': [{'name': 'Drama'}, {'name': 'Crime'}],
+        'credits': {'cast': [{'name': 'Marlon Brando'}],
+                    'crew': [{'name': 'Francis Ford Coppola', 'job': 'Director'}]},
+    }
+    assert plan.params() == {'append_to_response': 'credits'}
+
+def test_extra_columns_append_their_resources():
+    plan = FetchPlan(['tmdb_id', 'wikidata_id'])
+    assert plan.params() == {'append_to_response': 'credits,external_ids'}
+    body = json.loads(plan.project_body(json.dumps(PAYLOAD).encode('utf-8')))
+    assert body['external_ids'] == {'wikidata_id': 'Q47703'}
+    assert plan.signature != FetchPlan(['tmdb_id']).signature
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(ValueError):
+        FetchPlan(['tmdb_id', 'box_office'])
+
+def test_key_column_is_always_written():
+    plan = FetchPlan(['runtime'])
+    assert plan.columns == ['tmdb_id', 'runtime']
+    body = json.loads(plan.project_body(json.dumps(PAYLOAD).encode('utf-8')))
+    assert body['id'] == 238
@@ -0,0 +1,65 @@
+import json
+import pytest
+import enrich_movies_wikipedia
+from http_cache import CachedResponse
+from enrich_movies_wikipedia import BATCH_SIZE, lookup_titles_batch, page_names
+
+# Existing pages: title -> (description, disambiguation); plus redirects
+PAGES = {
+    'Her (film)': ('2013 film by Spike Jonze', False),
+    'Her': ('Topics referred to by the same term', True),
+    'Amour (2012 film)': ('2012 film by Michael Haneke', False),
+    'Amour': ('French word', False),
+    'Borat': ('2006 film by Larry Charles', False),
+}
+REDIRECTS = {'Amour (film)': 'Amour (2012 film)'}
+
+@pytest.fixture
+def requests_made(monkeypatch):
+    made = []
+
+    def fake_get(url, params=None, **kwargs):
+        made.append(params)
+        names = params['titles'].split('|')
+        redirects = [{'from': n, 'to': REDIRECTS[n]} for n in names if n in REDIRECTS]
+        pages = []
+        for name in dict.fromkeys(REDIRECTS.get(n, n) for n in names):
+            if name not in PAGES:
+                pages.append({'title': name, 'missing': True})
+                continue
+            description, disambiguation = PAGES[name]
+            page = {'title': name, 'description': description}
+            if disambiguation:
+                page['pageprops'] = {'disambiguation': ''}
+            pages.append(page)
+        body = json.dumps({'query': {'redirects': redirects, 'pages': pages}}).encode('utf-8')
+        return CachedResponse(url, 200, {'Content-Type': 'application/json'}, body)
+
+    monkeypatch.setattr(enrich_movies_wikipedia, 'cached_get', fake_get)
+    return made
+
+def test_page_names_try_the_year_qualifier_first():
+    assert page_names('Her', 2013) == ['Her (2013 film)', 'Her (film)', 'Her']
+    assert page_names('Her') == ['Her (film)', 'Her']
+
+def test_titles_resolve_by_page_name(requests_made):
+    found = lookup_titles_batch(['Her', 'Amour', 'Borat'], [2013, None, 2006])
+    assert found == {
+        0: {'title': 'Her (film)', 'snippet': '2013 film by Spike Jonze'},
+        1: {'title': 'Amour (2012 film)', 'snippet': '2012 film by Michael Haneke'},
+        2: {'title': 'Borat', 'snippet': '2006 film by Larry Charles'},
+    }
+    assert len(requests_made) == 1
+
+def test_disambiguation_and_non_film_pages_are_left_for_search(requests_made, monkeypatch):
+    monkeypatch.setitem(PAGES, 'Her (film)', ('2013 film by Spike Jonze', True))
+    monkeypatch.setitem(REDIRECTS, 'Amour (film)', 'Amour (disambiguation)')
+    assert lookup_titles_batch(['Her', 'Amour'], [None, None]) == {}
+
+def test_wrong_year_is_rejected(requests_made):
+    assert lookup_titles_batch(['Borat'], [1980]) == {}
+
+def test_names_are_sent_in_batches(requests_made):
+    titles = [f"Film {i}" for i in range(BATCH_SIZE)]
+    assert lookup_titles_batch(titles, [None] * len(titles)) == {}
+    assert [len(p['titles'].split('|')) for p in requests_made] == [BATCH_SIZE, BATCH_SIZE]
@@ -0,0 +1,45 @@
+from enrichment_index import EnrichmentIndex, forced_matcher, normalize_title, row_key
+
+PRIOR = [
+    {'uniqid': 'u1', 'title': 'Her', 'year': '2013', 'tmdb_id': '152601'},
+    {'uniqid': '', 'title': 'Hero', 'year': '2002', 'tmdb_id': '79'},
+    {'uniqid': '', 'title': 'Hero', 'year': '1992', 'tmdb_id': '11'},
+    {'uniqid': '', 'title': 'Amour', 'year': '', 'tmdb_id': '86837'},
+    {'uniqid': 'u9', 'title': 'Not enriched', 'year': '2001', 'tmdb_id': ''},
+]
+
+def index():
+    return EnrichmentIndex(PRIOR, 'tmdb_id')
+
+def test_unenriched_rows_are_not_indexed():
+    assert len(index()) == 4
+    assert index().lookup({'uniqid': 'u9', 'title': 'Not enriched'}) is None
+
+def test_uniqid_match_wins_over_title():
+    found = index().lookup({'uniqid': 'u1', 'title': 'Renamed in the new list', 'year': '1990'})
+    assert found['tmdb_id'] == '152601'
+
+def test_other_uniqid_with_same_title_is_a_different_movie():
+    assert index().lookup({'uniqid': 'u2', 'title': 'Her', 'year': '2013'}) is None
+
+def test_title_without_year_is_ambiguous_when_shared():
+    assert index().lookup({'title': 'HERO'}) is None
+
+def test_year_hint_picks_one_of_several_titles():
+    assert index().lookup({'title': 'Hero', 'release_date': '2002-10-24'})['tmdb_id'] == '79'
+    assert index().lookup({'title': 'Hero', 'year': '1975'}) is None
+
+def test_prior_row_without_year_matches_any_year():
+    assert index().lookup({'uniqid': 'u5', 'title': 'Amour', 'year': '2012'})['tmdb_id'] == '86837'
+
+def test_row_key_prefers_uniqid():
+    assert row_key({'uniqid': 'u1', 'title': 'Her'}) == ('uniqid', 'u1')
+    assert row_key({'title': 'The  Godfather!', 'year': 1972}) == ('title', 'the godfather', 1972)
+    assert normalize_title('Amélie') == 'amélie'
+
+def test_forced_matcher_accepts_titles_and_uniqids():
+    is_forced = forced_matcher(['u1', 'The Godfather'])
+    assert is_forced({'uniqid': 'u1', 'title': 'Her'})
+    assert is_forced({'title': 'the godfather'})
+    assert not is_forced({'uniqid': 'u2', 'title': 'Hero'})
+    assert not forced_matcher(None)({'uniqid': 'u1'})
@@ -0,0 +1,84 @@
+import pytest
+import requests
+from replay import StandInServer, FixtureStore
+from http_cache import DEFAULT_TIMEOUT, CacheMiss, HttpCache, cache_key
+
+PAGES = {name: f"https://api.test/{name}" for name in ('a', 'b', 'c')}
+
+@pytest.fixture
+def server(tmp_path):
+    store = FixtureStore(str(tmp_path / 'fixtures'))
+    for name, url in PAGES.items():
+        store.record('GET', url, 200, {'Content-Type': 'text/plain'}, f"page {name}!!".encode())
+    store.record('GET', 'https://api.test/busy', 503, {'Content-Type': 'text/plain'}, b'busy')
+    server = StandInServer(str(tmp_path / 'fixtures')).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def url(server, name):
+    return f"{server.url}/api.test/{name}"
+
+def make_cache(tmp_path, **kwargs):
+    return HttpCache(path=str(tmp_path / 'cache.sqlite'), **kwargs)
+
+def test_cache_key_ignores_api_key_and_param_order():
+    assert cache_key('u', {'b': 2, 'a': 1, 'api_key': 'x'}) == cache_key('u', {'a': 1, 'b': 2})
+
+def test_fresh_entries_are_served_from_cache(server, tmp_path):
+    cache = make_cache(tmp_path)
+    first = cache.get(url(server, 'a'))
+    second = cache.get(url(server, 'a'))
+    assert first.content == second.content == b'page a!!'
+    assert not first.from_cache and second.from_cache
+    assert server.reset_stats()['requests'] == 1
+
+def test_only_200_responses_are_stored(server, tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get(url(server, 'busy')).status_code == 503
+    assert cache.get(url(server, 'busy')).status_code == 503
+    assert server.reset_stats()['requests'] == 2
+
+def test_expired_entries_are_refetched(server, tmp_path):
+    cache = make_cache(tmp_path, ttls={f"{server.url}/api.test/": 60})
+    cache.get(url(server, 'a'))
+    cache._conn.execute("UPDATE responses SET created = created - 120")
+    assert not cache.get(url(server, 'a')).from_cache
+    assert server.reset_stats()['requests'] == 2
+
+def test_longest_prefix_sets_the_ttl(tmp_path):
+    cache = make_cache(tmp_path, ttls={'https://x/': 10, 'https://x/search/': 1}, default_ttl=5)
+    assert cache.ttl_for('https://x/search/q') == 1
+    assert cache.ttl_for('https://x/movie/1') == 10
+    assert cache.ttl_for('https://y/') == 5
+
+def test_least_recently_used_entries_are_evicted(server, tmp_path):
+    # Each body is 8 bytes: the third insert goes over budget and evicts 'b', untouched since it was stored
+    cache = make_cache(tmp_path, max_bytes=20)
+    cache.get(url(server, 'a'))
+    cache.get(url(server, 'b'))
+    cache.get(url(server, 'a'))
+    cache.get(url(server, 'c'))
+    assert cache.lookup(url(server, 'a')) is not None
+    assert cache.lookup(url(server, 'b')) is None
+    assert cache.lookup(url(server, 'c')) is not None
+
+def test_offline_mode_serves_stale_entries_and_never_fetches(server, tmp_path):
+    make_cache(tmp_path).get(url(server, 'a'))
+    server.reset_stats()
+    cache = make_cache(tmp_path, ttls={f"{server.url}/api.test/": 0}, offline=True)
+    assert cache.get(url(server, 'a')).content == b'page a!!'
+    with pytest.raises(CacheMiss):
+        cache.get(url(server, 'b'))
+    assert server.reset_stats()['requests'] == 0
+
+def test_requests_have_a_timeout(server, tmp_path):
+    timeouts = []
+    class Session(requests.Session):
+        def get(self, *args, **kwargs):
+            timeouts.append(kwargs.get('timeout'))
+            return super().get(*args, **kwargs)
+    cache = make_cache(tmp_path, session=Session())
+    cache.get(url(server, 'a'))
+    cache.get(url(server, 'b'), timeout=5)
+    assert timeouts == [DEFAULT_TIMEOUT, 5]
@@ -0,0 +1,43 @@
+from infobox_parser import clean_value, parse_infobox, split_params
+
+BODY = """Infobox film
+| name = Amélie
+| image = Amelie poster.jpg<!-- poster | French release -->
+| director = [[Jean-Pierre Jeunet]]
+| starring = {{Plainlist|
+* [[Audrey Tautou]]
+* [[Mathieu Kassovitz]]
+}}
+| released = {{Film date|2001|4|25|France}}
+| budget = 77 million francs<ref name="a|b">Box office</ref>
+| country = France<br />Germany
+"""
+
+def test_split_params_only_splits_top_level_pipes():
+    params = split_params(BODY)
+    assert list(params) == ['name', 'image', 'director', 'starring', 'released', 'budget', 'country']
+    assert 'Mathieu Kassovitz' in params['starring']
+    assert '<ref name="a|b">' in params['budget']
+    assert '<!-- poster | French release -->' in params['image']
+
+def test_clean_value_plain_text_is_trimmed():
+    assert clean_value(" 122 minutes\n") == "122 minutes"
+
+def test_clean_value_strips_markup():
+    params = split_params(BODY)
+    assert clean_value(params['director']) == 'Jean-Pierre Jeunet'
+    assert clean_value(params['starring']) == 'Audrey Tautou, Mathieu Kassovitz'
+    assert clean_value(params['released']) == '2001-04-25 (France)'
+    assert clean_value(params['budget']) == '77 million francs'
+    assert clean_value(params['country']) == 'France, Germany'
+    assert clean_value(params['image']) == 'Amelie poster.jpg'
+
+def test_parse_infobox_returns_requested_fields():
+    wikitext = "'''Amélie''' is a film.\n{{" + BODY + "}}\nPlot."
+    assert parse_infobox(wikitext, ['director', 'runtime']) == {'director': 'Jean-Pierre Jeunet', 'runtime': ''}
+
+def test_film_date_keeps_only_the_first_release():
+    released = "{{Film date|2012|5|20|[[2012 Cannes Film Festival|Cannes]]|2012|9|20|Germany|2012|10|24|France}}"
+    assert clean_value(released) == '2012-05-20 (Cannes)'
+    assert clean_value("{{Film date|2012|5|20}}") == '2012-05-20'
+    assert clean_value("{{Start date|2012|5|20|df=y}}") == '2012-05-20'
@@ -0,0 +1,29 @@
+import instrument
+
+def test_metrics_dir_follows_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('TOP100_METRICS_DIR', str(tmp_path))
+    assert instrument.metrics_dir() == str(tmp_path)
+    monkeypatch.setenv('TOP100_METRICS_DIR', '0')
+    assert instrument.metrics_dir() is None
+    monkeypatch.delenv('TOP100_METRICS_DIR')
+    assert instrument.metrics_dir() == instrument.DEFAULT_METRICS_DIR
+
+def test_reports_are_found_in_the_configured_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv('TOP100_METRICS_DIR', str(tmp_path))
+    monkeypatch.delenv('TOP100_PROMETHEUS', raising=False)
+    monkeypatch.delenv('TOP100_PROFILE', raising=False)
+    with instrument.run('demo'):
+        with instrument.span('fetch'):
+            instrument.count('http_requests_total', host='example.org')
+    reports = instrument.latest_reports('demo')
+    assert len(reports) == 1 and reports[0].startswith(str(tmp_path))
+
+def test_prometheus_counters_end_in_total(monkeypatch, tmp_path):
+    monkeypatch.setenv('TOP100_METRICS_DIR', '0')
+    with instrument.run('demo'):
+        with instrument.span('fetch'):
+            pass
+    text = instrument.prometheus_text(instrument.REGISTRY.report())
+    counters = [line.split()[2] for line in text.splitlines() if line.startswith('# TYPE') and line.endswith('counter')]
+    assert counters and all(name.endswith('_total') for name in counters)
+    assert 'top100_span_count_total{script="demo",span="fetch"} 1' in text
@@ -0,0 +1,37 @@
+import pandas as pd
+from jobs_join import UNKNOWN_JOB, join_jobs, load_jobs, normalize_name
+
+BALLOTS = pd.DataFrame({
+    'person': ['Pedro  Almodóvar', 'Pedro  Almodóvar', 'sofia coppola', 'Nobody Known', 'Greta Gerwig'],
+    'title': ['Her', 'Hero', 'Her', 'Borat', 'Her'],
+})
+
+def jobs_file(tmp_path):
+    path = tmp_path / 'jobs.txt'
+    path.write_text(
+        "Directors\tPedro Almodóvar, Sofia Coppola, Greta Gerwig\n"
+        "Actors\tGreta Gerwig, Emma Stone\n"
+        "not a category line\n",
+        encoding='utf-8')
+    return load_jobs(str(path))
+
+def test_normalize_name_folds_case_and_whitespace():
+    assert normalize_name('  Sofia  COPPOLA ') == 'sofia coppola'
+
+def test_names_match_after_normalization(tmp_path):
+    df, report = join_jobs(BALLOTS, jobs_file(tmp_path))
+    assert list(df['job']) == ['Directors', 'Directors', 'Directors', UNKNOWN_JOB, 'Directors']
+    assert report['unmatched'] == ['Nobody Known']
+
+def test_ambiguous_names_keep_first_category(tmp_path):
+    _, report = join_jobs(BALLOTS, jobs_file(tmp_path))
+    assert report['ambiguous'] == [('Greta Gerwig', ['Directors', 'Actors'])]
+
+def test_unused_entries_are_reported(tmp_path):
+    _, report = join_jobs(BALLOTS, jobs_file(tmp_path))
+    assert report['unused'] == ['Emma Stone']
+
+def test_ambiguous_names_without_ballots_are_not_reported(tmp_path):
+    _, report = join_jobs(BALLOTS[BALLOTS['person'] != 'Greta Gerwig'], jobs_file(tmp_path))
+    assert report['ambiguous'] == []
+    assert report['unused'] == ['Emma Stone', 'Greta Gerwig']
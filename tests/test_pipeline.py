@@ -0,0 +1,61 @@
+import pytest
+from pipeline import Stage, build, fingerprint, is_stale, load_state
+
+def touch(path, text='x'):
+    path.write_text(text)
+    return str(path)
+
+@pytest.fixture
+def dag(tmp_path):
+    """scrape (network) -> jobs -> export, plus an enricher nothing is built from"""
+    scraped, ballots, bundle = tmp_path / 'scraped.csv', tmp_path / 'top100.csv', tmp_path / 'bundle.json'
+    stages = [
+        Stage('scrape', 'no_such_script.py', [], [], [str(scraped)], network=True),
+        Stage('jobs', 'no_such_script.py', ['jobs'], [str(scraped)], [str(ballots)], deps=['scrape']),
+        Stage('export', 'no_such_script.py', ['export'], [str(ballots)], [str(bundle)], deps=['jobs']),
+        Stage('tmdb', 'no_such_script.py', ['tmdb'], [str(ballots)], [str(tmp_path / 'enriched.csv')],
+              deps=['jobs'], network=True),
+    ]
+    return {stage.name: stage for stage in stages}, ballots, bundle
+
+def test_fresh_checkout_keeps_committed_outputs(dag):
+    stages, ballots, bundle = dag
+    touch(ballots)
+    touch(bundle)
+    assert not is_stale(stages['scrape'], {}, stages)
+    assert not is_stale(stages['jobs'], {}, stages)
+    assert not is_stale(stages['tmdb'], {}, stages)
+
+def test_network_stage_runs_when_nothing_can_be_kept(dag):
+    stages, _, _ = dag
+    assert is_stale(stages['scrape'], {}, stages)
+    assert not is_stale(stages['tmdb'], {}, stages)
+
+def test_local_stage_follows_its_fingerprint(dag):
+    stages, ballots, bundle = dag
+    touch(ballots)
+    touch(bundle)
+    state = {'export': fingerprint(stages['export'])}
+    assert not is_stale(stages['export'], state, stages)
+    touch(ballots, 'changed')
+    assert is_stale(stages['export'], state, stages)
+
+def test_missing_output_makes_a_stage_stale(dag):
+    stages, ballots, _ = dag
+    touch(ballots)
+    assert is_stale(stages['export'], {'export': fingerprint(stages['export'])}, stages)
+
+def test_kept_stage_is_rebuilt_once_it_has_a_fingerprint(dag):
+    stages, ballots, _ = dag
+    touch(ballots)
+    state = {'jobs': 'from an earlier build'}
+    assert is_stale(stages['jobs'], state, stages)
+
+def test_build_skips_stages_whose_requirements_are_missing(dag, tmp_path, capsys):
+    stages, ballots, bundle = dag
+    touch(ballots)
+    touch(bundle)
+    stages['tmdb'].requires = lambda: "no API key"
+    assert build(stages, force=['tmdb'], only=['tmdb'], work_dir=str(tmp_path / 'work'))
+    assert "skipped (no API key)" in capsys.readouterr().out
+    assert 'tmdb' not in load_state(str(tmp_path / 'work'))
@@ -0,0 +1,44 @@
+import time
+import threading
+import pytest
+from rate_limit import TokenBucket, retry_after_seconds
+
+def timed_acquires(bucket, n):
+    start = time.monotonic()
+    for _ in range(n):
+        bucket.acquire()
+    return time.monotonic() - start
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+def test_burst_is_handed_out_immediately():
+    assert timed_acquires(TokenBucket(rate=1, burst=5), 5) < 0.1
+
+def test_requests_beyond_the_burst_are_paced():
+    # 2 burst tokens, then 4 more at 20/s take at least 0.2s
+    elapsed = timed_acquires(TokenBucket(rate=20, burst=2), 6)
+    assert 0.18 <= elapsed < 0.6
+
+def test_pacing_holds_across_threads():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=timed_acquires, args=(bucket, 5)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 tokens, 1 up front and 19 at 50/s
+    assert time.monotonic() - start >= 19 / 50 - 0.02
+
+def test_pause_drains_the_bucket():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.pause(0.2)
+    assert timed_acquires(bucket, 1) >= 0.18
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert retry_after_seconds({'Retry-After': '3'}) == 3
+    assert retry_after_seconds({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0
+    assert retry_after_seconds({'Retry-After': 'soon'}, default=2) == 2
+    assert retry_after_seconds({}) == 1
@@ -0,0 +1,75 @@
+import os
+import pytest
+from replay import StandInServer, FixtureStore
+import scrape_jpgs
+from scrape_jpgs import download_poster, download_posters, load_manifest, make_session
+
+POSTER = "https://static.test/img/abc123.jpg"
+BROKEN = "https://static.test/img/broken.jpg"
+GONE = "https://static.test/img/gone.jpg"
+OTHER = "https://static.test/img/def456.jpg"
+
+@pytest.fixture
+def server(tmp_path):
+    store = FixtureStore(str(tmp_path / 'fixtures'))
+    store.record('GET', POSTER, 200, {'Content-Type': 'image/jpeg', 'ETag': '"v1"'}, b'JPEG-v1')
+    store.record('GET', BROKEN, 503, {'Content-Type': 'text/plain'}, b'busy')
+    store.record('GET', GONE, 404, {'Content-Type': 'text/plain'}, b'gone')
+    store.record('GET', OTHER, 200, {'Content-Type': 'image/jpeg'}, b'JPEG-other')
+    server = StandInServer(str(tmp_path / 'fixtures')).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def local(server, url):
+    """The stand-in serves https://host/path at <server>/host/path"""
+    return f"{server.url}/{url.split('://', 1)[1]}"
+
+def test_download_writes_file_and_entry(server, tmp_path):
+    error, entry = download_poster(make_session(1), 'abc123', local(server, POSTER), str(tmp_path))
+    assert error is None
+    assert entry['etag'] == '"v1"' and entry['size'] == len(b'JPEG-v1')
+    with open(tmp_path / 'abc123.png', 'rb') as f:
+        assert f.read() == b'JPEG-v1'
+
+def test_not_modified_keeps_file(server, tmp_path):
+    session = make_session(1)
+    _, entry = download_poster(session, 'abc123', local(server, POSTER), str(tmp_path))
+    mtime = os.stat(tmp_path / 'abc123.png').st_mtime_ns
+    server.reset_stats()
+    error, again = download_poster(session, 'abc123', local(server, POSTER), str(tmp_path), entry=entry)
+    assert error is None and again == entry
+    assert server.reset_stats()['requests'] == 1
+    assert os.stat(tmp_path / 'abc123.png').st_mtime_ns == mtime
+
+def test_missing_file_is_fetched_unconditionally(server, tmp_path):
+    session = make_session(1)
+    _, entry = download_poster(session, 'abc123', local(server, POSTER), str(tmp_path))
+    os.remove(tmp_path / 'abc123.png')
+    error, _ = download_poster(session, 'abc123', local(server, POSTER), str(tmp_path), entry=entry)
+    assert error is None and os.path.exists(tmp_path / 'abc123.png')
+
+def test_server_errors_are_retried(server, tmp_path):
+    error, entry = download_poster(make_session(1), 'broken', local(server, BROKEN), str(tmp_path),
+                                   retries=2, backoff=0)
+    assert entry is None and '503' in error
+    assert server.reset_stats()['requests'] == 3
+    assert not os.path.exists(tmp_path / 'broken.png')
+
+def test_client_errors_are_not_retried(server, tmp_path):
+    error, entry = download_poster(make_session(1), 'gone', local(server, GONE), str(tmp_path),
+                                   retries=2, backoff=0)
+    assert entry is None and '404' in error
+    assert server.reset_stats()['requests'] == 1
+
+def test_write_errors_fail_one_poster(server, tmp_path, monkeypatch):
+    write = scrape_jpgs.atomic_write
+    def flaky_write(path, data):
+        if path.endswith('abc123.png'):
+            raise OSError(28, 'No space left on device')
+        write(path, data)
+    monkeypatch.setattr(scrape_jpgs, 'atomic_write', flaky_write)
+    posters = [('abc123', local(server, POSTER)), ('def456', local(server, OTHER))]
+    failures = download_posters(posters, str(tmp_path), workers=2, backoff=0, session=make_session(2))
+    assert list(failures) == ['abc123'] and 'No space left' in failures['abc123']
+    assert list(load_manifest(str(tmp_path))) == ['def456']
@@ -0,0 +1,49 @@
+import os
+import pandas as pd
+import pytest
+from storage import HAS_PARQUET, parquet_path_for, read_dataset, read_records, write_dataset
+
+pytestmark = pytest.mark.skipif(not HAS_PARQUET, reason="pyarrow is not installed")
+
+BALLOTS = pd.DataFrame({'person': ['Ana', 'Ben'], 'title': ['Her', 'Hero'], 'rank': [5, None]})
+
+def written(tmp_path):
+    path = str(tmp_path / 'ballots.csv')
+    write_dataset(BALLOTS, path)
+    return path
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+def test_write_dataset_writes_both_copies(tmp_path):
+    path = written(tmp_path)
+    assert os.path.exists(path) and os.path.exists(parquet_path_for(path))
+
+def test_parquet_copy_is_read_when_not_older(tmp_path):
+    path = written(tmp_path)
+    pd.DataFrame({'person': ['Stale'], 'title': ['Csv'], 'rank': [1]}).to_csv(path, index=False)
+    set_mtime(path, 1_000_000)
+    set_mtime(parquet_path_for(path), 1_000_000)
+    assert list(read_dataset(path)['person']) == ['Ana', 'Ben']
+
+def test_newer_csv_wins_over_parquet(tmp_path):
+    path = written(tmp_path)
+    pd.DataFrame({'person': ['Edited'], 'title': ['By hand'], 'rank': [1]}).to_csv(path, index=False)
+    set_mtime(parquet_path_for(path), 1_000_000)
+    set_mtime(path, 2_000_000)
+    assert list(read_dataset(path)['person']) == ['Edited']
+
+def test_parquet_alone_is_enough(tmp_path):
+    path = written(tmp_path)
+    os.remove(path)
+    assert list(read_dataset(path, columns=['title'])['title']) == ['Her', 'Hero']
+
+def test_both_paths_return_the_same_dtypes(tmp_path):
+    path = written(tmp_path)
+    from_parquet = read_dataset(path)
+    os.remove(parquet_path_for(path))
+    from_csv = read_dataset(path)
+    assert dict(from_parquet.dtypes) == dict(from_csv.dtypes)
+
+def test_read_records_uses_none_for_missing(tmp_path):
+    assert read_records(written(tmp_path), columns=['person', 'rank'])[1] == {'person': 'Ben', 'rank': None}
@@ -0,0 +1,50 @@
+from enrich_movies import tmdb_candidate
+from enrich_movies_wikipedia import wikipedia_candidate
+from title_resolver import MIN_SCORE, TitleResolver, best_candidate, title_aliases
+
+def tmdb(title, release_date, movie_id):
+    return {'id': movie_id, 'title': title, 'original_title': title, 'release_date': release_date}
+
+def test_main_title_before_colon_matches():
+    candidates = [tmdb("Borat: Cultural Learnings of America for Make Benefit Glorious Nation of Kazakhstan",
+                       '2006-11-02', 496)]
+    best, score = best_candidate("Borat", None, candidates, tmdb_candidate)
+    assert best['id'] == 496 and score >= MIN_SCORE
+
+def test_query_extending_candidate_uses_year_hint():
+    hits = [{'title': 'Dune (1984 film)', 'snippet': ''}, {'title': 'Dune (2021 film)', 'snippet': ''}]
+    best, score = best_candidate("Dune: Part One", 2021, hits, wikipedia_candidate)
+    assert best['title'] == 'Dune (2021 film)' and score >= MIN_SCORE
+
+def test_similar_spelling_without_shared_word_is_rejected():
+    best, score = best_candidate("Hero", None, [tmdb("Her", '2013-12-18', 152601)], tmdb_candidate)
+    assert score < MIN_SCORE
+
+def test_exact_title_beats_prefix():
+    candidates = [tmdb("The Godfather", '1972-03-14', 238), tmdb("The Godfather Part II", '1974-12-20', 240)]
+    best, _ = best_candidate("The Godfather: Part II", None, candidates, tmdb_candidate)
+    assert best['id'] == 240
+
+def test_subtitle_with_wrong_year_is_rejected():
+    best, score = best_candidate("The Godfather: Part II", 1974, [tmdb("The Godfather", '1972-03-14', 238)],
+                                 tmdb_candidate)
+    assert score < MIN_SCORE
+
+def test_aliases_fold_accents_and_articles():
+    assert 'amelie' in title_aliases("Amélie")
+    assert 'godfather' in title_aliases("Godfather, The")
+    assert title_aliases("Borat: Cultural Learnings") == ['borat cultural learnings']
+
+def test_resolver_only_searches_unknown_titles(tmp_path):
+    resolver = TitleResolver(str(tmp_path / 'resolutions.json'), tmdb_candidate)
+    searches = []
+
+    def search(title, year):
+        searches.append(title)
+        return [tmdb("Amélie", '2001-04-25', 194)]
+
+    assert resolver.resolve("Amélie", 2001, search)['id'] == 194
+    resolver.save()
+    again = TitleResolver(str(tmp_path / 'resolutions.json'), tmdb_candidate)
+    assert again.resolve("Amelie", 2001, search)['id'] == 194
+    assert searches == ["Amélie"]